@@ -0,0 +1,187 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from extensions import db
+from models import Produto, Vendedor, Venda, VendaDiaria
+from metricas import ler_versao, incrementar_versao, reconstruir_metricas, VERSAO_HISTORICO, VERSAO_VENDAS
+from paginacao import filtrar_periodo
+from vendas_diarias import alinhado_ao_dia, filtrar_dias, reconstruir_vendas_diarias, rollup_vazio
+from tarefas import tarefa
+
+# Formato de agrupamento (strftime do SQLite) por granularidade
+GRANULARIDADES = {
+    'dia': '%Y-%m-%d',
+    'semana': '%Y-%W',
+    'mes': '%Y-%m',
+}
+
+class CacheAnalytics:
+    """Cache LRU de resultados por janela, invalidado por contador de versão.
+
+    Cada resultado guarda a versão dos dados com que foi calculado e é servido
+    da memória, com uma única leitura por chave primária, enquanto ela não
+    mudar. Janelas que incluem hoje seguem versao_vendas (toda venda ou
+    pagamento); janelas já fechadas seguem versao_historico, que só avança
+    com o que reescreve dias passados, e sobrevivem às vendas do dia.
+    """
+
+    def __init__(self, tamanho=256):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular, fim=None):
+        """Resultado da janela que termina em `fim` (exclusivo; None = sem fim)"""
+        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        contador = VERSAO_HISTORICO if fim is not None and fim <= hoje else VERSAO_VENDAS
+        versao = (contador, ler_versao(contador))
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] == versao:
+                self._itens.move_to_end(chave)
+                return item[1]
+
+        valor = calcular()
+        with self._lock:
+            self._itens[chave] = (versao, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+cache = CacheAnalytics()
+
+def _fonte(inicio, fim):
+    """(modelo, coluna de data, coluna de receita, filtro) para o período.
+
+    Períodos em dias inteiros são lidos do rollup vendas_diarias, que tem uma
+    linha por dia/vendedor/produto; limites com hora, ou o rollup ainda vazio,
+    caem na tabela de vendas.
+    """
+    if alinhado_ao_dia(inicio, fim):
+        if rollup_vazio():
+            current_app.logger.warning('vendas_diarias vazio: analytics lidos da tabela de vendas até rodar '
+                                       'flask reconstruir-vendas-diarias ou o recálculo de analytics')
+        else:
+            return (VendaDiaria, VendaDiaria.dia, VendaDiaria.valor_bruto,
+                    lambda consulta: filtrar_dias(consulta, inicio, fim))
+    return (Venda, Venda.data_venda, Venda.valor_total,
+            lambda consulta: filtrar_periodo(consulta, Venda.data_venda, inicio, fim))
+
+def _agrupar(tabela_rotulo, coluna_chave, prefixo, inicio, fim, limite):
+    """Receita e quantidade agrupadas pela chave, rotuladas pelo nome em tabela_rotulo"""
+    modelo, _, receita, filtrar = _fonte(inicio, fim)
+    chave = getattr(modelo, coluna_chave)
+    consulta = filtrar(
+        db.select(db.func.coalesce(tabela_rotulo.nome, prefixo + db.cast(chave, db.String)).label('rotulo'),
+                  db.func.sum(receita).label('receita'),
+                  db.func.sum(modelo.quantidade).label('quantidade'))
+        .select_from(modelo)
+        .outerjoin(tabela_rotulo, chave == tabela_rotulo.id)
+        .group_by(chave)
+    ).order_by(db.desc('receita'))
+    if limite:
+        consulta = consulta.limit(limite)
+    return [
+        {'rotulo': r.rotulo, 'receita': float(r.receita or 0), 'quantidade': int(r.quantidade or 0)}
+        for r in db.session.execute(consulta)
+    ]
+
+def receita_por_vendedor(inicio=None, fim=None, limite=None):
+    """Receita bruta e quantidade retirada por vendedor no período"""
+    return cache.obter(
+        ('vendedor', inicio, fim, limite),
+        lambda: _agrupar(Vendedor, 'vendedor_id', 'Vendedor #', inicio, fim, limite), fim
+    )
+
+def receita_por_produto(inicio=None, fim=None, limite=None):
+    """Receita bruta e quantidade retirada por produto no período"""
+    return cache.obter(
+        ('produto', inicio, fim, limite),
+        lambda: _agrupar(Produto, 'produto_id', 'Produto #', inicio, fim, limite), fim
+    )
+
+def receita_por_periodo(granularidade='dia', inicio=None, fim=None):
+    """Série temporal de receita e quantidade (dia, semana ou mês), em ordem cronológica"""
+    formato = GRANULARIDADES[granularidade]
+
+    def calcular():
+        modelo, data, receita, filtrar = _fonte(inicio, fim)
+        periodo = db.func.strftime(formato, data).label('periodo')
+        consulta = filtrar(
+            db.select(periodo,
+                      db.func.sum(receita).label('receita'),
+                      db.func.sum(modelo.quantidade).label('quantidade'))
+            .group_by(periodo).order_by(periodo)
+        )
+        return [
+            {'periodo': r.periodo, 'receita': float(r.receita or 0), 'quantidade': int(r.quantidade or 0)}
+            for r in db.session.execute(consulta)
+        ]
+    return cache.obter(('periodo', granularidade, inicio, fim), calcular, fim)
+
+def media_movel_diaria(inicio, fim, janela=7):
+    """Receita diária (dias sem venda = 0) com média móvel de `janela` dias.
+
+    A agregação vem do banco; o pandas só completa o calendário e calcula a
+    média móvel de forma vetorizada sobre a série já agregada.
+    """
+    def calcular():
+        import pandas as pd
+
+        dias = pd.date_range(inicio, fim - timedelta(days=1), freq='D')
+        receita = pd.Series(
+            {pd.Timestamp(item['periodo']): item['receita'] for item in receita_por_periodo('dia', inicio, fim)},
+            dtype='float64'
+        ).reindex(dias, fill_value=0.0)
+        media = receita.rolling(janela, min_periods=1).mean()
+        return {
+            'labels': [dia.strftime('%d/%m') for dia in dias],
+            'receita': receita.round(2).tolist(),
+            'media_movel': media.round(2).tolist(),
+        }
+    return cache.obter(('media_movel', inicio, fim, janela), calcular, fim)
+
+def janela_recente(dias):
+    """(inicio, fim) cobrindo os últimos `dias` dias, incluindo hoje (UTC)"""
+    fim = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return fim - timedelta(days=dias), fim
+
+def _inicios_de_mes(primeira, ultima):
+    """Primeiro dia de cada mês seguinte ao de `primeira`, até o mês de `ultima`"""
+    limites = []
+    ano, mes = primeira.year, primeira.month
+    while True:
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        inicio = datetime(ano, mes, 1)
+        if inicio > ultima:
+            return limites
+        limites.append(inicio)
+
+@tarefa('recalcular_analytics', 'Recálculo de analytics')
+def tarefa_recalcular_analytics(contexto):
+    """Refaz o rollup vendas_diarias mês a mês (um commit por mês) e as métricas"""
+    primeira, ultima = db.session.execute(
+        db.select(db.func.min(Venda.data_venda), db.func.max(Venda.data_venda))
+    ).one()
+    limites = _inicios_de_mes(primeira, ultima) if primeira else []
+    # Primeiro e último períodos abertos: apagam também dias fora do intervalo das vendas
+    periodos = list(zip([None, *limites], [*limites, None]))
+    linhas = 0
+    for feitos, (inicio, fim) in enumerate(periodos):
+        contexto.progresso(feitos, len(periodos) + 1, 'Vendas diárias')
+        linhas += reconstruir_vendas_diarias(inicio, fim)
+        db.session.commit()
+
+    contexto.progresso(len(periodos), len(periodos) + 1, 'Métricas do dashboard')
+    valores = reconstruir_metricas()
+    incrementar_versao(VERSAO_VENDAS)  # invalida o cache de analytics de todos os workers
+    incrementar_versao(VERSAO_HISTORICO)
+    db.session.commit()
+    return {'linhas_vendas_diarias': linhas, 'meses': len(periodos),
+            'metricas': {nome: float(valor) for nome, valor in valores.items()}}
@@ -1,9 +1,24 @@
 from flask import Flask, redirect, url_for, render_template
 import os
-from extensions import db, bcrypt, login_manager, configure_extensions, migrate
+from extensions import configure_extensions
 from config import Config
 
 def create_app():
+    # Módulos da aplicação (e, por eles, os models) só são importados aqui:
+    # `import app` fica barato para a CLI e para quem só precisa da fábrica
+    from commands import register_commands
+    from debug_sql import init_sql_debug
+    from profiling import init_profiling
+    from cache_usuarios import init_cache_usuarios
+    from senhas import init_senhas
+    from assets import init_assets
+    from eventos import init_eventos
+    from tarefas import init_tarefas
+    from movimentacoes import init_movimentacoes
+    from arquivos import init_arquivos
+    from notas import init_notas
+    from sincronizacao import init_sincronizacao
+
     app = Flask(__name__)
 
     # Configurar o aplicativo com as configurações externas
@@ -12,6 +27,42 @@ def create_app():
     # Configurar extensões
     configure_extensions(app)
 
+    # Pool limitado para o bcrypt
+    init_senhas(app)
+
+    # Registrar comandos de CLI
+    register_commands(app)
+
+    # Detector de N+1 (apenas em debug/teste)
+    init_sql_debug(app)
+
+    # Profiling por request (opcional)
+    init_profiling(app)
+
+    # Cache do user_loader (sem consulta ao banco por request autenticado)
+    init_cache_usuarios(app)
+
+    # Assets com hash no nome e pré-comprimidos (asset_url nos templates)
+    init_assets(app)
+
+    # Feed ao vivo de estoque, vendas e pagamentos (SSE)
+    init_eventos(app)
+
+    # Importações, exportações e recálculos em segundo plano (tabela jobs)
+    init_tarefas(app)
+
+    # Snapshot periódico do razão do estoque (na manutenção das tarefas)
+    init_movimentacoes(app)
+
+    # Uploads em streaming, guardados por conteúdo, com miniaturas sob demanda
+    init_arquivos(app)
+
+    # Entrada de mercadoria por OCR das notas de fornecedor
+    init_notas(app)
+
+    # Sincronização por cursor dos caixas offline (cliente desktop)
+    init_sincronizacao(app)
+
     # Rota de debug para verificar arquivos estáticos
     @app.route('/debug-path')
     def debug_path():
@@ -22,44 +73,15 @@ def create_app():
         Exists: {os.path.exists(css_path)}
         """
 
-    with app.app_context():
-        # Criar estrutura de diretórios necessários
-        required_folders = [
-            app.instance_path,  # Diretório da instância
-            app.config['UPLOAD_FOLDER'],  # Diretório de uploads
-            os.path.join(app.root_path, 'temp_uploads')  # Diretório temporário para uploads
-        ]
-        
-        for folder in required_folders:
-            os.makedirs(folder, exist_ok=True)  # Cria a pasta se não existir
-
-        # Importar modelos para criação de tabelas
-        from models import User, Produto, Venda, Pagamento
-        
-        # Criar todas as tabelas
-        db.create_all()
-
-        # Criar admin padrão se não existir
-        if not User.query.filter_by(username='admin').first():
-            admin = User(
-                username='admin',
-                role='admin'
-            )
-            admin.set_password('admin123')  # Senha do admin
-            db.session.add(admin)
-            try:
-                db.session.commit()
-                print("✅ Admin padrão criado com sucesso!")
-            except Exception as e:
-                db.session.rollback()
-                print(f"❌ Erro ao criar admin: {str(e)}")
-
-        # Registrar blueprints
-        from routes.auth import bp as auth_bp
-        from routes.dashboard import bp as dashboard_bp
-
-        app.register_blueprint(auth_bp, url_prefix='/auth')
-        app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
+    # Pastas, tabelas e admin padrão não são criados aqui: ver `flask preparar-banco`
+    # (provisionamento.py), que roda uma vez por deploy e não a cada worker
+
+    # Registrar blueprints
+    from routes.auth import bp as auth_bp
+    from routes.dashboard import bp as dashboard_bp
+
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
 
     # Rotas básicas
     @app.route('/')
@@ -78,5 +100,8 @@ def create_app():
     return app
 
 if __name__ == '__main__':
+    from provisionamento import preparar
+
     app = create_app()
+    preparar(app)  # servidor de desenvolvimento: um processo só, pode preparar sozinho
     app.run(debug=os.getenv('FLASK_DEBUG', 'False') == 'True')
\ No newline at end of file
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from urllib.parse import unquote
+from flask import Blueprint, abort, current_app, jsonify, request, send_file, url_for
+from flask_login import current_user, login_required
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db
+from models import Arquivo
+
+# Uploads guardados por conteúdo. O corpo é lido em blocos direto para
+# UPLOAD_TEMP, calculando o sha256 no caminho, e depois movido para
+# UPLOAD_FOLDER/ab/cd/<sha256>.<ext>: a mesma foto enviada dez vezes ocupa
+# um arquivo e um registro. Miniaturas são feitas com Pillow no primeiro
+# pedido e ficam em disco (UPLOAD_MINIATURAS).
+
+BLOCO = 64 * 1024
+CABECALHO = 16  # bytes lidos antes de decidir o formato
+# O formato vem dos primeiros bytes do conteúdo, não da extensão do nome enviado
+ASSINATURAS = (
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+)
+
+class ArquivoInvalido(ValueError):
+    """Upload vazio, grande demais ou de um formato não aceito"""
+
+def _formato(cabecalho):
+    for assinatura, extensao, tipo in ASSINATURAS:
+        if cabecalho.startswith(assinatura):
+            return extensao, tipo
+    raise ArquivoInvalido('Formato não aceito: envie uma imagem JPG, PNG ou GIF')
+
+def _fragmentado(pasta, hash, extensao):
+    # Dois níveis de 256 pastas: nenhum diretório cresce sem limite
+    return os.path.join(pasta, hash[:2], hash[2:4], f'{hash}.{extensao}')
+
+def caminho_do_arquivo(arquivo):
+    """Caminho em disco de um Arquivo"""
+    return _fragmentado(current_app.config['UPLOAD_FOLDER'], arquivo.hash, arquivo.extensao)
+
+def _gravar_temporario(stream, limite):
+    """Copia o stream em blocos para UPLOAD_TEMP; retorna (caminho, sha256, tamanho, formato)"""
+    digest = hashlib.sha256()
+    tamanho = 0
+    cabecalho = b''
+    formato = None
+    os.makedirs(current_app.config['UPLOAD_TEMP'], exist_ok=True)
+    temporario = tempfile.NamedTemporaryFile(dir=current_app.config['UPLOAD_TEMP'], prefix='upload-',
+                                             delete=False)
+    try:
+        with temporario:
+            while bloco := stream.read(BLOCO):
+                tamanho += len(bloco)
+                if tamanho > limite:
+                    raise ArquivoInvalido(f'Arquivo maior que {limite // (1024 * 1024)} MB')
+                if formato is None:
+                    cabecalho += bloco[:CABECALHO - len(cabecalho)]
+                    if len(cabecalho) == CABECALHO:
+                        formato = _formato(cabecalho)  # recusa antes de ler o resto
+                digest.update(bloco)
+                temporario.write(bloco)
+        if not tamanho:
+            raise ArquivoInvalido('Arquivo vazio')
+        return temporario.name, digest.hexdigest(), tamanho, formato or _formato(cabecalho)
+    except BaseException:
+        os.remove(temporario.name)
+        raise
+
+def guardar(stream, nome_original=None, usuario_id=None):
+    """Grava o conteúdo do stream e retorna (Arquivo, duplicado), sem commit.
+
+    Se o mesmo conteúdo já estava guardado, o temporário é descartado e volta
+    o registro existente. Levanta ArquivoInvalido para conteúdo recusado.
+    """
+    config = current_app.config
+    caminho, hash, tamanho, (extensao, tipo) = _gravar_temporario(stream, config['UPLOAD_MAX_BYTES'])
+    existente = db.session.scalar(db.select(Arquivo).where(Arquivo.hash == hash))
+    if existente is not None:
+        os.remove(caminho)
+        return existente, True
+
+    destino = _fragmentado(config['UPLOAD_FOLDER'], hash, extensao)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Mesmo conteúdo, mesmo destino: dois envios simultâneos só sobrescrevem bytes iguais
+    shutil.move(caminho, destino)
+    novo = db.session.execute(
+        insert(Arquivo).values(hash=hash, extensao=extensao, tipo=tipo, tamanho=tamanho,
+                               nome_original=(nome_original or '')[:255] or None,
+                               usuario_id=usuario_id, criado_em=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[Arquivo.hash])
+    ).rowcount
+    return db.session.scalar(db.select(Arquivo).where(Arquivo.hash == hash)), not novo
+
+def guardar_upload(arquivo_enviado, usuario_id=None):
+    """guardar() para um FileStorage de formulário multipart"""
+    return guardar(arquivo_enviado.stream, arquivo_enviado.filename, usuario_id)
+
+def miniatura(arquivo, lado):
+    """Caminho da miniatura JPEG de até `lado` px, gerada no primeiro pedido.
+
+    Levanta ArquivoInvalido se o original não puder ser decodificado e
+    FileNotFoundError se ele não estiver mais em disco.
+    """
+    destino = _fragmentado(os.path.join(current_app.config['UPLOAD_MINIATURAS'], str(lado)), arquivo.hash, 'jpg')
+    if os.path.exists(destino):
+        return destino
+    from PIL import Image, ImageOps
+
+    temporario = None
+    try:
+        with Image.open(caminho_do_arquivo(arquivo)) as original:
+            # JPEG: decodifica já reduzida (1/2, 1/4, 1/8), sem abrir a foto inteira na memória
+            original.draft('RGB', (lado, lado))
+            imagem = ImageOps.exif_transpose(original)
+            imagem.thumbnail((lado, lado))
+            if imagem.mode != 'RGB':
+                imagem = imagem.convert('RGB')
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            # Grava ao lado e renomeia: quem pedir ao mesmo tempo nunca lê meia miniatura
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(destino), suffix='.tmp',
+                                             delete=False) as temporario:
+                imagem.save(temporario, 'JPEG', quality=80, optimize=True)
+            os.replace(temporario.name, destino)
+    except FileNotFoundError:
+        raise
+    except OSError as e:  # inclui PIL.UnidentifiedImageError e imagem truncada
+        raise ArquivoInvalido('Imagem corrompida ou ilegível') from e
+    finally:
+        if temporario is not None and os.path.exists(temporario.name):
+            os.remove(temporario.name)
+    return destino
+
+def descrever(arquivo, duplicado=False):
+    """JSON de um Arquivo: o que o cliente do upload precisa para referenciá-lo"""
+    return {
+        'id': arquivo.id,
+        'hash': arquivo.hash,
+        'nome': arquivo.nome_original,
+        'tipo': arquivo.tipo,
+        'tamanho': arquivo.tamanho,
+        'duplicado': duplicado,
+        'url': url_for('arquivos.original', hash=arquivo.hash),
+        'miniatura': url_for('arquivos.miniatura_arquivo', hash=arquivo.hash,
+                             lado=current_app.config['UPLOAD_LADOS_MINIATURA'][0]),
+    }
+
+def _enviar_imutavel(caminho, tipo, etag, nome=None):
+    resposta = send_file(caminho, mimetype=tipo, etag=etag, download_name=nome, conditional=True,
+                         max_age=current_app.config['UPLOAD_MAX_AGE'])
+    # Conteúdo fixo por URL, mas atrás de login: só o navegador guarda
+    resposta.cache_control.public = False
+    resposta.cache_control.private = True
+    resposta.cache_control.immutable = True
+    return resposta
+
+def _arquivo_ou_404(hash):
+    arquivo = db.session.scalar(db.select(Arquivo).where(Arquivo.hash == hash))
+    if arquivo is None:
+        abort(404)
+    return arquivo
+
+bp = Blueprint('arquivos', __name__, url_prefix='/arquivos')
+
+@bp.route('/', methods=['POST'])
+@login_required
+def enviar():
+    """Upload de imagens.
+
+    O corpo cru (fetch com o File como body, nome em X-Nome-Arquivo) é o
+    caminho em streaming: vai direto do socket para o disco. Um multipart
+    com campos `arquivo` também é aceito, mas o Werkzeug o bufferiza antes.
+    """
+    try:
+        if request.mimetype == 'multipart/form-data':
+            guardados = [guardar_upload(enviado, current_user.id)
+                         for enviado in request.files.getlist('arquivo') if enviado.filename]
+        else:
+            nome = unquote(request.headers.get('X-Nome-Arquivo', ''))
+            guardados = [guardar(request.stream, nome, current_user.id)]
+        if not guardados:
+            raise ArquivoInvalido('Nenhum arquivo enviado')
+        db.session.commit()
+    except ArquivoInvalido as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+    novos = any(not duplicado for _, duplicado in guardados)
+    return jsonify({'arquivos': [descrever(a, duplicado) for a, duplicado in guardados]}), 201 if novos else 200
+
+@bp.route('/<hash>')
+@login_required
+def original(hash):
+    arquivo = _arquivo_ou_404(hash)
+    return _enviar_imutavel(caminho_do_arquivo(arquivo), arquivo.tipo, arquivo.hash, arquivo.nome_original)
+
+@bp.route('/<hash>/miniatura/<int:lado>')
+@login_required
+def miniatura_arquivo(hash, lado):
+    if lado not in current_app.config['UPLOAD_LADOS_MINIATURA']:
+        abort(404)
+    arquivo = _arquivo_ou_404(hash)
+    try:
+        caminho = miniatura(arquivo, lado)
+    except FileNotFoundError:
+        abort(404)
+    except ArquivoInvalido as e:
+        return jsonify({'erro': str(e)}), 415
+    return _enviar_imutavel(caminho, 'image/jpeg', f'{arquivo.hash}-{lado}')
+
+def init_arquivos(app):
+    """Registra /arquivos (upload em streaming, originais e miniaturas)"""
+    app.register_blueprint(bp)
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+
+# Bibliotecas de terceiros servidas localmente: caminho em static/ -> origem.
+# `flask baixar-assets` grava os arquivos (e as fontes que os CSS referenciam);
+# enquanto não forem baixados, asset_url aponta para a CDN de origem e
+# `construir-assets` se recusa a gerar um build.
+BIBLIOTECAS = {
+    'vendor/bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'vendor/fonts/space-grotesk.css': 'https://fonts.googleapis.com/css2?family=Space+Grotesk:wght@300;500;700&display=swap',
+}
+# O Google Fonts só devolve woff2 para navegadores que o suportam
+NAVEGADOR = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+PASTA_BUILD = 'dist'
+MANIFESTO = 'manifest.json'
+IGNORAR = {PASTA_BUILD, 'uploads'}
+COMPRIMIR = {'.css', '.js', '.svg', '.json', '.txt', '.ttf', '.eot', '.otf', '.ico', '.map'}
+MINIMO_COMPRIMIR = 256  # bytes; abaixo disso o cabeçalho custa mais que a economia
+UM_ANO = 365 * 24 * 3600
+URL_CSS = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+class BibliotecasAusentes(RuntimeError):
+    """Faltam em static/ bibliotecas de BIBLIOTECAS (rode `flask baixar-assets`)"""
+
+def bibliotecas_ausentes(pasta_static):
+    """Caminhos de BIBLIOTECAS que ainda não foram baixados para static/"""
+    return [destino for destino in BIBLIOTECAS
+            if not os.path.isfile(os.path.join(pasta_static, *destino.split('/')))]
+
+def _baixar(url):
+    pedido = urllib.request.Request(url, headers={'User-Agent': NAVEGADOR})
+    with urllib.request.urlopen(pedido, timeout=30) as resposta:
+        return resposta.read()
+
+def _gravar(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+
+def baixar_bibliotecas(pasta_static):
+    """Baixa BIBLIOTECAS para static/ e traz junto as fontes referenciadas nos CSS.
+
+    Cada url(...) externo vira um arquivo em `arquivos/` ao lado do CSS, com a
+    referência reescrita, para a página não depender de nenhuma CDN.
+    """
+    gravados = []
+    for destino, origem in BIBLIOTECAS.items():
+        conteudo = _baixar(origem)
+        caminho = os.path.join(pasta_static, *destino.split('/'))
+        if destino.endswith('.css'):
+            texto = conteudo.decode('utf-8')
+            referencias = {}
+            for _, ref in URL_CSS.findall(texto):
+                if ref.startswith(('data:', '#')) or ref in referencias:
+                    continue
+                nome = posixpath.basename(urlsplit(ref).path)
+                _gravar(os.path.join(os.path.dirname(caminho), 'arquivos', nome), _baixar(urljoin(origem, ref)))
+                referencias[ref] = f'arquivos/{nome}'
+                gravados.append(posixpath.join(posixpath.dirname(destino), 'arquivos', nome))
+            conteudo = URL_CSS.sub(
+                lambda m: f'url({referencias.get(m.group(2), m.group(2))})', texto
+            ).encode('utf-8')
+        _gravar(caminho, conteudo)
+        gravados.append(destino)
+    return gravados
+
+def _arquivos(pasta_static):
+    """Caminhos relativos (com /) de tudo em static/, fora o build e os uploads"""
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        relativa = os.path.relpath(raiz, pasta_static)
+        if relativa == '.':
+            pastas[:] = [p for p in pastas if p not in IGNORAR]
+        for nome in arquivos:
+            yield posixpath.normpath(posixpath.join(relativa.replace(os.sep, '/'), nome))
+
+def _nome_com_hash(caminho, conteudo):
+    base, extensao = posixpath.splitext(caminho)
+    return f'{base}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}'
+
+def _reescrever_css(caminho, texto, manifesto):
+    """Troca url(...) relativos pelos nomes com hash (relativos ao CSS gerado)"""
+    pasta = posixpath.dirname(caminho)
+    destino = posixpath.dirname(manifesto.get(caminho, caminho))
+
+    def trocar(m):
+        ref = m.group(2)
+        partes = urlsplit(ref)
+        if partes.scheme or ref.startswith(('/', '#', 'data:')):
+            return m.group(0)
+        alvo = manifesto.get(posixpath.normpath(posixpath.join(pasta, partes.path)))
+        if alvo is None:
+            return m.group(0)
+        sufixo = ('?' + partes.query if partes.query else '') + ('#' + partes.fragment if partes.fragment else '')
+        return f'url({posixpath.relpath(alvo, destino)}{sufixo})'
+
+    return URL_CSS.sub(trocar, texto)
+
+def _comprimir(caminho, conteudo, brotli):
+    """Grava .gz (e .br, se o pacote brotli existir) quando compensa"""
+    if len(conteudo) < MINIMO_COMPRIMIR:
+        return
+    gz = gzip.compress(conteudo, compresslevel=9, mtime=0)  # mtime fixo: build reprodutível
+    if len(gz) < len(conteudo):
+        _gravar(caminho + '.gz', gz)
+    if brotli is not None:
+        br = brotli.compress(conteudo, quality=11)
+        if len(br) < len(conteudo):
+            _gravar(caminho + '.br', br)
+
+def construir(pasta_static, limpar=False):
+    """Gera static/dist: cópias com hash do conteúdo no nome, .gz/.br e o manifest.json.
+
+    Versões antigas ficam na pasta (a menos que `limpar`), para páginas abertas
+    antes do deploy continuarem achando os arquivos que referenciam.
+    Levanta BibliotecasAusentes se alguma biblioteca não foi baixada: um build
+    sem elas deixaria a página dependendo de rede externa.
+    Retorna (manifesto, brotli disponível).
+    """
+    ausentes = bibliotecas_ausentes(pasta_static)
+    if ausentes:
+        raise BibliotecasAusentes(f'Bibliotecas não baixadas: {", ".join(ausentes)} (rode flask baixar-assets)')
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    pasta_build = os.path.join(pasta_static, PASTA_BUILD)
+    if limpar:
+        shutil.rmtree(pasta_build, ignore_errors=True)
+
+    manifesto = {}
+    # CSS por último: as referências para imagens e fontes já têm o nome final
+    for caminho in sorted(_arquivos(pasta_static), key=lambda c: (c.endswith('.css'), c)):
+        with open(os.path.join(pasta_static, *caminho.split('/')), 'rb') as f:
+            conteudo = f.read()
+        if caminho.endswith('.css'):
+            conteudo = _reescrever_css(caminho, conteudo.decode('utf-8'), manifesto).encode('utf-8')
+        manifesto[caminho] = _nome_com_hash(caminho, conteudo)
+        destino = os.path.join(pasta_build, *manifesto[caminho].split('/'))
+        _gravar(destino, conteudo)
+        if posixpath.splitext(caminho)[1] in COMPRIMIR:
+            _comprimir(destino, conteudo, brotli)
+
+    _gravar(os.path.join(pasta_build, MANIFESTO),
+            json.dumps(manifesto, indent=2, sort_keys=True).encode('utf-8'))
+    return manifesto, brotli is not None
+
+def carregar_manifesto(pasta_static):
+    try:
+        with open(os.path.join(pasta_static, PASTA_BUILD, MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def asset_url(endpoint, **values):
+    """url_for com assets do build: mesmos argumentos, URL com hash e cache imutável.
+
+    Arquivos fora do manifesto (build não gerado ou arquivo novo) caem no
+    url_for normal; bibliotecas ainda não baixadas, na CDN de origem.
+    """
+    if endpoint == 'static' and 'filename' in values:
+        estado = current_app.extensions['assets']
+        com_hash = estado['manifesto'].get(values['filename'])
+        if com_hash:
+            return url_for('assets.arquivo', **{**values, 'filename': com_hash})
+        if values['filename'] in estado['cdn']:
+            return BIBLIOTECAS[values['filename']]
+    return url_for(endpoint, **values)
+
+bp = Blueprint('assets', __name__)
+
+@bp.route('/<path:filename>')
+def arquivo(filename):
+    """Serve static/dist com a versão pré-comprimida aceita pelo navegador"""
+    pasta = os.path.join(current_app.static_folder, PASTA_BUILD)
+    tipo = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # O nome muda junto com o conteúdo: o navegador nunca precisa revalidar
+    opcoes = {'mimetype': tipo, 'max_age': UM_ANO}
+    for codificacao, extensao in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[codificacao] and os.path.isfile(os.path.join(pasta, filename + extensao)):
+            resposta = send_from_directory(pasta, filename + extensao, **opcoes)
+            resposta.headers['Content-Encoding'] = codificacao
+            break
+    else:
+        resposta = send_from_directory(pasta, filename, **opcoes)
+    resposta.cache_control.immutable = True
+    resposta.vary.add('Accept-Encoding')
+    return resposta
+
+def init_assets(app):
+    """Carrega o manifesto do build e registra asset_url nos templates"""
+    manifesto = carregar_manifesto(app.static_folder) if app.config.get('ASSETS_USE_BUILD', True) else {}
+    app.extensions['assets'] = {'manifesto': manifesto, 'cdn': set(bibliotecas_ausentes(app.static_folder))}
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.register_blueprint(bp, url_prefix=app.config.get('ASSETS_URL_PREFIX', '/assets'))
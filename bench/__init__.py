@@ -0,0 +1,19 @@
+"""Benchmarks e verificações de carga. Rodar a partir da raiz: python -m bench.<script>"""
+import os
+import tempfile
+
+def criar_app(instancia=None, **config):
+    """Cria (e prepara) o app apontando para um banco SQLite descartável em um diretório temporário.
+
+    Com `instancia`, usa (e mantém) o banco desse diretório, para reaproveitar
+    uma base já populada entre execuções.
+    """
+    if instancia:
+        os.makedirs(instancia, exist_ok=True)
+    os.environ['INSTANCE_PATH'] = os.path.abspath(instancia) if instancia else tempfile.mkdtemp(prefix='tabacaria-bench-')
+    from app import create_app
+    from provisionamento import preparar
+    app = create_app()
+    app.config.update(config)
+    preparar(app)
+    return app
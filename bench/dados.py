@@ -0,0 +1,179 @@
+"""Gerador de dados sintéticos: usuários, vendedores, produtos, vendas e pagamentos.
+
+As distribuições imitam a loja: poucos produtos respondem pela maior parte
+das vendas (Zipf), o movimento se concentra no fim da tarde e no fim de
+semana, vendas antigas tendem a estar quitadas e as recentes pendentes. O
+gerador é determinístico para a mesma semente. Ao final as métricas e o
+rollup vendas_diarias são reconstruídos e o banco é analisado (ANALYZE).
+
+    python -m bench.dados --escala 100k --instancia /tmp/tabacaria-100k
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+TAMANHO_LOTE = 10_000
+SENHA_VENDEDORES = 'vendedor123'
+
+CATEGORIAS = {
+    # categoria: (marcas, variações, faixa de preço)
+    'Cigarro': (('Marlboro', 'Lucky Strike', 'Dunhill', 'Camel', 'Winston', 'Chesterfield'),
+                ('Red', 'Gold', 'Silver', 'Box', 'Carteira', 'Menthol'), (9, 16)),
+    'Tabaco': (('Amsterdamer', 'Drum', 'Golden Virginia', 'Bali Shag', 'Pueblo'),
+               ('25g', '30g', '40g', '50g'), (18, 45)),
+    'Seda': (('Smoking', 'Raw', 'Zomo', 'Bem Bolado', 'OCB'),
+             ('King Size', 'Slim', 'Brown', 'Classic', 'Mini'), (3, 9)),
+    'Essência': (('Zomo', 'Adalya', 'Onix', 'Ziggy', 'Nay'),
+                 ('Menta', 'Uva', 'Melancia', 'Love 66', 'Ice', 'Limão'), (12, 30)),
+    'Charuto': (('Dona Flor', 'Dannemann', 'Cohiba', 'Romeo y Julieta'),
+                ('Robusto', 'Corona', 'Petit', 'Churchill'), (25, 120)),
+    'Acessório': (('Isqueiro Bic', 'Isqueiro Clipper', 'Piteira', 'Dichavador', 'Carvão'),
+                  ('Unidade', 'Kit', 'Grande', 'Pequeno'), (4, 60)),
+}
+METODOS = ('dinheiro', 'cartao', 'pix')  # as opções de PagamentoForm
+PESO_HORA = [1, 0, 0, 0, 0, 0, 1, 2, 4, 5, 6, 6, 7, 6, 6, 7, 8, 10, 12, 12, 11, 8, 5, 2]
+PESO_DIA_SEMANA = [0.8, 0.8, 0.9, 1.0, 1.3, 1.6, 1.1]  # segunda .. domingo
+
+def dimensoes(vendas):
+    """Número de vendedores e produtos proporcional ao volume de vendas"""
+    return max(5, min(50, 5 + vendas // 20_000)), max(20, min(2_000, vendas // 500))
+
+def _em_lotes(db, tabela, linhas):
+    for inicio in range(0, len(linhas), TAMANHO_LOTE):
+        db.session.execute(tabela.insert(), linhas[inicio:inicio + TAMANHO_LOTE])
+
+def _produtos(rng, quantidade):
+    combinacoes = [
+        (f'{categoria} {marca} {variacao}', faixa)
+        for categoria, (marcas, variacoes, faixa) in CATEGORIAS.items()
+        for marca in marcas for variacao in variacoes
+    ]
+    rng.shuffle(combinacoes)
+    produtos = []
+    for n in range(quantidade):
+        nome, (minimo, maximo) = combinacoes[n % len(combinacoes)]
+        if n >= len(combinacoes):
+            nome = f'{nome} #{n // len(combinacoes) + 1}'
+        preco = round(minimo + (maximo - minimo) * rng.betavariate(2, 3), 2)
+        produtos.append((nome, preco))
+    return produtos
+
+def popular(vendas, semente=42, dias=365):
+    """Popula o banco do app corrente (dentro de um app context); retorna as contagens"""
+    from extensions import db, bcrypt
+    from models import User, Vendedor, Produto, Venda, Pagamento
+    from metricas import reconstruir_metricas
+    from vendas_diarias import reconstruir_vendas_diarias
+
+    rng = random.Random(semente)
+    n_vendedores, n_produtos = dimensoes(vendas)
+    agora = datetime.utcnow().replace(microsecond=0)
+
+    # bcrypt é caro: um único hash compartilhado por todos os vendedores
+    senha = bcrypt.generate_password_hash(SENHA_VENDEDORES).decode('utf-8')
+    base_usuario = (db.session.scalar(db.select(db.func.max(User.id))) or 0) + 1
+    _em_lotes(db, User.__table__, [
+        {'id': base_usuario + n, 'username': f'vendedor{base_usuario + n:03d}', 'password_hash': senha,
+         'role': 'vendedor' if n % 5 else 'funcionario', 'created_at': agora - timedelta(days=dias)}
+        for n in range(n_vendedores)
+    ])
+    base_vendedor = (db.session.scalar(db.select(db.func.max(Vendedor.id))) or 0) + 1
+    vendedores = list(range(base_vendedor, base_vendedor + n_vendedores))
+    _em_lotes(db, Vendedor.__table__, [
+        {'id': vid, 'nome': f'Vendedor {vid:03d}', 'user_id': base_usuario + n}
+        for n, vid in enumerate(vendedores)
+    ])
+
+    base_produto = (db.session.scalar(db.select(db.func.max(Produto.id))) or 0) + 1
+    catalogo = _produtos(rng, n_produtos)
+    _em_lotes(db, Produto.__table__, [
+        {'id': base_produto + n, 'nome': nome, 'preco_unitario': preco,
+         'quantidade_estoque': rng.randint(0, 500), 'vendedor_id': rng.choice(vendedores)}
+        for n, (nome, preco) in enumerate(catalogo)
+    ])
+
+    # Popularidade: Zipf para produtos, cauda mais suave para vendedores
+    pesos_produto = [1 / (rank + 1) ** 1.1 for rank in range(n_produtos)]
+    pesos_vendedor = [1 / (rank + 1) ** 0.5 for rank in range(n_vendedores)]
+    dias_atras = list(range(dias))
+    pesos_dia = [PESO_DIA_SEMANA[(agora - timedelta(days=d)).weekday()] for d in dias_atras]
+
+    base_venda = (db.session.scalar(db.select(db.func.max(Venda.id))) or 0) + 1
+    base_pagamento = (db.session.scalar(db.select(db.func.max(Pagamento.id))) or 0) + 1
+    total_pagamentos = 0
+    for inicio in range(0, vendas, TAMANHO_LOTE):
+        tamanho = min(TAMANHO_LOTE, vendas - inicio)
+        produtos = rng.choices(range(n_produtos), weights=pesos_produto, k=tamanho)
+        donos = rng.choices(vendedores, weights=pesos_vendedor, k=tamanho)
+        atrasos = rng.choices(dias_atras, weights=pesos_dia, k=tamanho)
+        horas = rng.choices(range(24), weights=PESO_HORA, k=tamanho)
+
+        lote_vendas, lote_pagamentos = [], []
+        for n in range(tamanho):
+            data = (agora - timedelta(days=atrasos[n])).replace(hour=horas[n], minute=rng.randrange(60),
+                                                                 second=rng.randrange(60))
+            data = min(data, agora)
+            preco = catalogo[produtos[n]][1]
+            quantidade = min(10, int(rng.expovariate(0.8)) + 1)
+            total = round(preco * quantidade, 2)
+
+            # Quanto mais antiga, mais provável que já esteja quitada
+            sorteio = rng.random()
+            if sorteio < (0.92 if atrasos[n] > 7 else 0.55):
+                parcelas = [total] if rng.random() < 0.8 else [round(total / 2, 2), total - round(total / 2, 2)]
+            elif sorteio < 0.97:
+                parcelas = [round(total * rng.uniform(0.3, 0.7), 2)]
+            else:
+                parcelas = []
+            pago = round(sum(parcelas), 2)
+
+            venda_id = base_venda + inicio + n
+            lote_vendas.append({
+                'id': venda_id, 'data_venda': data, 'quantidade': quantidade,
+                'preco_unitario': preco, 'valor_total': total, 'valor_pago': pago,
+                'status': 'pago' if pago >= total else 'pendente',
+                'vendedor_id': donos[n], 'produto_id': base_produto + produtos[n],
+            })
+            for parcela in parcelas:
+                lote_pagamentos.append({
+                    'id': base_pagamento + total_pagamentos + len(lote_pagamentos),
+                    'data_pagamento': min(agora, data + timedelta(hours=rng.uniform(0, 72))),
+                    'valor': parcela, 'metodo': rng.choice(METODOS), 'observacao': None,
+                    'venda_id': venda_id, 'vendedor_id': donos[n],
+                })
+        _em_lotes(db, Venda.__table__, lote_vendas)
+        _em_lotes(db, Pagamento.__table__, lote_pagamentos)
+        total_pagamentos += len(lote_pagamentos)
+        db.session.commit()
+
+    reconstruir_metricas()
+    reconstruir_vendas_diarias()
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    return {'usuarios': n_vendedores, 'vendedores': n_vendedores, 'produtos': n_produtos,
+            'vendas': vendas, 'pagamentos': total_pagamentos}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', choices=ESCALAS, default='1k')
+    parser.add_argument('--vendas', type=int, help='número exato de vendas (sobrepõe --escala)')
+    parser.add_argument('--instancia', help='diretório do banco (padrão: temporário)')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--dias', type=int, default=365, help='janela de datas das vendas')
+    args = parser.parse_args()
+
+    from bench import criar_app
+    app = criar_app(args.instancia)
+    inicio = time.perf_counter()
+    with app.app_context():
+        contagens = popular(args.vendas or ESCALAS[args.escala], args.semente, args.dias)
+        banco = app.config['SQLALCHEMY_DATABASE_URI']
+    duracao = time.perf_counter() - inicio
+    print(', '.join(f'{nome}={valor}' for nome, valor in contagens.items()))
+    print(f'{banco} populado em {duracao:.1f}s ({contagens["vendas"] / duracao:.0f} vendas/s)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Vazão de login por custo do bcrypt: ajuda a escolher BCRYPT_LOG_ROUNDS para o hardware.
+
+Para cada custo pedido, cria `--usuarios` vendedores num banco descartável
+(hash gerado nesse custo) e dispara `--clientes` threads fazendo POST
+/auth/login em paralelo durante `--segundos`, como numa troca de turno. Mede
+logins/s, latência p50/p95 e quantos foram recusados por fila cheia (503).
+Ao final confere o rehash: um usuário com hash de custo antigo passa a ter o
+custo configurado depois de logar.
+
+    python -m bench.login --custos 10,11,12,13 --clientes 12
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+def medir(app, custo, args):
+    from extensions import db, bcrypt
+    from models import User
+    from senhas import custo as custo_hash
+
+    app.config['BCRYPT_LOG_ROUNDS'] = custo
+    bcrypt.init_app(app)  # Flask-Bcrypt guarda o custo no init_app
+    prefixo = f'c{custo}'
+    with app.app_context():
+        senha_hash = bcrypt.generate_password_hash('senha123', custo).decode('utf-8')
+        db.session.add_all([User(username=f'{prefixo}_turno{n:03d}', role='vendedor', password_hash=senha_hash)
+                            for n in range(args.usuarios)])
+        # Usuário com hash de custo antigo, para conferir o rehash no login
+        db.session.add(User(username=f'{prefixo}_legado', role='vendedor',
+                            password_hash=bcrypt.generate_password_hash('senha123', 4).decode('utf-8')))
+        db.session.commit()
+
+    tempos, recusados, erros = [], [0], [0]
+    lock = threading.Lock()
+    largada = threading.Barrier(args.clientes)
+    fim = [0.0]
+
+    def cliente(numero):
+        largada.wait()
+        n = numero
+        while time.perf_counter() < fim[0]:
+            username = f'{prefixo}_turno{n % args.usuarios:03d}'
+            n += args.clientes
+            inicio = time.perf_counter()
+            resposta = app.test_client().post('/auth/login', data={'username': username, 'password': 'senha123'})
+            duracao = time.perf_counter() - inicio
+            with lock:
+                if resposta.status_code == 302:
+                    tempos.append(duracao * 1000)
+                elif resposta.status_code == 503:
+                    recusados[0] += 1
+                else:
+                    erros[0] += 1
+
+    fim[0] = time.perf_counter() + args.segundos
+    threads = [threading.Thread(target=cliente, args=(n,)) for n in range(args.clientes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    app.test_client().post('/auth/login', data={'username': f'{prefixo}_legado', 'password': 'senha123'})
+    with app.app_context():
+        rehash = custo_hash(User.query.filter_by(username=f'{prefixo}_legado').one().password_hash)
+
+    tempos.sort()
+    def p(q):
+        return tempos[min(len(tempos) - 1, round(q * (len(tempos) - 1)))] if tempos else 0.0
+    print(f'custo {custo:>2}: {len(tempos) / duracao:7.1f} logins/s  p50 {p(.5):7.1f}ms  p95 {p(.95):7.1f}ms  '
+          f'ok {len(tempos):>5}  503 {recusados[0]:>4}  erros {erros[0]}  rehash 4->{rehash}')
+    return erros[0] == 0 and rehash == custo
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--custos', default='10,11,12', help='custos (log2 das rodadas) separados por vírgula')
+    parser.add_argument('--clientes', type=int, default=12, help='logins simultâneos')
+    parser.add_argument('--usuarios', type=int, default=12)
+    parser.add_argument('--segundos', type=float, default=5)
+    args = parser.parse_args()
+
+    from bench import criar_app
+    app = criar_app(WTF_CSRF_ENABLED=False)
+    app.logger.disabled = True
+
+    print(f'{os.cpu_count()} CPUs, {args.clientes} clientes simultâneos, '
+          f'PASSWORD_HASH_WORKERS={app.config["PASSWORD_HASH_WORKERS"]} '
+          f'PASSWORD_HASH_QUEUE={app.config["PASSWORD_HASH_QUEUE"]}')
+    ok = all([medir(app, int(custo), args) for custo in args.custos.split(',')])
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
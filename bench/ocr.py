@@ -0,0 +1,87 @@
+"""Mede o OCR das notas de fornecedor (páginas/min) com 1..N processos.
+
+Gera páginas sintéticas com cara de nota (código, descrição, quantidade,
+preços) em --lado px, roda ocr.ler_paginas com cada número de processos e
+confere quantos itens o extrair_itens recupera. Precisa de opencv-python,
+pytesseract e do Tesseract com o idioma por; sem cache, cada rodada lê tudo.
+
+    python -m bench.ocr [--paginas 24] [--processos 1,2,4] [--lado 2500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from ocr import OcrIndisponivel, extrair_itens, ler_paginas, verificar_dependencias
+
+PRODUTOS = ['ARROZ BRANCO TIPO 1', 'FEIJAO CARIOCA', 'CAFE TORRADO MOIDO', 'ACUCAR CRISTAL',
+            'OLEO DE SOJA', 'CIGARRO MAÇO BOX', 'ISQUEIRO GRANDE', 'SEDA SLIM', 'REFRIGERANTE COLA',
+            'AGUA MINERAL', 'CHOCOLATE AO LEITE', 'BALA DE MENTA']
+
+def gerar_pagina(caminho, linhas, lado):
+    import cv2
+    import numpy as np
+
+    altura, largura = lado, int(lado * 0.7)
+    imagem = np.full((altura, largura), 255, dtype=np.uint8)
+    escala = lado / 1400
+    itens = []
+    y = int(120 * escala)
+    cv2.putText(imagem, 'NOTA FISCAL - DISTRIBUIDORA EXEMPLO', (int(40 * escala), y),
+                cv2.FONT_HERSHEY_SIMPLEX, escala, 0, max(1, int(2 * escala)))
+    for _ in range(linhas):
+        y += int(50 * escala)
+        descricao = random.choice(PRODUTOS)
+        quantidade = random.randint(1, 48)
+        preco = random.randint(100, 9999) / 100
+        texto = f'{random.randint(1000, 99999)} {descricao} {quantidade} {preco:.2f} {preco * quantidade:.2f}'
+        cv2.putText(imagem, texto.replace('.', ','), (int(40 * escala), y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8 * escala, 0, max(1, int(2 * escala)))
+        itens.append(quantidade)
+    # Ruído leve e um gradiente de iluminação, como numa foto
+    ruido = np.random.normal(0, 12, imagem.shape)
+    sombra = np.linspace(0, 60, largura)[None, :]
+    cv2.imwrite(caminho, np.clip(imagem + ruido - sombra, 0, 255).astype(np.uint8))
+    return itens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=24)
+    parser.add_argument('--linhas', type=int, default=20, help='itens por página')
+    parser.add_argument('--processos', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    parser.add_argument('--lado', type=int, default=2500, help='lado maior das páginas geradas, em px')
+    parser.add_argument('--idioma', default='por')
+    args = parser.parse_args()
+
+    tesseract = os.environ.get('TESSERACT_PATH')
+    try:
+        verificar_dependencias(tesseract)
+    except OcrIndisponivel as e:
+        print(e)
+        return 1
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = [os.path.join(pasta, f'pagina_{i:03d}.png') for i in range(args.paginas)]
+        esperados = sum(len(gerar_pagina(caminho, args.linhas, args.lado)) for caminho in caminhos)
+        print(f'{args.paginas} páginas de {args.lado}px, {esperados} itens, {os.cpu_count()} núcleos')
+
+        base = None
+        for processos in (int(n) for n in args.processos.split(',')):
+            inicio = time.perf_counter()
+            itens = erros = 0
+            for _, texto, _, erro in ler_paginas(caminhos, processos, tesseract, args.idioma):
+                if erro:
+                    erros += 1
+                else:
+                    itens += len(extrair_itens(texto))
+            segundos = time.perf_counter() - inicio
+            ritmo = args.paginas / segundos * 60
+            base = base or ritmo
+            print(f'{processos:>3} processos: {ritmo:7.1f} páginas/min  ({ritmo / base:.2f}x)  '
+                  f'{itens}/{esperados} itens, {erros} erros')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Benchmark das rotas de dashboard e auth pelo test client, com resultado em JSON.
+
+Para cada rota registra latência (média e percentis p50/p90/p95/p99), número
+de consultas SQL (cabeçalho X-Query-Count), status HTTP e pico de memória
+alocada em Python durante uma requisição (tracemalloc, medido numa passada
+separada para não distorcer a latência). As rotas de escrita rodam contra o
+mesmo banco, então use uma instância descartável ou recém-populada.
+
+    python -m bench.rotas --escala 100k
+    python -m bench.rotas --instancia /tmp/tabacaria-100k --comparar bench/resultados/anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from bench import criar_app
+from bench.dados import ESCALAS, SENHA_VENDEDORES, popular
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+# Sessão de cada cenário: 'admin' reaproveita um cliente logado; 'anonimo' e
+# 'nova' criam um cliente por requisição (sem login / com login novo), para o
+# login realmente conferir a senha e o logout sempre ter sessão a encerrar.
+# Um sexto item opcional traz cabeçalhos extras (ex.: If-None-Match).
+
+def cenarios(ids):
+    """(nome, método, url, dados, sessão[, cabeçalhos]) de cada rota; `ids` traz ids válidos do banco"""
+    hoje = datetime.utcnow().date()
+    de = (hoje - timedelta(days=30)).isoformat()
+    return [
+        ('dashboard', 'GET', '/dashboard/', None, 'admin'),
+        ('vendedores', 'GET', '/dashboard/vendedores', None, 'admin'),
+        ('estoque', 'GET', '/dashboard/estoque', None, 'admin'),
+        ('estoque_tabela', 'GET', '/dashboard/estoque/tabela', None, 'admin'),
+        ('estoque_linhas', 'GET', '/dashboard/estoque/tabela/linhas', None, 'admin'),
+        ('estoque_linhas_filtro', 'GET', '/dashboard/estoque/tabela/linhas?q=' + ids['nome_produto'][:3], None, 'admin'),
+        ('estoque_linhas_304', 'GET', '/dashboard/estoque/tabela/linhas', None, 'admin',
+         {'If-None-Match': ids['etag_estoque']}),
+        ('estatisticas', 'GET', '/dashboard/estatisticas', None, 'admin'),
+        ('novo_produto_form', 'GET', '/dashboard/estoque/novo', None, 'admin'),
+        ('importar_estoque_form', 'GET', '/dashboard/estoque/importar', None, 'admin'),
+        ('editar_produto_form', 'GET', f'/dashboard/estoque/editar/{ids["produto"]}', None, 'admin'),
+        ('retirada_form', 'GET', '/dashboard/retirada', None, 'admin'),
+        ('retirada_lote_form', 'GET', '/dashboard/retirada/lote', None, 'admin'),
+        ('pagamento_form', 'GET', '/dashboard/pagamento', None, 'admin'),
+        ('transacoes', 'GET', '/dashboard/transacoes', None, 'admin'),
+        ('transacoes_30d', 'GET', f'/dashboard/transacoes?de={de}&ate={hoje.isoformat()}', None, 'admin'),
+        ('transacoes_pendentes', 'GET', '/dashboard/transacoes?status=pendente', None, 'admin'),
+        ('exportar_vendas_30d', 'GET', f'/dashboard/exportar/vendas.csv?de={de}', None, 'admin'),
+        ('exportar_pagamentos_30d', 'GET', f'/dashboard/exportar/pagamentos.csv?de={de}', None, 'admin'),
+        ('adicionar_vendedor_form', 'GET', '/dashboard/adicionar_vendedor', None, 'admin'),
+        ('busca_produtos', 'GET', '/dashboard/busca/produtos?q=' + ids['nome_produto'][:3], None, 'admin'),
+        ('busca_vendedores', 'GET', '/dashboard/busca/vendedores?q=vend', None, 'admin'),
+        ('busca_vendas_pendentes', 'GET', '/dashboard/busca/vendas-pendentes', None, 'admin'),
+        ('retirada', 'POST', '/dashboard/retirada',
+         {'vendedor': ids['usuario'], 'produto': ids['produto'], 'quantidade': 1}, 'admin'),
+        ('retirada_lote', 'POST', '/dashboard/retirada/lote',
+         {'vendedor': ids['usuario'], 'itens-0-produto': ids['produto'], 'itens-0-quantidade': 1,
+          'itens-1-produto': ids['outro_produto'], 'itens-1-quantidade': 1}, 'admin'),
+        ('pagamento', 'POST', '/dashboard/pagamento',
+         {'venda': ids['venda_pendente'], 'valor': '0.05', 'metodo': 'dinheiro'}, 'admin'),
+        ('editar_produto', 'POST', f'/dashboard/estoque/editar/{ids["produto"]}',
+         {'nome': ids['nome_produto'], 'preco_unitario': ids['preco_produto'], 'quantidade_estoque': 1_000_000}, 'admin'),
+        ('auth_admin', 'GET', '/auth/admin', None, 'admin'),
+        ('auth_register_form', 'GET', '/auth/register', None, 'admin'),
+        ('auth_login_form', 'GET', '/auth/login', None, 'anonimo'),
+        ('auth_login', 'POST', '/auth/login', {'username': ids['username'], 'password': SENHA_VENDEDORES}, 'anonimo'),
+        ('auth_logout', 'GET', '/auth/logout', None, 'nova'),
+    ]
+
+def _ids(db):
+    from models import User, Produto, Venda
+    from metricas import ler_versao, VERSAO_ESTOQUE
+
+    usuario = db.session.execute(
+        db.select(User.id, User.username).where(User.role.in_(['vendedor', 'funcionario'])).order_by(User.id).limit(1)
+    ).one()
+    produtos = db.session.execute(
+        db.select(Produto.id, Produto.nome, Produto.preco_unitario).order_by(Produto.id).limit(2)
+    ).all()
+    venda = db.session.scalar(
+        db.select(Venda.id).where(Venda.status == 'pendente').order_by(Venda.data_venda.desc()).limit(1)
+    )
+    return {
+        'usuario': usuario.id, 'username': usuario.username,
+        'produto': produtos[0].id, 'nome_produto': produtos[0].nome,
+        'preco_produto': f'{produtos[0].preco_unitario:.2f}', 'outro_produto': produtos[1].id,
+        'venda_pendente': venda, 'etag_estoque': f'"estoque-{ler_versao(VERSAO_ESTOQUE)}"',
+    }
+
+def _cliente_logado(app):
+    cliente = app.test_client()
+    resposta = cliente.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    if resposta.status_code != 302:
+        raise SystemExit('Login do admin falhou; o banco tem o usuário admin padrão?')
+    return cliente
+
+def _requisitar(cliente, metodo, url, dados, cabecalhos=None):
+    resposta = cliente.open(url, method=metodo, data=dados, headers=cabecalhos)
+    resposta.get_data()  # consome respostas em streaming (exportações)
+    return resposta
+
+def _percentis(amostras):
+    ordenadas = sorted(amostras)
+    def p(q):
+        return ordenadas[min(len(ordenadas) - 1, round(q / 100 * (len(ordenadas) - 1)))]
+    return {
+        'media_ms': statistics.fmean(ordenadas), 'min_ms': ordenadas[0], 'max_ms': ordenadas[-1],
+        'p50_ms': p(50), 'p90_ms': p(90), 'p95_ms': p(95), 'p99_ms': p(99),
+    }
+
+def medir(app, lista, repeticoes, aquecimento):
+    resultados = {}
+    for nome, metodo, url, dados, sessao, *extra in lista:
+        cabecalhos = extra[0] if extra else None
+        fixo = _cliente_logado(app) if sessao == 'admin' else None
+
+        def cliente():
+            if fixo is not None:
+                return fixo
+            return app.test_client() if sessao == 'anonimo' else _cliente_logado(app)
+
+        for _ in range(aquecimento):
+            _requisitar(cliente(), metodo, url, dados, cabecalhos)
+
+        tempos, consultas, status = [], [], set()
+        for _ in range(repeticoes):
+            atual = cliente()
+            inicio = time.perf_counter()
+            resposta = _requisitar(atual, metodo, url, dados, cabecalhos)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(int(resposta.headers.get('X-Query-Count', -1)))
+            status.add(resposta.status_code)
+
+        atual = cliente()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        _requisitar(atual, metodo, url, dados, cabecalhos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        resultados[nome] = {
+            'metodo': metodo, 'url': url, 'status': sorted(status), 'repeticoes': repeticoes,
+            **{chave: round(valor, 3) for chave, valor in _percentis(tempos).items()},
+            'consultas': max(consultas), 'pico_memoria_kb': round(pico / 1024, 1),
+        }
+        linha = resultados[nome]
+        print(f'{nome:<26} p50 {linha["p50_ms"]:8.2f}ms  p95 {linha["p95_ms"]:8.2f}ms  '
+              f'sql {linha["consultas"]:>3}  mem {linha["pico_memoria_kb"]:>9.1f}KB  {linha["status"]}')
+    return resultados
+
+def comparar(atual, arquivo):
+    with open(arquivo, encoding='utf-8') as f:
+        anterior = json.load(f)['rotas']
+    print(f'\nComparação com {arquivo} (p50 / p95 / consultas):')
+    for nome, linha in atual.items():
+        base = anterior.get(nome)
+        if not base:
+            print(f'{nome:<26} (nova)')
+            continue
+        def delta(chave):
+            return (linha[chave] - base[chave]) / base[chave] * 100 if base[chave] else 0.0
+        print(f'{nome:<26} p50 {delta("p50_ms"):+7.1f}%  p95 {delta("p95_ms"):+7.1f}%  '
+              f'sql {base["consultas"]:>3} -> {linha["consultas"]:<3}')
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', choices=ESCALAS, default='1k', help='tamanho da base gerada')
+    parser.add_argument('--instancia', help='reaproveita o banco deste diretório (já populado com bench.dados)')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--aquecimento', type=int, default=2)
+    parser.add_argument('--rotas', help='nomes separados por vírgula (padrão: todas)')
+    parser.add_argument('--saida', help='arquivo JSON de resultado (padrão: bench/resultados/<escala>-<data>.json)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    # X-Query-Count vem do contador de debug_sql; N+1 só gera aviso, não exceção
+    os.environ['SQL_DEBUG'] = 'True'
+    app = criar_app(args.instancia, WTF_CSRF_ENABLED=False, NPLUSONE_RAISE=False)
+    app.logger.disabled = True  # rotas com template ausente respondem 500 sem poluir a saída
+
+    from extensions import db
+    from models import Venda
+    with app.app_context():
+        if not db.session.scalar(db.select(Venda.id).limit(1)):
+            inicio = time.perf_counter()
+            popular(ESCALAS[args.escala])
+            print(f'Base {args.escala} populada em {time.perf_counter() - inicio:.1f}s')
+        vendas = db.session.scalar(db.select(db.func.count(Venda.id)))
+        ids = _ids(db)
+
+    lista = cenarios(ids)
+    if args.rotas:
+        escolhidas = set(args.rotas.split(','))
+        lista = [cenario for cenario in lista if cenario[0] in escolhidas]
+
+    resultados = medir(app, lista, args.repeticoes, args.aquecimento)
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'vendas': vendas,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'repeticoes': args.repeticoes,
+        'rotas': resultados,
+    }
+    saida = args.saida or os.path.join(
+        DIRETORIO_RESULTADOS, f'rotas-{vendas}-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f'\nResultado salvo em {saida}')
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Tempo de subida de um worker: import do app, create_app e primeira requisição.
+
+Cada medida roda num interpretador novo (como um worker recém-criado) contra
+um banco já preparado com `flask preparar-banco`. Com `--workers N` sobe N
+processos ao mesmo tempo, como num restart do servidor, e mede também o tempo
+até o último ficar pronto. `--importtime` lista os módulos mais caros de
+importar (python -X importtime).
+
+    python -m bench.startup --repeticoes 5 --workers 8
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = '''
+import json, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+aplicacao = app.create_app()
+criado = time.perf_counter()
+status = aplicacao.test_client().get('/auth/login').status_code
+fim = time.perf_counter()
+print(json.dumps({
+    'import_ms': (importado - inicio) * 1000,
+    'create_app_ms': (criado - importado) * 1000,
+    'primeira_requisicao_ms': (fim - criado) * 1000,
+    'pronto_ms': (fim - inicio) * 1000,
+    'status': status,
+}))
+'''
+MEDIDAS = ('import_ms', 'create_app_ms', 'primeira_requisicao_ms', 'pronto_ms', 'processo_ms')
+
+def _ambiente(instancia):
+    return {**os.environ, 'INSTANCE_PATH': instancia}
+
+def _iniciar(instancia):
+    return time.perf_counter(), subprocess.Popen([sys.executable, '-c', WORKER], cwd=RAIZ, env=_ambiente(instancia),
+                                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+def _resultado(inicio, processo):
+    saida, erros = processo.communicate()
+    if processo.returncode != 0:
+        raise SystemExit(f'Worker falhou:\n{erros}')
+    medida = json.loads(saida.strip().splitlines()[-1])
+    medida['processo_ms'] = (time.perf_counter() - inicio) * 1000  # inclui subir o interpretador
+    return medida
+
+def _resumo(rotulo, medidas):
+    partes = [f'{nome[:-3]} {statistics.median(m[nome] for m in medidas):7.1f}ms' for nome in MEDIDAS]
+    print(f'{rotulo:<14} ' + '  '.join(partes) + f'  status {sorted({m["status"] for m in medidas})}')
+
+def importtime(instancia, limite):
+    """Módulos com maior tempo próprio de import ao carregar app.py"""
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=RAIZ,
+                           env=_ambiente(instancia), capture_output=True, text=True).stderr
+    linhas = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, modulo = linha[len('import time:'):].split('|')
+        linhas.append((int(proprio), int(acumulado), modulo.strip()))
+    total = max(acumulado for _, acumulado, modulo in linhas if modulo == 'app')
+    print(f'\nimport app: {total / 1000:.1f}ms no total; maiores tempos próprios:')
+    for proprio, acumulado, modulo in sorted(linhas, reverse=True)[:limite]:
+        print(f'  {proprio / 1000:7.1f}ms  (acumulado {acumulado / 1000:7.1f}ms)  {modulo}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5, help='workers subidos um de cada vez')
+    parser.add_argument('--workers', type=int, default=0, help='workers subindo ao mesmo tempo (0 = não medir)')
+    parser.add_argument('--importtime', type=int, default=15, metavar='N', help='módulos listados (0 = não listar)')
+    parser.add_argument('--instancia', help='banco já preparado a usar (padrão: um temporário)')
+    args = parser.parse_args()
+
+    instancia = os.path.abspath(args.instancia) if args.instancia else tempfile.mkdtemp(prefix='tabacaria-startup-')
+    # Preparar é passo de deploy: fica fora da medida
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'preparar-banco'], cwd=RAIZ,
+                   env=_ambiente(instancia), check=True, capture_output=True)
+
+    _resumo('sequencial', [_resultado(*_iniciar(instancia)) for _ in range(args.repeticoes)])
+
+    if args.workers:
+        inicio = time.perf_counter()
+        processos = [_iniciar(instancia) for _ in range(args.workers)]
+        medidas = [_resultado(*p) for p in processos]
+        _resumo(f'{args.workers} simultâneos', medidas)
+        print(f'{"":<14} todos prontos em {(time.perf_counter() - inicio) * 1000:.1f}ms')
+
+    if args.importtime:
+        importtime(instancia, args.importtime)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload, raiseload
+from extensions import db
+from models import User, Produto, Venda
+from paginacao import paginar
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+PAPEIS_VENDEDOR = ('vendedor', 'funcionario')
+
+def limitar(valor):
+    """Converte o parâmetro ?limite= para o intervalo [1, LIMITE_MAXIMO]"""
+    try:
+        return max(1, min(LIMITE_MAXIMO, int(valor)))
+    except (TypeError, ValueError):
+        return LIMITE_PADRAO
+
+def _faixa_prefixo(coluna, prefixo):
+    """coluna >= prefixo AND coluna < prefixo seguinte: usa o índice, ao contrário de LIKE"""
+    seguinte = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    return (coluna >= prefixo, coluna < seguinte)
+
+def _prefixo_sem_caixa(minusculo, texto):
+    """Filtro "começa com `texto`" sobre `minusculo` = lower(coluna).
+
+    O lower() do SQLite só converte A-Z, e o str.lower() do Python converte
+    também os acentos: a faixa só vale para texto ASCII. Com acentos a busca
+    cai para LIKE, que não usa o índice mas compara do mesmo jeito que o banco.
+    """
+    if texto.isascii():
+        return _faixa_prefixo(minusculo, texto.lower())
+    escapado = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return (minusculo.like(escapado + '%', escape='\\'),)
+
+def _apos_cursor(consulta, chave, coluna_id, cursor):
+    """Keyset: linhas depois de (chave, id) do cursor "id:chave"; cursor inválido é ignorado"""
+    if cursor:
+        try:
+            ultimo_id, ultima_chave = cursor.split(':', 1)
+            return consulta.where(tuple_(chave, coluna_id) > tuple_(ultima_chave, int(ultimo_id)))
+        except ValueError:
+            pass
+    return consulta
+
+def rotulo_produto(nome, estoque):
+    return f'{nome} (Estoque: {estoque or 0})'
+
+def rotulo_venda(id, produto, saldo):
+    return f'Venda #{id} - {produto or "Produto removido"} - Saldo: R$ {saldo:.2f}'
+
+def buscar_produtos(texto='', cursor=None, limite=LIMITE_PADRAO):
+    """Produtos cujo nome começa com `texto` (sem diferenciar maiúsculas), em ordem alfabética"""
+    nome = db.func.lower(Produto.nome)
+    consulta = db.select(Produto.id, Produto.nome, Produto.quantidade_estoque, nome.label('chave'))
+    if texto.strip():
+        consulta = consulta.where(*_prefixo_sem_caixa(nome, texto.strip()))
+    consulta = _apos_cursor(consulta, nome, Produto.id, cursor)
+    linhas = db.session.execute(consulta.order_by(nome, Produto.id).limit(limite + 1)).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = f'{linhas[-1].id}:{linhas[-1].chave}'
+    return [{'id': p.id, 'texto': rotulo_produto(p.nome, p.quantidade_estoque),
+             'estoque': p.quantidade_estoque or 0} for p in linhas], proximo
+
+def pagina_estoque(texto='', cursor=None, limite=LIMITE_MAXIMO):
+    """Uma página da tabela de estoque (produtos com vendedor), na mesma ordem de buscar_produtos"""
+    nome = db.func.lower(Produto.nome)
+    consulta = db.select(Produto, nome.label('chave')).options(joinedload(Produto.vendedor), raiseload('*'))
+    if texto.strip():
+        consulta = consulta.where(*_prefixo_sem_caixa(nome, texto.strip()))
+    consulta = _apos_cursor(consulta, nome, Produto.id, cursor)
+    linhas = db.session.execute(consulta.order_by(nome, Produto.id).limit(limite + 1)).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        # chave calculada pelo banco: o lower() do SQLite difere do Python fora do ASCII
+        proximo = f'{linhas[-1].Produto.id}:{linhas[-1].chave}'
+    return [linha.Produto for linha in linhas], proximo
+
+def buscar_vendedores(texto='', cursor=None, limite=LIMITE_PADRAO):
+    """Usuários que podem retirar mercadoria, por prefixo do username"""
+    consulta = db.select(User.id, User.username).where(User.role.in_(PAPEIS_VENDEDOR))
+    if texto.strip():
+        consulta = consulta.where(*_faixa_prefixo(User.username, texto.strip()))
+    consulta = _apos_cursor(consulta, User.username, User.id, cursor)
+    linhas = db.session.execute(consulta.order_by(User.username, User.id).limit(limite + 1)).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = f'{linhas[-1].id}:{linhas[-1].username}'
+    return [{'id': u.id, 'texto': u.username} for u in linhas], proximo
+
+def consulta_vendas_pendentes():
+    """Vendas pendentes com o saldo calculado no banco (sem carregar as entidades)"""
+    saldo = (Venda.valor_total - db.func.coalesce(Venda.valor_pago, 0)).label('saldo')
+    return (
+        db.session.query(Venda.id, Venda.data_venda, Produto.nome.label('produto'), saldo)
+        .outerjoin(Produto, Venda.produto_id == Produto.id)
+        .filter(Venda.status == 'pendente')
+    )
+
+def buscar_vendas_pendentes(texto='', cursor=None, limite=LIMITE_PADRAO):
+    """Vendas pendentes mais recentes primeiro; `texto` é o número da venda ou o início do nome do produto"""
+    consulta = consulta_vendas_pendentes()
+    texto = texto.strip().lstrip('#')
+    if texto.isdigit():
+        consulta = consulta.filter(Venda.id == int(texto))
+    elif texto:
+        consulta = consulta.filter(*_prefixo_sem_caixa(db.func.lower(Produto.nome), texto))
+    vendas, proximo = paginar(consulta, Venda.data_venda, Venda.id, cursor, limite)
+    return [{'id': v.id, 'texto': rotulo_venda(v.id, v.produto, v.saldo), 'saldo': float(v.saldo)}
+            for v in vendas], proximo
+
+# Opções dos selects no POST: só os valores enviados, se ainda forem válidos.
+# Assim o SelectField continua recusando ids inexistentes sem carregar a lista toda.
+
+def ids_enviados(*campos):
+    ids = set()
+    for campo in campos:
+        for valor in campo.raw_data or ():
+            if str(valor).isdigit():
+                ids.add(int(valor))
+    return ids
+
+def opcoes_produtos(ids):
+    if not ids:
+        return []
+    return [(p.id, rotulo_produto(p.nome, p.quantidade_estoque)) for p in db.session.execute(
+        db.select(Produto.id, Produto.nome, Produto.quantidade_estoque).where(Produto.id.in_(ids))
+    )]
+
+def opcoes_vendedores(ids):
+    if not ids:
+        return []
+    return [(u.id, u.username) for u in db.session.execute(
+        db.select(User.id, User.username).where(User.id.in_(ids), User.role.in_(PAPEIS_VENDEDOR))
+    )]
+
+def opcoes_vendas_pendentes(ids):
+    if not ids:
+        return []
+    return [(v.id, rotulo_venda(v.id, v.produto, v.saldo))
+            for v in consulta_vendas_pendentes().filter(Venda.id.in_(ids))]
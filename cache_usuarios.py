@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import Blueprint, jsonify, flash, redirect, url_for
+from flask_login import login_required, current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+
+class UsuarioSessao:
+    """Registro leve e somente leitura do usuário logado (o que o current_user expõe).
+
+    Substitui a instância ORM de User nas requisições autenticadas: não fica
+    presa a uma sessão do SQLAlchemy e pode ser compartilhado entre threads.
+    """
+    __slots__ = ('id', 'username', 'role')
+
+    def __init__(self, id, username, role):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'role', role)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError('UsuarioSessao é somente leitura')
+
+    # Interface exigida pelo Flask-Login
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, outro):
+        return hasattr(outro, 'get_id') and self.get_id() == outro.get_id()
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UsuarioSessao {self.id} {self.username!r} {self.role}>'
+
+class CacheUsuarios:
+    """Cache LRU com TTL dos usuários logados, por processo.
+
+    Alterações em User feitas neste processo invalidam a entrada no commit;
+    nos demais workers a entrada expira em no máximo `ttl` segundos.
+    """
+
+    def __init__(self, tamanho=1024, ttl=60):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = self.falhas = self.invalidacoes = 0
+
+    def obter(self, user_id, carregar):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(user_id)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(user_id)
+                self.acertos += 1
+                return item[1]
+            self.falhas += 1
+
+        usuario = carregar(user_id)
+        if usuario is not None and self.ttl > 0:
+            with self._lock:
+                self._itens[user_id] = (agora + self.ttl, usuario)
+                self._itens.move_to_end(user_id)
+                while len(self._itens) > self.tamanho:
+                    self._itens.popitem(last=False)
+        return usuario
+
+    def invalidar(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._itens.pop(user_id, None) is not None:
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens), 'tamanho': self.tamanho, 'ttl': self.ttl,
+                'acertos': self.acertos, 'falhas': self.falhas, 'invalidacoes': self.invalidacoes,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            }
+
+cache = CacheUsuarios()
+
+def _buscar(user_id):
+    from models import User
+    linha = db.session.execute(
+        db.select(User.id, User.username, User.role).where(User.id == user_id)
+    ).one_or_none()
+    return UsuarioSessao(*linha) if linha else None
+
+def carregar_usuario(user_id):
+    """user_loader do Flask-Login: memória na maioria das requisições, banco só na falta"""
+    return cache.obter(user_id, _buscar)
+
+def _marcar_alterado(mapper, connection, usuario):
+    session = Session.object_session(usuario)
+    if session is not None:
+        session.info.setdefault('usuarios_alterados', set()).add(usuario.id)
+
+def _invalidar_no_commit(session):
+    alterados = session.info.pop('usuarios_alterados', None)
+    if alterados:
+        cache.invalidar(*alterados)
+
+def _descartar(session, *args):
+    session.info.pop('usuarios_alterados', None)
+
+bp = Blueprint('cache_usuarios', __name__, url_prefix='/admin/cache-usuarios')
+
+@bp.route('/')
+@login_required
+def estatisticas():
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+    return jsonify(cache.estatisticas())
+
+def init_cache_usuarios(app):
+    """Configura o cache do user_loader e a invalidação por alterações em User"""
+    from models import User
+
+    cache.tamanho = app.config.get('USER_CACHE_SIZE', 1024)
+    cache.ttl = app.config.get('USER_CACHE_TTL', 60)
+
+    # Troca de papel/senha (ou exclusão) invalida a entrada só depois do commit,
+    # para uma requisição concorrente não recolocar no cache o valor antigo
+    for nome, funcao in (('after_update', _marcar_alterado), ('after_delete', _marcar_alterado)):
+        if not event.contains(User, nome, funcao):
+            event.listen(User, nome, funcao)
+    for nome, funcao in (('after_commit', _invalidar_no_commit), ('after_rollback', _descartar)):
+        if not event.contains(Session, nome, funcao):
+            event.listen(Session, nome, funcao)
+
+    app.register_blueprint(bp)
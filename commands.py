@@ -0,0 +1,114 @@
+import click
+from extensions import db
+
+def register_commands(app):
+    """Registra os comandos de linha de comando (flask <comando>)"""
+
+    @app.cli.command('preparar-banco')
+    @click.option('--senha-admin', envvar='ADMIN_PASSWORD', default='admin123', show_default=True,
+                  help='Senha do admin padrão, se ele ainda não existir (ou ADMIN_PASSWORD).')
+    def preparar_banco(senha_admin):
+        """Cria pastas, tabelas e o admin padrão (uma vez por deploy, antes dos workers)."""
+        from provisionamento import preparar
+
+        resultado = preparar(app, senha_admin)
+        click.echo('Banco novo criado e marcado na última migração' if resultado['banco_novo']
+                   else 'Tabelas conferidas')
+        click.echo('✅ Admin padrão criado' if resultado['admin_criado'] else 'Admin já existe')
+
+    @app.cli.command('recalcular-metricas')
+    def recalcular_metricas():
+        """Reconstrói do zero as métricas do dashboard."""
+        from metricas import reconstruir_metricas
+
+        valores = reconstruir_metricas()
+        db.session.commit()
+        for nome, valor in valores.items():
+            click.echo(f'{nome}: {valor}')
+
+    @app.cli.command('reconstruir-vendas-diarias')
+    @click.option('--de', type=click.DateTime(['%Y-%m-%d']), help='Primeiro dia (AAAA-MM-DD); omitido = desde o início.')
+    @click.option('--ate', type=click.DateTime(['%Y-%m-%d']), help='Último dia, inclusive (AAAA-MM-DD); omitido = até hoje.')
+    def reconstruir_vendas_diarias(de, ate):
+        """Preenche ou repara o rollup vendas_diarias num intervalo de dias."""
+        from datetime import timedelta
+        from vendas_diarias import reconstruir_vendas_diarias as reconstruir
+
+        linhas = reconstruir(de, ate + timedelta(days=1) if ate else None)
+        db.session.commit()
+        click.echo(f'{linhas} linhas gravadas em vendas_diarias')
+
+    @app.cli.command('baixar-assets')
+    def baixar_assets():
+        """Baixa Bootstrap, Font Awesome e as fontes para static/vendor (uma vez, com rede)."""
+        from assets import baixar_bibliotecas
+
+        for caminho in baixar_bibliotecas(app.static_folder):
+            click.echo(caminho)
+
+    @app.cli.command('construir-assets')
+    @click.option('--limpar', is_flag=True, help='Apaga os builds anteriores em vez de mantê-los.')
+    def construir_assets(limpar):
+        """Gera static/dist com nomes por hash, .gz/.br e manifest.json."""
+        from assets import BibliotecasAusentes, construir
+
+        try:
+            manifesto, brotli = construir(app.static_folder, limpar)
+        except BibliotecasAusentes as e:
+            raise click.ClickException(str(e))
+        click.echo(f'{len(manifesto)} arquivos em static/dist')
+        if not brotli:
+            click.echo('Pacote brotli não instalado: só versões .gz foram geradas')
+
+    @app.cli.command('processar-tarefas')
+    @click.option('--uma-vez', is_flag=True, help='Executa as pendentes e sai (para cron) em vez de ficar esperando.')
+    def processar_tarefas(uma_vez):
+        """Executa tarefas em segundo plano neste processo (workers web com TAREFAS_WORKERS=0)."""
+        from tarefas import executor
+
+        executadas = executor.processar(app, continuo=not uma_vez)
+        click.echo(f'{executadas} tarefas executadas')
+
+    @app.cli.command('limpar-tarefas')
+    def limpar_tarefas():
+        """Apaga tarefas vencidas (TAREFAS_RETENCAO) e marca as abandonadas como falhas."""
+        from tarefas import limpar_vencidas, marcar_abandonadas
+
+        click.echo(f'{marcar_abandonadas(app.config["TAREFAS_ABANDONO"])} abandonadas')
+        click.echo(f'{limpar_vencidas(app.config["TAREFAS_RETENCAO"])} apagadas')
+
+    @app.cli.command('snapshot-estoque')
+    def snapshot_estoque():
+        """Grava agora um snapshot do razão do estoque (normalmente feito na manutenção das tarefas)."""
+        from movimentacoes import tirar_snapshot
+
+        click.echo(f'{tirar_snapshot()} produtos no snapshot')
+
+    @app.cli.command('estoque-em')
+    @click.argument('momento', type=click.DateTime(['%Y-%m-%d %H:%M', '%Y-%m-%d']))
+    def estoque_em(momento):
+        """Estoque de cada produto em MOMENTO (UTC; AAAA-MM-DD = início do dia), pelo razão."""
+        from movimentacoes import estoque_em
+        from models import Produto
+        from extensions import db
+
+        saldos = estoque_em(momento)
+        nomes = dict(db.session.execute(db.select(Produto.id, Produto.nome).where(Produto.id.in_(saldos))).all())
+        for produto_id, saldo in sorted(saldos.items()):
+            click.echo(f'{produto_id}\t{saldo}\t{nomes.get(produto_id, "(excluído)")}')
+
+    @app.cli.command('conciliar-estoque')
+    @click.option('--corrigir', is_flag=True, help='Grava um ajuste no razão para cada divergência.')
+    def conciliar_estoque(corrigir):
+        """Confere o razão do estoque contra Produto.quantidade_estoque (código 1 se divergir)."""
+        from movimentacoes import conciliar
+
+        divergencias = conciliar(corrigir=corrigir)
+        for produto_id, nome, saldo, atual in divergencias:
+            click.echo(f'#{produto_id} {nome or "(excluído)"}: razão {saldo}, estoque {atual}')
+        if not divergencias:
+            click.echo('Razão e estoque conferem')
+        elif corrigir:
+            click.echo(f'{len(divergencias)} ajustes gravados')
+        else:
+            raise SystemExit(1)
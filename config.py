@@ -9,6 +9,105 @@ class Config:
     INSTANCE_PATH = os.path.join(BASE_DIR, os.getenv('INSTANCE_PATH', 'instance'))
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(INSTANCE_PATH, 'tabacaria.db')
 
+    # Perfil SQLite para vários workers: PRAGMAs aplicados a cada nova conexão
+    # (ver extensions.configure_sqlite). Em WAL leitores não bloqueiam escritores
+    # e vice-versa; busy_timeout faz escritores concorrentes esperarem em vez de
+    # falharem com "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 10000)),  # ms
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # negativo = KiB
+        'temp_store': 'MEMORY',
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('SQLALCHEMY_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('SQLALCHEMY_MAX_OVERFLOW', 10)),
+        'pool_timeout': 30,
+        'connect_args': {'check_same_thread': False},
+    }
+
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+    # Armazenamento por conteúdo (arquivos.py): UPLOAD_FOLDER/ab/cd/<sha256>.<ext>.
+    # O upload é gravado em blocos em UPLOAD_TEMP e só depois movido para lá.
+    UPLOAD_TEMP = os.path.join(BASE_DIR, 'temp_uploads')
+    UPLOAD_MAX_BYTES = MAX_CONTENT_LENGTH  # por arquivo
+    UPLOAD_MINIATURAS = os.path.join(UPLOAD_FOLDER, 'miniaturas')
+    UPLOAD_LADOS_MINIATURA = (160, 480)  # px; só esses tamanhos são gerados
+    UPLOAD_MAX_AGE = 365 * 24 * 3600  # o conteúdo de uma URL nunca muda
+
+    # Paginação por cursor da página de transações
+    TRANSACOES_POR_PAGINA = int(os.getenv('TRANSACOES_POR_PAGINA', 50))
+
+    # Contador de SQL por request e detector de N+1 (sempre ativo em debug/teste)
+    SQL_DEBUG = os.getenv('SQL_DEBUG', 'False') == 'True'
+    NPLUSONE_THRESHOLD = 1  # Cargas preguiçosas toleradas por relacionamento
+    # N+1 acima do limite: True levanta NPlusOneError, False só registra no log;
+    # None (padrão) levanta em TESTING e registra nos demais modos
+    NPLUSONE_RAISE = None
+
+    # Profiling por request (Server-Timing + requests mais lentos em /admin/profiling)
+    PROFILING = os.getenv('PROFILING', 'False') == 'True'
+    PROFILING_SLOWEST = int(os.getenv('PROFILING_SLOWEST', 50))
+
+    # Janela (em dias) dos gráficos do dashboard e das estatísticas
+    ANALYTICS_JANELA_DIAS = int(os.getenv('ANALYTICS_JANELA_DIAS', 30))
+
+    # Cache por processo do usuário logado (user_loader); TTL 0 desativa
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # segundos
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+
+    # Custo do bcrypt (log2 das rodadas): hashes com outro custo são refeitos no
+    # próximo login. Medir com python -m bench.login antes de mudar.
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # Pool de hashing: threads de bcrypt, pedidos aguardando e prazo (segundos)
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+    # Assets do build (flask construir-assets): nomes com hash do conteúdo, .gz/.br
+    # e cache imutável. Desligar no desenvolvimento para editar CSS/JS sem rebuild.
+    ASSETS_USE_BUILD = os.getenv('ASSETS_USE_BUILD', 'True') == 'True'
+    ASSETS_URL_PREFIX = '/assets'
+
+    # Feed ao vivo (SSE em /eventos/): as conexões de cada worker são servidas
+    # por uma thread que lê a tabela eventos a cada EVENTOS_INTERVALO segundos
+    EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', 1.0))
+    EVENTOS_HEARTBEAT = 15  # segundos entre comentários de keep-alive
+    EVENTOS_DURACAO = int(os.getenv('EVENTOS_DURACAO', 300))  # vida de uma conexão; o navegador reconecta
+    EVENTOS_RETRY = 3  # segundos até o navegador reconectar
+    EVENTOS_MAX_CONEXOES = int(os.getenv('EVENTOS_MAX_CONEXOES', 50))  # por worker (cada uma ocupa uma thread)
+    EVENTOS_FILA = 100  # eventos pendentes por conexão antes de derrubá-la
+    EVENTOS_RETENCAO = int(os.getenv('EVENTOS_RETENCAO', 3600))  # segundos de histórico para reconexões
+
+    # Tarefas em segundo plano (importação, exportação, recálculos; ver tarefas.py).
+    # TAREFAS_WORKERS threads por worker web; com 0 as tarefas só rodam em
+    # `flask processar-tarefas`, num processo separado.
+    TAREFAS_WORKERS = int(os.getenv('TAREFAS_WORKERS', 2))
+    TAREFAS_INTERVALO = float(os.getenv('TAREFAS_INTERVALO', 2.0))  # segundos entre consultas à fila
+    TAREFAS_PASTA = os.path.join(INSTANCE_PATH, 'tarefas')  # entrada e resultado, uma pasta por tarefa
+    TAREFAS_RETENCAO = int(os.getenv('TAREFAS_RETENCAO', 7 * 24 * 3600))  # segundos até apagar as finalizadas
+    TAREFAS_ABANDONO = 600  # segundos sem progresso até uma tarefa em execução ser dada como perdida
+
+    # Snapshots do razão do estoque (movimentacoes.py), tirados na manutenção
+    # das tarefas: o que vier primeiro, idade ou movimentações acumuladas
+    ESTOQUE_SNAPSHOT_INTERVALO = int(os.getenv('ESTOQUE_SNAPSHOT_INTERVALO', 24 * 3600))  # segundos
+    ESTOQUE_SNAPSHOT_A_CADA = int(os.getenv('ESTOQUE_SNAPSHOT_A_CADA', 5000))  # movimentações
+
+    # Sincronização dos caixas offline (/sync/): linhas alteradas por resposta,
+    # operações por envio e por quanto tempo uma chave de idempotência vale
+    SYNC_LOTE = int(os.getenv('SYNC_LOTE', 5000))
+    SYNC_MAX_OPERACOES = int(os.getenv('SYNC_MAX_OPERACOES', 1000))
+    SYNC_RETENCAO_CHAVES = int(os.getenv('SYNC_RETENCAO_CHAVES', 30 * 24 * 3600))  # segundos
+
+    # OCR de notas de fornecedor (notas.py): Tesseract num pool de processos
+    # iniciado por tarefa. TESSERACT_PATH só se o executável não estiver no PATH.
+    OCR_PROCESSOS = int(os.getenv('OCR_PROCESSOS', os.cpu_count() or 1))
+    OCR_TESSERACT = os.getenv('TESSERACT_PATH')
+    OCR_IDIOMA = os.getenv('OCR_IDIOMA', 'por')
+    OCR_LADO_MAXIMO = int(os.getenv('OCR_LADO_MAXIMO', 2500))  # px; imagens maiores são reduzidas
+    OCR_MAX_ARQUIVOS = 200  # imagens por envio
@@ -1,27 +1,17 @@
 from app import create_app
 from extensions import db
 from models import User, Vendedor
+from provisionamento import preparar
 
 def init_db():
+    """Equivale a `flask preparar-banco`, mais o vendedor vinculado ao admin"""
     app = create_app()
+    preparar(app)
     with app.app_context():
-        db.create_all()
-        
-        if not User.query.filter_by(username='admin').first():
-            admin = User(
-                username='admin',
-                role='admin'
-            )
-            admin.set_password('admin123')
-            
-            vendedor_admin = Vendedor(
-                nome="Administrador",
-                user=admin
-            )
-            
-            db.session.add(admin)
-            db.session.add(vendedor_admin)
+        admin = User.query.filter_by(username='admin').one()
+        if not Vendedor.query.filter_by(user_id=admin.id).first():
+            db.session.add(Vendedor(nome="Administrador", user=admin))
             db.session.commit()
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
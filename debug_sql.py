@@ -0,0 +1,68 @@
+import logging
+from collections import Counter
+from flask import g, has_request_context, current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+class NPlusOneError(RuntimeError):
+    """Um relacionamento foi carregado de forma preguiçosa repetidas vezes no mesmo request"""
+
+def _estado():
+    if not has_request_context():
+        return None
+    if '_sql_debug' not in g:
+        g._sql_debug = {'consultas': 0, 'lazy': Counter()}
+    return g._sql_debug
+
+def contar_consultas():
+    """Número de comandos SQL executados até agora no request atual"""
+    estado = _estado()
+    return estado['consultas'] if estado else 0
+
+def _detectar_lazy(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    estado = _estado()
+    if estado is None:
+        return
+    caminho = orm_execute_state.loader_strategy_path
+    estado['lazy'][str(caminho[-1]) if caminho else '?'] += 1
+
+def init_sql_debug(app):
+    """Ativa o contador de SQL por request e o detector de N+1 (modo debug/teste)"""
+    if not (app.config.get('SQL_DEBUG') or app.debug or app.testing):
+        return
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        estado = _estado()
+        if estado is not None:
+            estado['consultas'] += 1
+
+    if not event.contains(Session, 'do_orm_execute', _detectar_lazy):
+        event.listen(Session, 'do_orm_execute', _detectar_lazy)
+
+    @app.after_request
+    def _verificar(response):
+        estado = _estado()
+        if estado is None:
+            return response
+
+        response.headers['X-Query-Count'] = str(estado['consultas'])
+
+        limite = current_app.config.get('NPLUSONE_THRESHOLD', 1)
+        repetidos = {rel: n for rel, n in estado['lazy'].items() if n > limite}
+        if repetidos:
+            detalhes = ', '.join(f'{rel} ({n}x)' for rel, n in repetidos.items())
+            mensagem = f'Carregamento preguiçoso repetido em {request.endpoint or request.path}: {detalhes}'
+            levantar = current_app.config.get('NPLUSONE_RAISE')
+            if current_app.testing if levantar is None else levantar:
+                raise NPlusOneError(mensagem)
+            logger.warning(mensagem)
+        return response
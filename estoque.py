@@ -0,0 +1,220 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import update, insert, case
+from extensions import db
+from models import Produto, Venda, Pagamento
+from metricas import incrementar, incrementar_versao, VERSAO_HISTORICO, VERSAO_VENDAS, VERSAO_ESTOQUE
+from vendas_diarias import acumular_vendas, acumular_pagamento
+from eventos import publicar
+from movimentacoes import registrar_movimentacoes, registrar_movimentacao, RETIRADA, ENTRADA
+
+class EstoqueInsuficiente(ValueError):
+    """O produto não existe ou não tem estoque suficiente para a retirada"""
+
+class PagamentoInvalido(ValueError):
+    """A venda não existe ou o valor passa do saldo pendente"""
+
+def baixar_estoque(produto_id, quantidade):
+    """Decrementa o estoque de forma atômica e retorna (preco_unitario, nome, quantidade_estoque).
+
+    A checagem e a escrita acontecem num único UPDATE condicional, então dois
+    workers nunca conseguem vender a mesma unidade. Não faz commit.
+    """
+    produto = db.session.execute(
+        update(Produto)
+        .where(Produto.id == produto_id, Produto.quantidade_estoque >= quantidade)
+        .values(quantidade_estoque=Produto.quantidade_estoque - quantidade)
+        .returning(Produto.preco_unitario, Produto.nome, Produto.quantidade_estoque)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if produto is None:
+        raise EstoqueInsuficiente(f'Estoque insuficiente para o produto #{produto_id}')
+    return produto
+
+def _publicar_retirada(venda_id, produto_id, nome, quantidade, preco, valor_total, data_venda, restante):
+    """Nova venda pendente e o estoque que sobrou, para o feed ao vivo"""
+    publicar('venda', id=venda_id, produto_id=produto_id, produto=nome, quantidade=quantidade,
+             preco_unitario=preco, valor_total=valor_total, valor_pago=0, status='pendente',
+             data_venda=data_venda)
+    publicar('estoque', produto_id=produto_id, quantidade_estoque=restante)
+
+def registrar_retirada(vendedor_id, produto_id, quantidade):
+    """Baixa o estoque e cria a venda pendente correspondente (sem commit)"""
+    produto = baixar_estoque(produto_id, quantidade)
+    preco = produto.preco_unitario
+    valor_total = quantidade * float(preco)
+
+    venda = Venda(
+        data_venda=datetime.utcnow(),
+        quantidade=quantidade,
+        preco_unitario=preco,
+        valor_total=valor_total,
+        vendedor_id=vendedor_id,
+        produto_id=produto_id,
+        status='pendente'
+    )
+    db.session.add(venda)
+    incrementar(total_estoque=-valor_total,
+                vendas_pendentes=1,
+                saldo_total=valor_total)
+    incrementar_versao(VERSAO_VENDAS)
+    incrementar_versao(VERSAO_ESTOQUE)
+    acumular_vendas([{
+        'data_venda': venda.data_venda,
+        'vendedor_id': vendedor_id,
+        'produto_id': produto_id,
+        'quantidade': quantidade,
+        'valor_total': valor_total,
+    }])
+    db.session.flush()  # id da venda para o feed ao vivo e o razão
+    registrar_movimentacao(produto_id, -quantidade, produto.quantidade_estoque, RETIRADA, venda.id)
+    _publicar_retirada(venda.id, produto_id, produto.nome, quantidade, preco, valor_total,
+                       venda.data_venda, produto.quantidade_estoque)
+    return venda
+
+def registrar_retirada_lote(vendedor_id, itens, data_venda=None):
+    """Retira vários produtos de uma vez (carrinho) numa única transação.
+
+    `itens` é uma sequência de (produto_id, quantidade); linhas repetidas do
+    mesmo produto são somadas. `data_venda` (padrão: agora) serve às retiradas
+    feitas offline e enviadas depois pelo caixa. O estoque de todos os itens é conferido numa
+    consulta, a baixa é um único UPDATE com CASE e as vendas entram num
+    INSERT em lote. Se qualquer item faltar, levanta EstoqueInsuficiente e o
+    chamador deve fazer rollback: ou tudo é gravado, ou nada. Não faz commit.
+    """
+    quantidades = Counter()
+    for produto_id, quantidade in itens:
+        quantidades[produto_id] += quantidade
+    if not quantidades:
+        return []
+
+    produtos = {
+        p.id: p for p in db.session.execute(
+            db.select(Produto.id, Produto.nome, Produto.preco_unitario, Produto.quantidade_estoque)
+            .where(Produto.id.in_(quantidades))
+        )
+    }
+    faltando = [
+        produtos[pid].nome if pid in produtos else f'#{pid}'
+        for pid, quantidade in quantidades.items()
+        if pid not in produtos or (produtos[pid].quantidade_estoque or 0) < quantidade
+    ]
+    if faltando:
+        raise EstoqueInsuficiente(f'Estoque insuficiente: {", ".join(faltando)}')
+
+    # A condição repete a checagem no próprio UPDATE: outro worker pode ter
+    # vendido entre a consulta acima e a escrita.
+    baixa = case(quantidades, value=Produto.id)
+    restantes = dict(db.session.execute(
+        update(Produto)
+        .where(Produto.id.in_(quantidades), Produto.quantidade_estoque >= baixa)
+        .values(quantidade_estoque=Produto.quantidade_estoque - baixa)
+        .returning(Produto.id, Produto.quantidade_estoque)
+        .execution_options(synchronize_session=False)
+    ).all())
+    if len(restantes) != len(quantidades):
+        raise EstoqueInsuficiente('Estoque alterado durante a retirada, tente novamente')
+
+    agora = data_venda or datetime.utcnow()
+    linhas = [{
+        'data_venda': agora,
+        'quantidade': quantidade,
+        'preco_unitario': produtos[pid].preco_unitario,
+        'valor_total': quantidade * float(produtos[pid].preco_unitario),
+        'vendedor_id': vendedor_id,
+        'produto_id': pid,
+        'status': 'pendente',
+    } for pid, quantidade in quantidades.items()]
+    venda_ids = db.session.scalars(
+        insert(Venda).returning(Venda.id, sort_by_parameter_order=True), linhas
+    ).all()
+
+    valor_total = sum(linha['valor_total'] for linha in linhas)
+    incrementar(total_estoque=-valor_total,
+                vendas_pendentes=len(linhas),
+                saldo_total=valor_total)
+    incrementar_versao(VERSAO_VENDAS)
+    incrementar_versao(VERSAO_ESTOQUE)
+    if agora < datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0):
+        incrementar_versao(VERSAO_HISTORICO)  # retirada offline de outro dia: muda janelas já fechadas
+    acumular_vendas(linhas)
+    registrar_movimentacoes([{
+        'produto_id': linha['produto_id'], 'quantidade': -linha['quantidade'],
+        'saldo': restantes[linha['produto_id']], 'motivo': RETIRADA, 'venda_id': venda_id,
+    } for venda_id, linha in zip(venda_ids, linhas)])
+    for venda_id, linha in zip(venda_ids, linhas):
+        pid = linha['produto_id']
+        _publicar_retirada(venda_id, pid, produtos[pid].nome, linha['quantidade'], linha['preco_unitario'],
+                           linha['valor_total'], agora, restantes[pid])
+    return venda_ids
+
+def registrar_pagamento(venda_id, valor, metodo, data_pagamento=None):
+    """Abate `valor` do saldo da venda e cria o Pagamento (sem commit).
+
+    Como em baixar_estoque, a checagem do saldo e a escrita são um único
+    UPDATE condicional: dois pagamentos simultâneos da mesma venda nunca
+    passam do total. Levanta PagamentoInvalido se não couber no saldo.
+    """
+    # Valores em REAL no SQLite: arredondar antes de comparar (59,00 - 49,10 != 9,90)
+    pago = db.func.round(Venda.valor_pago + valor, 2)
+    total = db.func.round(Venda.valor_total, 2)
+    venda = db.session.execute(
+        update(Venda)
+        .where(Venda.id == venda_id, pago <= total)
+        .values(valor_pago=pago, status=case((pago >= total, 'pago'), else_=Venda.status))
+        .returning(Venda.id, Venda.data_venda, Venda.vendedor_id, Venda.produto_id,
+                   Venda.valor_total, Venda.valor_pago, Venda.status)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if venda is None:
+        raise PagamentoInvalido(f'Valor excede o saldo pendente da venda #{venda_id}')
+
+    pagamento = Pagamento(
+        data_pagamento=data_pagamento or datetime.utcnow(),
+        valor=valor,
+        metodo=metodo,
+        venda_id=venda.id,
+        vendedor_id=venda.vendedor_id
+    )
+    db.session.add(pagamento)
+    incrementar(saldo_total=-valor,
+                vendas_pendentes=-1 if venda.status == 'pago' else 0)
+    incrementar_versao(VERSAO_VENDAS)
+    acumular_pagamento(venda, valor)
+    db.session.flush()  # id do pagamento para o feed ao vivo
+    publicar('pagamento', id=pagamento.id, venda_id=venda.id, valor=valor, metodo=metodo,
+             data_pagamento=pagamento.data_pagamento, valor_pago=venda.valor_pago,
+             saldo=float(venda.valor_total) - float(venda.valor_pago), status=venda.status)
+    return pagamento
+
+def repor_estoque(itens, motivo=ENTRADA):
+    """Soma quantidades ao estoque (entrada de mercadoria) numa transação, sem commit.
+
+    `itens` é uma sequência de (produto_id, quantidade); repetidos são somados.
+    Um único UPDATE com CASE; produtos que não existem mais são ignorados.
+    Retorna {produto_id: estoque resultante} dos produtos atualizados.
+    """
+    quantidades = Counter()
+    for produto_id, quantidade in itens:
+        quantidades[produto_id] += quantidade
+    if not quantidades:
+        return {}
+
+    entrada = case(quantidades, value=Produto.id)
+    linhas = db.session.execute(
+        update(Produto)
+        .where(Produto.id.in_(quantidades))
+        .values(quantidade_estoque=db.func.coalesce(Produto.quantidade_estoque, 0) + entrada)
+        .returning(Produto.id, Produto.quantidade_estoque, Produto.preco_unitario)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not linhas:
+        return {}
+
+    incrementar(total_estoque=sum(quantidades[l.id] * float(l.preco_unitario) for l in linhas))
+    incrementar_versao(VERSAO_ESTOQUE)
+    registrar_movimentacoes([{'produto_id': linha.id, 'quantidade': quantidades[linha.id],
+                             'saldo': linha.quantidade_estoque, 'motivo': motivo} for linha in linhas])
+    for linha in linhas:
+        publicar('estoque', produto_id=linha.id, quantidade_estoque=linha.quantidade_estoque)
+    return {linha.id: linha.quantidade_estoque for linha in linhas}
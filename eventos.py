@@ -0,0 +1,228 @@
+import json
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import Blueprint, Response, current_app, request
+from flask_login import login_required
+from sqlalchemy import event, delete
+from sqlalchemy.orm import Session
+from extensions import db
+
+# Feed ao vivo (Server-Sent Events). As escritas chamam publicar() dentro da
+# própria transação; no commit as alterações viram uma linha em `eventos`, que
+# é o "broker" compartilhado entre os workers. Em cada processo uma única
+# thread lê as linhas novas e repassa às conexões SSE abertas: conexões
+# ociosas só esperam numa fila, sem consultar o banco.
+
+LIMITE_REPLAY = 500  # atraso maior que isso: o cliente recarrega a página
+LIMPEZA_A_CADA = 500  # commits com eventos entre duas limpezas da tabela
+
+def _json(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f'{type(valor).__name__} não é serializável')
+
+def publicar(tipo, **dados):
+    """Agenda uma alteração para o feed; só é gravada se a transação corrente fizer commit"""
+    db.session.info.setdefault('eventos', []).append({'tipo': tipo, **dados})
+
+def ultimo_evento():
+    """Id do evento mais recente (0 se não houver): o cursor inicial de uma página"""
+    from models import Evento
+    return db.session.scalar(db.select(db.func.max(Evento.id))) or 0
+
+class Assinatura:
+    """Uma conexão SSE: fila limitada; `ativa` cai para False se o cliente atrasar"""
+    __slots__ = ('fila', 'ativa')
+
+    def __init__(self, tamanho):
+        self.fila = queue.Queue(tamanho)
+        self.ativa = True
+
+class Difusor:
+    """Lê os eventos novos do banco e distribui às assinaturas deste processo.
+
+    A thread só consulta o banco enquanto houver conexões abertas, uma vez por
+    `intervalo` (ou logo após um commit com eventos neste mesmo processo).
+    """
+
+    def __init__(self, intervalo=1.0, max_conexoes=50, tamanho_fila=100, retencao=3600):
+        self.configurar(intervalo, max_conexoes, tamanho_fila, retencao)
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._ultimo = None
+        self._commits = 0
+
+    def configurar(self, intervalo, max_conexoes, tamanho_fila, retencao):
+        self.intervalo = intervalo
+        self.max_conexoes = max_conexoes
+        self.tamanho_fila = tamanho_fila
+        self.retencao = retencao
+
+    def assinar(self, app, cursor):
+        """Nova assinatura a partir de `cursor` (último id já entregue); None se lotado"""
+        with self._lock:
+            if len(self._assinaturas) >= self.max_conexoes:
+                return None
+            if self._ultimo is None:
+                self._ultimo = cursor
+            assinatura = Assinatura(self.tamanho_fila)
+            self._assinaturas.add(assinatura)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._laco, args=(app,), name='eventos', daemon=True)
+                self._thread.start()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+            if not self._assinaturas:
+                self._ultimo = None  # sem ouvintes não há o que acompanhar
+
+    def acordar(self):
+        self._acordar.set()
+
+    def conexoes(self):
+        with self._lock:
+            return len(self._assinaturas)
+
+    def _laco(self, app):
+        from models import Evento
+
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            with self._lock:
+                ultimo = self._ultimo
+            if ultimo is None:
+                continue
+            with app.app_context():
+                linhas = db.session.execute(
+                    db.select(Evento.id, Evento.dados).where(Evento.id > ultimo)
+                    .order_by(Evento.id).limit(LIMITE_REPLAY)
+                ).all()
+            if not linhas:
+                continue
+            with self._lock:
+                if self._ultimo is None:
+                    continue
+                self._ultimo = max(self._ultimo, linhas[-1].id)
+                assinaturas = list(self._assinaturas)
+            for assinatura in assinaturas:
+                for linha in linhas:
+                    try:
+                        assinatura.fila.put_nowait((linha.id, linha.dados))
+                    except queue.Full:
+                        assinatura.ativa = False  # o cliente reconecta e recupera pelo Last-Event-ID
+                        break
+            if len(linhas) == LIMITE_REPLAY:
+                self._acordar.set()
+
+    def contar_commit(self):
+        """True a cada LIMPEZA_A_CADA commits com eventos: hora de apagar os antigos"""
+        with self._lock:
+            self._commits += 1
+            return self._commits % LIMPEZA_A_CADA == 0
+
+difusor = Difusor()
+
+def _gravar_no_commit(session):
+    alteracoes = session.info.pop('eventos', None)
+    if not alteracoes:
+        return
+    from models import Evento
+    session.add(Evento(dados=json.dumps(alteracoes, default=_json, separators=(',', ':'))))
+    if difusor.contar_commit():
+        limite = datetime.utcnow() - timedelta(seconds=difusor.retencao)
+        session.execute(delete(Evento).where(Evento.criado_em < limite))
+    session.info['eventos_gravados'] = True
+
+def _avisar_apos_commit(session):
+    if session.info.pop('eventos_gravados', None):
+        difusor.acordar()
+
+def _descartar(session, *args):
+    session.info.pop('eventos', None)
+    session.info.pop('eventos_gravados', None)
+
+def _mensagem(id, dados, tipo='alteracoes'):
+    return f'id: {id}\nevent: {tipo}\ndata: {dados}\n\n'
+
+bp = Blueprint('eventos', __name__, url_prefix='/eventos')
+
+@bp.route('/')
+@login_required
+def fluxo():
+    """text/event-stream com as alterações posteriores a ?desde= (ou ao Last-Event-ID)"""
+    from models import Evento
+
+    config = current_app.config
+    try:
+        desde = int(request.headers.get('Last-Event-ID') or request.args['desde'])
+    except (KeyError, ValueError):
+        desde = ultimo_evento()
+
+    # Assina antes de ler o que o cliente perdeu: o que a thread do difusor
+    # publicar daqui em diante cai na fila, o que já passou vem na consulta
+    # abaixo, e o que aparecer nas duas é descartado pelo id em gerar()
+    assinatura = difusor.assinar(current_app._get_current_object(), desde)
+    if assinatura is None:
+        return Response('Muitas conexões ao vivo neste worker', status=503,
+                        headers={'Retry-After': str(config['EVENTOS_DURACAO'])})
+
+    # Alterações que o cliente perdeu (reconexão ou página renderizada há pouco)
+    try:
+        pendentes = db.session.execute(
+            db.select(Evento.id, Evento.dados).where(Evento.id > desde).order_by(Evento.id)
+            .limit(LIMITE_REPLAY + 1)
+        ).all()
+    except Exception:
+        difusor.cancelar(assinatura)
+        raise
+    if len(pendentes) > LIMITE_REPLAY:
+        difusor.cancelar(assinatura)
+        return Response(_mensagem(pendentes[-1].id, '{}', 'recarregar'), mimetype='text/event-stream')
+    cursor = pendentes[-1].id if pendentes else desde
+
+    heartbeat = config['EVENTOS_HEARTBEAT']
+    duracao = config['EVENTOS_DURACAO']
+
+    def gerar():
+        ultimo = cursor
+        fim = time.monotonic() + duracao
+        try:
+            yield f'retry: {int(config["EVENTOS_RETRY"] * 1000)}\n\n'
+            for linha in pendentes:
+                yield _mensagem(linha.id, linha.dados)
+            # Conexões têm vida limitada: o navegador reconecta sozinho com o
+            # Last-Event-ID, e a thread do worker não fica presa para sempre
+            while time.monotonic() < fim and assinatura.ativa:
+                try:
+                    id, dados = assinatura.fila.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': ping\n\n'  # mantém proxies abertos e detecta cliente desconectado
+                    continue
+                if id > ultimo:
+                    ultimo = id
+                    yield _mensagem(id, dados)
+        finally:
+            difusor.cancelar(assinatura)
+
+    return Response(gerar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def init_eventos(app):
+    """Configura o difusor, grava os eventos publicados no commit e registra /eventos"""
+    difusor.configurar(app.config['EVENTOS_INTERVALO'], app.config['EVENTOS_MAX_CONEXOES'],
+                       app.config['EVENTOS_FILA'], app.config['EVENTOS_RETENCAO'])
+    for nome, funcao in (('before_commit', _gravar_no_commit), ('after_commit', _avisar_apos_commit),
+                         ('after_rollback', _descartar)):
+        if not event.contains(Session, nome, funcao):
+            event.listen(Session, nome, funcao)
+    app.register_blueprint(bp)
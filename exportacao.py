@@ -0,0 +1,101 @@
+import csv
+import io
+from datetime import timedelta
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import Produto, Vendedor, Venda, Pagamento
+from paginacao import filtrar_periodo, intervalo_datas
+from tarefas import tarefa
+
+TAMANHO_LOTE = 1000
+
+def _decimal(valor):
+    """Formata valores monetários no padrão brasileiro (vírgula decimal)"""
+    return '' if valor is None else f'{valor:.2f}'.replace('.', ',')
+
+def _data(valor):
+    return valor.strftime('%Y-%m-%d %H:%M:%S') if valor else ''
+
+def consulta_vendas(inicio=None, fim=None):
+    consulta = (
+        db.select(Venda.id, Venda.data_venda, Produto.nome, Vendedor.nome,
+                  Venda.quantidade, Venda.preco_unitario, Venda.valor_total,
+                  Venda.valor_pago, Venda.status)
+        .outerjoin(Produto, Venda.produto_id == Produto.id)
+        .outerjoin(Vendedor, Venda.vendedor_id == Vendedor.id)
+        .order_by(Venda.data_venda, Venda.id)
+    )
+    return filtrar_periodo(consulta, Venda.data_venda, inicio, fim)
+
+def consulta_pagamentos(inicio=None, fim=None):
+    produto_venda = aliased(Produto)
+    consulta = (
+        db.select(Pagamento.id, Pagamento.data_pagamento, Pagamento.venda_id,
+                  produto_venda.nome, Vendedor.nome, Pagamento.valor,
+                  Pagamento.metodo, Pagamento.observacao)
+        .outerjoin(Venda, Pagamento.venda_id == Venda.id)
+        .outerjoin(produto_venda, Venda.produto_id == produto_venda.id)
+        .outerjoin(Vendedor, Pagamento.vendedor_id == Vendedor.id)
+        .order_by(Pagamento.data_pagamento, Pagamento.id)
+    )
+    return filtrar_periodo(consulta, Pagamento.data_pagamento, inicio, fim)
+
+EXPORTACOES = {
+    'vendas': (
+        consulta_vendas,
+        ['id', 'data_venda', 'produto', 'vendedor', 'quantidade', 'preco_unitario',
+         'valor_total', 'valor_pago', 'saldo', 'status'],
+        lambda r: [r[0], _data(r[1]), r[2] or '', r[3] or '', r[4], _decimal(r[5]),
+                   _decimal(r[6]), _decimal(r[7]), _decimal((r[6] or 0) - (r[7] or 0)), r[8]],
+    ),
+    'pagamentos': (
+        consulta_pagamentos,
+        ['id', 'data_pagamento', 'venda_id', 'produto', 'vendedor', 'valor', 'metodo', 'observacao'],
+        lambda r: [r[0], _data(r[1]), r[2], r[3] or '', r[4] or '', _decimal(r[5]),
+                   r[6] or '', r[7] or ''],
+    ),
+}
+
+def gerar_csv(tipo, inicio=None, fim=None):
+    """Gera o CSV em pedaços de TAMANHO_LOTE linhas, lendo do banco em lotes.
+
+    O cursor é lido com yield_per (stream_results), então a memória fica
+    constante independente do número de linhas exportadas.
+    """
+    consulta, cabecalho, formatar = EXPORTACOES[tipo]
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+
+    buffer.write('﻿')  # BOM para o Excel reconhecer UTF-8
+    escritor.writerow(cabecalho)
+    resultado = db.session.execute(
+        consulta(inicio, fim).execution_options(yield_per=TAMANHO_LOTE)
+    )
+    for lote in resultado.partitions():
+        escritor.writerows(formatar(linha) for linha in lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def nome_exportacao(tipo, inicio=None, fim=None):
+    """Nome do arquivo a partir das datas já convertidas (nada do texto recebido vai para o cabeçalho)"""
+    ultimo = fim - timedelta(days=1) if fim is not None else None
+    return '_'.join([tipo] + [data.strftime('%Y-%m-%d') for data in (inicio, ultimo) if data is not None]) + '.csv'
+
+@tarefa('exportar_csv', 'Exportação CSV')
+def tarefa_exportar_csv(contexto, tipo, de='', ate=''):
+    """gerar_csv gravado na pasta da tarefa, com progresso a cada lote"""
+    if tipo not in EXPORTACOES:
+        raise ValueError(f'Exportação desconhecida: {tipo}')
+    inicio, fim = intervalo_datas(de, ate)
+    consulta = EXPORTACOES[tipo][0](inicio, fim).order_by(None)
+    total = db.session.scalar(db.select(db.func.count()).select_from(consulta.subquery()))
+    linhas = -1  # o cabeçalho não conta
+    with open(contexto.caminho('resultado.csv'), 'w', encoding='utf-8', newline='') as arquivo:
+        for pedaco in gerar_csv(tipo, inicio, fim):
+            arquivo.write(pedaco)
+            linhas += pedaco.count('\r\n')  # terminador de linha do csv.writer
+            contexto.progresso(linhas, total)
+    contexto.entregar('resultado.csv', nome_exportacao(tipo, inicio, fim))
+    return {'linhas': linhas}
@@ -1,24 +1,50 @@
+import os
 from flask import current_app
+from sqlalchemy import event
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-from flask_migrate import Migrate  # Nova importação
 
 # Inicialização das extensões
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
-migrate = Migrate()  # Instância do Migrate
 
 def allowed_file(filename):
     """Verifica se a extensão do arquivo é permitida"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config.get('ALLOWED_EXTENSIONS', set())
 
+def configure_sqlite(app):
+    """Aplica os PRAGMAs de SQLITE_PRAGMAS em cada nova conexão SQLite"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engine = db.engine
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            # journal_mode é persistente no arquivo; trocar exige lock exclusivo
+            if nome == 'journal_mode' and \
+                    cursor.execute('PRAGMA journal_mode').fetchone()[0].lower() == str(valor).lower():
+                continue
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+
+def init_migrate(app):
+    """Registra o Flask-Migrate no app (uma vez por app)"""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
 def configure_extensions(app):
     """Configura todas as extensões do Flask"""
     # Configuração do SQLAlchemy
     db.init_app(app)
+    configure_sqlite(app)
     
     # Configuração do Bcrypt
     bcrypt.init_app(app)
@@ -28,11 +54,13 @@ def configure_extensions(app):
     login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
     
-    # Configuração do Flask-Migrate
-    migrate.init_app(app, db)  # Configuração importante
+    # Flask-Migrate só na linha de comando (flask db ...): o import do alembic
+    # custa ~200 ms e os workers nunca usam
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        init_migrate(app)
     
-    # Carregador de usuário
+    # Carregador de usuário (cache por processo, ver cache_usuarios)
     @login_manager.user_loader
     def load_user(user_id):
-        from models import User  # Importação local para evitar circular imports
-        return User.query.get(int(user_id))
\ No newline at end of file
+        from cache_usuarios import carregar_usuario  # Importação local para evitar circular imports
+        return carregar_usuario(int(user_id))
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SelectField, IntegerField, DecimalField, SubmitField
+from flask_wtf.file import FileField, MultipleFileField, FileRequired, FileAllowed
+from wtforms import Form, FieldList, FormField, StringField, PasswordField, SelectField, IntegerField, DecimalField, SubmitField
 from wtforms.validators import DataRequired, Length, EqualTo, NumberRange
 
 class LoginForm(FlaskForm):
@@ -17,6 +18,14 @@ class RetiradaForm(FlaskForm):
     produto = SelectField('Produto', coerce=int, validators=[DataRequired()])
     quantidade = IntegerField('Quantidade', validators=[DataRequired(), NumberRange(min=1)])
 
+class ItemRetiradaForm(Form):
+    produto = SelectField('Produto', coerce=int, validators=[DataRequired()])
+    quantidade = IntegerField('Quantidade', validators=[DataRequired(), NumberRange(min=1)])
+
+class RetiradaLoteForm(FlaskForm):
+    vendedor = SelectField('Vendedor', coerce=int, validators=[DataRequired()])
+    itens = FieldList(FormField(ItemRetiradaForm), min_entries=1, max_entries=100)
+
 class PagamentoForm(FlaskForm):
     venda = SelectField('Venda Pendente', coerce=int, validators=[DataRequired()])
     valor = DecimalField('Valor do Pagamento', places=2, validators=[DataRequired(), NumberRange(min=0.01)])
@@ -30,4 +39,12 @@ class ProdutoForm(FlaskForm):
 
 class VendedorForm(FlaskForm):
     nome = StringField('Nome Completo', validators=[DataRequired()])
-    submit = SubmitField('Salvar Vendedor')
\ No newline at end of file
+    submit = SubmitField('Salvar Vendedor')
+
+class ImportarProdutosForm(FlaskForm):
+    arquivo = FileField('Arquivo (CSV ou XLSX)', validators=[FileRequired(), FileAllowed(['csv', 'xlsx'], 'Envie um arquivo CSV ou XLSX')])
+    submit = SubmitField('Importar')
+
+class NotasFornecedorForm(FlaskForm):
+    arquivos = MultipleFileField('Fotos das notas (JPG ou PNG)', validators=[FileAllowed(['jpg', 'jpeg', 'png'], 'Envie fotos JPG ou PNG')])
+    submit = SubmitField('Ler notas')
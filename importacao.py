@@ -0,0 +1,211 @@
+import csv
+import time
+from sqlalchemy import insert, update
+from extensions import db
+from models import Produto, Vendedor
+from metricas import incrementar, incrementar_versao, VERSAO_ESTOQUE
+from eventos import publicar
+from movimentacoes import registrar_movimentacoes, IMPORTACAO
+from tarefas import tarefa
+
+COLUNAS_OBRIGATORIAS = ('nome', 'preco_unitario', 'quantidade_estoque')
+COLUNA_OPCIONAL = 'vendedor_id'
+EXTENSOES = ('csv', 'xlsx')
+MAX_ERROS = 500  # Erros listados no relatório (o total é sempre contado)
+
+class ArquivoInvalido(ValueError):
+    """O arquivo não pode ser lido ou não tem as colunas esperadas"""
+
+def _detectar_separador(arquivo):
+    amostra = arquivo.read(4096).decode('utf-8-sig', errors='ignore')
+    arquivo.seek(0)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=',;\t').delimiter
+    except csv.Error:
+        return ','
+
+def _lotes_xlsx(arquivo, tamanho):
+    import pandas as pd
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ArquivoInvalido('Importação de XLSX requer o pacote openpyxl')
+
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = [str(c).strip().lower() if c is not None else '' for c in next(linhas, [])]
+    lote, inicio = [], 0
+    for linha in linhas:
+        lote.append(['' if v is None else str(v) for v in linha])
+        if len(lote) == tamanho:
+            yield pd.DataFrame(lote, columns=cabecalho, index=range(inicio, inicio + len(lote)))
+            inicio += len(lote)
+            lote = []
+    if lote:
+        yield pd.DataFrame(lote, columns=cabecalho, index=range(inicio, inicio + len(lote)))
+
+def ler_em_lotes(arquivo, nome_arquivo, tamanho=1000):
+    """Lê o CSV/XLSX em DataFrames de até `tamanho` linhas, tudo como texto"""
+    import pandas as pd
+
+    extensao = nome_arquivo.rsplit('.', 1)[-1].lower() if '.' in nome_arquivo else ''
+    if extensao == 'xlsx':
+        yield from _lotes_xlsx(arquivo, tamanho)
+    elif extensao == 'csv':
+        separador = _detectar_separador(arquivo)
+        for lote in pd.read_csv(arquivo, sep=separador, chunksize=tamanho, dtype=str,
+                                keep_default_na=False, encoding='utf-8-sig'):
+            lote.columns = [c.strip().lower() for c in lote.columns]
+            if separador == ';' and 'preco_unitario' in lote.columns:
+                # Planilhas brasileiras: ';' como separador e ',' como decimal
+                lote['preco_unitario'] = lote['preco_unitario'].str.replace(',', '.', regex=False)
+            yield lote
+    else:
+        raise ArquivoInvalido(f'Formato não suportado: .{extensao} (use {", ".join(EXTENSOES)})')
+
+def _validar(lote, vendedores_validos):
+    """Separa as linhas válidas das inválidas; retorna (DataFrame válido, erros)"""
+    import pandas as pd
+
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in lote.columns]
+    if faltando:
+        raise ArquivoInvalido(f'Colunas obrigatórias ausentes: {", ".join(faltando)}')
+
+    dados = pd.DataFrame(index=lote.index)
+    dados['nome'] = lote['nome'].str.strip()
+    dados['preco_unitario'] = pd.to_numeric(lote['preco_unitario'].str.strip(), errors='coerce').round(2)
+    quantidade = pd.to_numeric(lote['quantidade_estoque'].str.strip(), errors='coerce')
+    dados['quantidade_estoque'] = quantidade
+    if COLUNA_OPCIONAL in lote.columns:
+        vendedor = lote[COLUNA_OPCIONAL].str.strip()
+        dados['vendedor_id'] = pd.to_numeric(vendedor, errors='coerce')
+        vendedor_invalido = (vendedor != '') & ~dados['vendedor_id'].isin(vendedores_validos)
+    else:
+        dados['vendedor_id'] = float('nan')
+        vendedor_invalido = pd.Series(False, index=lote.index)
+
+    checagens = [
+        (dados['nome'] == '', 'nome vazio'),
+        (dados['nome'].str.len() > 100, 'nome com mais de 100 caracteres'),
+        (dados['preco_unitario'].isna() | (dados['preco_unitario'] <= 0), 'preco_unitario inválido'),
+        (quantidade.isna() | (quantidade < 0) | (quantidade % 1 != 0), 'quantidade_estoque inválida'),
+        (vendedor_invalido, 'vendedor_id inexistente'),
+    ]
+    invalido = pd.Series(False, index=lote.index)
+    erros = []
+    for mascara, mensagem in checagens:
+        novos = mascara & ~invalido
+        # Linha 1 é o cabeçalho
+        erros.extend((int(indice) + 2, mensagem) for indice in lote.index[novos])
+        invalido |= mascara
+
+    validos = dados[~invalido].drop_duplicates('nome', keep='last')
+    return validos, erros
+
+def _gravar(validos):
+    """Upsert por nome com statements em lote; retorna (inseridos, atualizados)"""
+    existentes = {}
+    for id, nome, quantidade, preco in db.session.execute(
+        db.select(Produto.id, Produto.nome, Produto.quantidade_estoque, Produto.preco_unitario)
+        .where(Produto.nome.in_(validos['nome'].tolist()))
+        .order_by(Produto.id.desc())
+    ):
+        # Nomes repetidos no catálogo: atualiza o produto mais antigo
+        existentes[nome] = (id, quantidade or 0, preco)
+
+    novos, atualizacoes = [], {True: [], False: []}
+    movimentos = []
+    delta_estoque = 0.0
+    for linha in validos.itertuples(index=False):
+        registro = {
+            'nome': linha.nome,
+            'preco_unitario': float(linha.preco_unitario),
+            'quantidade_estoque': int(linha.quantidade_estoque),
+        }
+        tem_vendedor = linha.vendedor_id == linha.vendedor_id  # NaN != NaN
+        if tem_vendedor:
+            registro['vendedor_id'] = int(linha.vendedor_id)
+        delta_estoque += registro['quantidade_estoque'] * registro['preco_unitario']
+
+        if linha.nome in existentes:
+            id, quantidade, preco = existentes[linha.nome]
+            delta_estoque -= quantidade * float(preco)
+            # executemany exige o mesmo conjunto de colunas em cada lote
+            atualizacoes[tem_vendedor].append({'id': id, **registro})
+            # A variação vem da leitura acima: uma retirada entre ela e o UPDATE
+            # aparece como divergência em `flask conciliar-estoque`
+            movimentos.append({'produto_id': id, 'quantidade': registro['quantidade_estoque'] - quantidade,
+                               'saldo': registro['quantidade_estoque'], 'motivo': IMPORTACAO})
+        else:
+            novos.append(registro)
+
+    if novos:
+        ids = db.session.scalars(insert(Produto).returning(Produto.id, sort_by_parameter_order=True), novos).all()
+        movimentos.extend({'produto_id': id, 'quantidade': registro['quantidade_estoque'],
+                           'saldo': registro['quantidade_estoque'], 'motivo': IMPORTACAO}
+                          for id, registro in zip(ids, novos))
+    for lote in atualizacoes.values():
+        if lote:
+            db.session.execute(update(Produto), lote)
+    registrar_movimentacoes(movimentos)
+
+    incrementar(total_produtos=len(novos), total_estoque=delta_estoque)
+    if novos or atualizacoes[True] or atualizacoes[False]:
+        incrementar_versao(VERSAO_ESTOQUE)
+        # Muitas linhas de uma vez: o feed só avisa, a tabela recarrega
+        publicar('catalogo', inseridos=len(novos), atualizados=len(atualizacoes[True]) + len(atualizacoes[False]))
+    return len(novos), len(atualizacoes[True]) + len(atualizacoes[False])
+
+def importar_produtos(arquivo, nome_arquivo, tamanho_lote=1000, progresso=None):
+    """Importa o catálogo em lotes, com um commit por lote.
+
+    Linhas inválidas não interrompem a importação: são listadas no relatório
+    com o número da linha no arquivo. Produtos são casados pelo nome; os já
+    cadastrados têm preço, estoque (e vendedor, se informado) substituídos.
+    `progresso(linhas lidas)` é chamado depois de cada lote, fora da transação.
+    """
+    inicio = time.perf_counter()
+    relatorio = {'linhas': 0, 'inseridos': 0, 'atualizados': 0, 'total_erros': 0, 'erros': []}
+    vendedores_validos = set(db.session.scalars(db.select(Vendedor.id)))
+
+    try:
+        for lote in ler_em_lotes(arquivo, nome_arquivo, tamanho_lote):
+            validos, erros = _validar(lote, vendedores_validos)
+            relatorio['linhas'] += len(lote)
+            relatorio['total_erros'] += len(erros)
+            relatorio['erros'].extend(erros[:MAX_ERROS - len(relatorio['erros'])])
+            if not validos.empty:
+                inseridos, atualizados = _gravar(validos)
+                db.session.commit()
+                relatorio['inseridos'] += inseridos
+                relatorio['atualizados'] += atualizados
+            if progresso:
+                progresso(relatorio['linhas'])
+    except (UnicodeDecodeError, ValueError) as e:
+        db.session.rollback()
+        if isinstance(e, ArquivoInvalido):
+            raise
+        raise ArquivoInvalido(f'Não foi possível ler o arquivo: {e}')
+
+    relatorio['segundos'] = time.perf_counter() - inicio
+    relatorio['linhas_por_segundo'] = relatorio['linhas'] / relatorio['segundos'] if relatorio['segundos'] else 0
+    return relatorio
+
+def arquivo_de_entrada(nome_arquivo):
+    """Nome do upload na pasta da tarefa (do original só a extensão é mantida)"""
+    return 'entrada.' + nome_arquivo.rsplit('.', 1)[-1].lower()
+
+def _contar_linhas(arquivo):
+    """Linhas de dados de um CSV (sem o cabeçalho), para o total do progresso"""
+    linhas = sum(bloco.count(b'\n') for bloco in iter(lambda: arquivo.read(1 << 20), b''))
+    arquivo.seek(0)
+    return max(linhas - 1, 0)
+
+@tarefa('importar_produtos', 'Importação de catálogo')
+def tarefa_importar_produtos(contexto, nome_arquivo):
+    """importar_produtos em segundo plano. Cancelada, mantém os lotes já gravados."""
+    with open(contexto.caminho(arquivo_de_entrada(nome_arquivo)), 'rb') as arquivo:
+        total = _contar_linhas(arquivo) if nome_arquivo.lower().endswith('.csv') else None
+        contexto.progresso(0, total, f'Importando {nome_arquivo}')
+        return importar_produtos(arquivo, nome_arquivo,
+                                 progresso=lambda linhas: contexto.progresso(linhas, total))
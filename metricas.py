@@ -0,0 +1,99 @@
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db
+from models import Metrica, Produto, Venda
+from eventos import publicar
+
+# Métricas do dashboard, mantidas incrementalmente (uma linha por métrica)
+METRICAS = ('total_produtos', 'vendas_pendentes', 'saldo_total', 'total_estoque')
+CONTADORES = {'total_produtos', 'vendas_pendentes'}
+
+# Contadores de versão: só crescem e servem para invalidar caches (não entram
+# em reconstruir_metricas, já que não são derivados das tabelas)
+VERSAO_VENDAS = 'versao_vendas'
+VERSAO_ESTOQUE = 'versao_estoque'  # ETag dos fragmentos da tabela de estoque
+VERSAO_HISTORICO = 'versao_historico'  # escritas que mudam dias passados (cache de janelas fechadas)
+
+def calcular_metricas():
+    """Calcula todas as métricas a partir das tabelas de origem (varredura completa)"""
+    return {
+        'total_produtos': Produto.query.count(),
+        'vendas_pendentes': Venda.query.filter_by(status='pendente').count(),
+        'saldo_total': db.session.query(
+            db.func.sum(Venda.valor_total - Venda.valor_pago)
+        ).scalar() or 0,
+        'total_estoque': db.session.query(
+            db.func.sum(Produto.quantidade_estoque * Produto.preco_unitario)
+        ).scalar() or 0,
+    }
+
+def _gravar_metricas(valores, sobrescrever):
+    """Grava as linhas num único upsert: dois workers reconstruindo juntos não colidem na chave"""
+    comando = insert(Metrica).values([{'nome': nome, 'valor': valor} for nome, valor in valores.items()])
+    if sobrescrever:
+        comando = comando.on_conflict_do_update(index_elements=[Metrica.nome], set_={'valor': comando.excluded.valor})
+    else:
+        comando = comando.on_conflict_do_nothing()
+    db.session.execute(comando)
+
+def reconstruir_metricas():
+    """Recalcula as linhas de métricas na transação corrente (sem commit)"""
+    valores = calcular_metricas()
+    _gravar_metricas(valores, sobrescrever=True)
+    return valores
+
+def incrementar(**deltas):
+    """Aplica deltas às métricas na mesma transação da escrita que os originou.
+
+    Os valores resultantes vão para o feed ao vivo: valores absolutos, e não
+    deltas, para que reaplicar um evento não altere o card duas vezes.
+    """
+    novos = {}
+    for nome, delta in deltas.items():
+        if not delta:
+            continue
+        valor = db.session.execute(
+            update(Metrica)
+            .where(Metrica.nome == nome)
+            .values(valor=Metrica.valor + delta)
+            .returning(Metrica.valor)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if valor is not None:
+            novos[nome] = valor
+    if novos:
+        publicar('metricas', **novos)
+
+def ler_metricas(*nomes):
+    """Lê as métricas pedidas (todas por padrão) sem varrer as tabelas de origem.
+
+    Se alguma linha ainda não existir (banco novo ou tabela limpa), ela é
+    calculada e gravada uma vez e as leituras seguintes voltam a ser O(1).
+    Linhas que outro request gravou no meio tempo prevalecem.
+    """
+    nomes = nomes or METRICAS
+
+    def ler():
+        return dict(db.session.query(Metrica.nome, Metrica.valor).filter(Metrica.nome.in_(nomes)))
+
+    linhas = ler()
+    if len(linhas) < len(nomes):
+        _gravar_metricas(calcular_metricas(), sobrescrever=False)
+        db.session.commit()
+        linhas = ler()
+    return {
+        nome: int(linhas[nome] or 0) if nome in CONTADORES else linhas[nome] or 0
+        for nome in nomes
+    }
+
+def incrementar_versao(nome):
+    """Avança um contador de versão na transação corrente (cria a linha se faltar)"""
+    comando = insert(Metrica).values(nome=nome, valor=1)
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=[Metrica.nome],
+        set_={'valor': Metrica.valor + 1}
+    ))
+
+def ler_versao(nome):
+    """Valor atual de um contador de versão (0 se nunca foi incrementado)"""
+    return int(db.session.scalar(db.select(Metrica.valor).where(Metrica.nome == nome)) or 0)
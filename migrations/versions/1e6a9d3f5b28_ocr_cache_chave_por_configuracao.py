@@ -0,0 +1,41 @@
+"""ocr_cache keyed on (hash, configuracao)
+
+Revision ID: 1e6a9d3f5b28
+Revises: 5c8e2f94a1d7
+Create Date: 2026-10-19 15:12:44.302917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1e6a9d3f5b28'
+down_revision = '5c8e2f94a1d7'
+branch_labels = None
+depends_on = None
+
+
+def _recriar(chave):
+    """Copia ocr_cache para uma tabela com a nova chave primária (o SQLite não altera PK)"""
+    op.create_table('ocr_cache_novo',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('configuracao', sa.String(length=100), nullable=False),
+    sa.Column('texto', sa.Text(), nullable=False),
+    sa.Column('segundos', sa.Float(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint(*chave)
+    )
+    # Na volta para a chave só por hash fica a leitura mais recente de cada imagem
+    op.execute('INSERT OR REPLACE INTO ocr_cache_novo (hash, configuracao, texto, segundos, criado_em) '
+               'SELECT hash, configuracao, texto, segundos, criado_em FROM ocr_cache ORDER BY criado_em')
+    op.drop_table('ocr_cache')
+    op.rename_table('ocr_cache_novo', 'ocr_cache')
+
+
+def upgrade():
+    _recriar(['hash', 'configuracao'])
+
+
+def downgrade():
+    _recriar(['hash'])
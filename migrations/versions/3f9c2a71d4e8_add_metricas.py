@@ -0,0 +1,28 @@
+"""Add metricas table
+
+Revision ID: 3f9c2a71d4e8
+Revises: ab57b6b2944e
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a71d4e8'
+down_revision = 'ab57b6b2944e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metricas',
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('valor', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+
+
+def downgrade():
+    op.drop_table('metricas')
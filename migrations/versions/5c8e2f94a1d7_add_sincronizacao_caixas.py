@@ -0,0 +1,61 @@
+"""Add alteracoes (cursor da sincronização, por gatilhos) and operacoes_sync
+
+Revision ID: 5c8e2f94a1d7
+Revises: 9b1e47d3c6a8
+Create Date: 2026-10-19 10:42:07.581316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2f94a1d7'
+down_revision = '9b1e47d3c6a8'
+branch_labels = None
+depends_on = None
+
+TABELAS = ('produto', 'vendas', 'pagamentos')
+OPERACOES = (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD'))
+
+
+def upgrade():
+    op.create_table('alteracoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tabela', sa.String(length=20), nullable=False),
+    sa.Column('registro_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_alteracoes_tabela_registro_id', 'alteracoes', ['tabela', 'registro_id'], unique=True)
+    op.create_table('operacoes_sync',
+    sa.Column('chave', sa.String(length=64), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('resultado', sa.Text(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    op.create_index(op.f('ix_operacoes_sync_criado_em'), 'operacoes_sync', ['criado_em'], unique=False)
+
+    # Tudo o que já existe entra como alterado: um caixa novo começa do cursor 0
+    for tabela in TABELAS:
+        op.execute(f"INSERT INTO alteracoes (tabela, registro_id) SELECT '{tabela}', id FROM {tabela} ORDER BY id")
+    for tabela in TABELAS:
+        for operacao, linha in OPERACOES:
+            op.execute(
+                f'CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela}_{operacao} AFTER {operacao.upper()} ON {tabela} BEGIN '
+                f"DELETE FROM alteracoes WHERE tabela = '{tabela}' AND registro_id = {linha}.id; "
+                f"INSERT INTO alteracoes (tabela, registro_id) VALUES ('{tabela}', {linha}.id); END"
+            )
+
+
+def downgrade():
+    for tabela in TABELAS:
+        for operacao, _ in OPERACOES:
+            op.execute(f'DROP TRIGGER IF EXISTS alteracoes_{tabela}_{operacao}')
+    op.drop_index(op.f('ix_operacoes_sync_criado_em'), table_name='operacoes_sync')
+    op.drop_table('operacoes_sync')
+    op.drop_index('ix_alteracoes_tabela_registro_id', table_name='alteracoes')
+    op.drop_table('alteracoes')
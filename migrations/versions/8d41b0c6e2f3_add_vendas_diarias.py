@@ -0,0 +1,47 @@
+"""Add vendas_diarias rollup table
+
+Revision ID: 8d41b0c6e2f3
+Revises: 3f9c2a71d4e8
+Create Date: 2026-10-18 11:02:17.530114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41b0c6e2f3'
+down_revision = '3f9c2a71d4e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('vendas_diarias',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('vendedor_id', sa.Integer(), nullable=False),
+    sa.Column('produto_id', sa.Integer(), nullable=False),
+    sa.Column('vendas', sa.Integer(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('valor_bruto', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('valor_pago', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('saldo_aberto', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'vendedor_id', 'produto_id')
+    )
+
+    # Backfill com as vendas já existentes (mesmo agrupamento de
+    # reconstruir_vendas_diarias): sem isso, a primeira retirada depois do
+    # upgrade faria os relatórios lerem só o rollup e sumir com o histórico
+    op.execute(
+        "INSERT INTO vendas_diarias (dia, vendedor_id, produto_id, vendas, quantidade, valor_bruto, "
+        "valor_pago, saldo_aberto) "
+        "SELECT date(data_venda), vendedor_id, produto_id, count(*), coalesce(sum(quantidade), 0), "
+        "coalesce(sum(valor_total), 0), coalesce(sum(valor_pago), 0), "
+        "coalesce(sum(valor_total - coalesce(valor_pago, 0)), 0) "
+        "FROM vendas WHERE data_venda IS NOT NULL "
+        "GROUP BY date(data_venda), vendedor_id, produto_id"
+    )
+
+
+def downgrade():
+    op.drop_table('vendas_diarias')
@@ -0,0 +1,56 @@
+"""Add movimentacoes_estoque and snapshots_estoque (razão do estoque)
+
+Revision ID: 9b1e47d3c6a8
+Revises: f6c2d8e41a57
+Create Date: 2026-10-18 23:14:51.207734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1e47d3c6a8'
+down_revision = 'f6c2d8e41a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('movimentacoes_estoque',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('produto_id', sa.Integer(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('saldo', sa.Integer(), nullable=False),
+    sa.Column('motivo', sa.String(length=20), nullable=False),
+    sa.Column('venda_id', sa.Integer(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['venda_id'], ['vendas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_movimentacoes_estoque_produto_id_criado_em', 'movimentacoes_estoque', ['produto_id', 'criado_em'], unique=False)
+    op.create_index(op.f('ix_movimentacoes_estoque_venda_id'), 'movimentacoes_estoque', ['venda_id'], unique=False)
+    op.create_table('snapshots_estoque',
+    sa.Column('movimentacao_id', sa.Integer(), nullable=False),
+    sa.Column('produto_id', sa.Integer(), nullable=False),
+    sa.Column('saldo', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('movimentacao_id', 'produto_id')
+    )
+    op.create_index(op.f('ix_snapshots_estoque_criado_em'), 'snapshots_estoque', ['criado_em'], unique=False)
+
+    # O estoque atual vira o saldo de abertura do razão (data no formato do SQLAlchemy)
+    op.execute(
+        "INSERT INTO movimentacoes_estoque (produto_id, quantidade, saldo, motivo, criado_em) "
+        "SELECT id, quantidade_estoque, quantidade_estoque, 'saldo_inicial', "
+        "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000' FROM produto "
+        "WHERE coalesce(quantidade_estoque, 0) != 0 ORDER BY id"
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_snapshots_estoque_criado_em'), table_name='snapshots_estoque')
+    op.drop_table('snapshots_estoque')
+    op.drop_index(op.f('ix_movimentacoes_estoque_venda_id'), table_name='movimentacoes_estoque')
+    op.drop_index('ix_movimentacoes_estoque_produto_id_criado_em', table_name='movimentacoes_estoque')
+    op.drop_table('movimentacoes_estoque')
@@ -0,0 +1,32 @@
+"""Add eventos table (feed ao vivo)
+
+Revision ID: a4d81c7e9f20
+Revises: e2b7c4d90a15
+Create Date: 2026-10-18 16:05:12.318044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d81c7e9f20'
+down_revision = 'e2b7c4d90a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('eventos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.Column('dados', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index(op.f('ix_eventos_criado_em'), 'eventos', ['criado_em'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_eventos_criado_em'), table_name='eventos')
+    op.drop_table('eventos')
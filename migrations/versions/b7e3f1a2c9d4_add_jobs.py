@@ -0,0 +1,47 @@
+"""Add jobs table (tarefas em segundo plano)
+
+Revision ID: b7e3f1a2c9d4
+Revises: a4d81c7e9f20
+Create Date: 2026-10-18 18:22:40.512907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f1a2c9d4'
+down_revision = 'a4d81c7e9f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=40), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('parametros', sa.Text(), nullable=False),
+    sa.Column('progresso_atual', sa.Integer(), nullable=False),
+    sa.Column('progresso_total', sa.Integer(), nullable=True),
+    sa.Column('mensagem', sa.String(length=200), nullable=True),
+    sa.Column('resultado', sa.Text(), nullable=True),
+    sa.Column('arquivo', sa.String(length=255), nullable=True),
+    sa.Column('nome_download', sa.String(length=255), nullable=True),
+    sa.Column('cancelamento_pedido', sa.Boolean(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_id', 'jobs', ['status', 'id'], unique=False)
+    op.create_index(op.f('ix_jobs_usuario_id'), 'jobs', ['usuario_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_jobs_usuario_id'), table_name='jobs')
+    op.drop_index('ix_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,55 @@
+"""Add composite and covering indexes for the dashboard queries
+
+Revision ID: c5e19a3b7f02
+Revises: 8d41b0c6e2f3
+Create Date: 2026-10-18 14:36:51.208447
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e19a3b7f02'
+down_revision = '8d41b0c6e2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_username', ['role', 'username'], unique=False)
+
+    with op.batch_alter_table('produto', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_produto_nome'), ['nome'], unique=False)
+        batch_op.create_index(batch_op.f('ix_produto_vendedor_id'), ['vendedor_id'], unique=False)
+
+    with op.batch_alter_table('vendas', schema=None) as batch_op:
+        batch_op.create_index('ix_vendas_status_data_venda', ['status', 'data_venda', 'valor_total', 'valor_pago'], unique=False)
+        batch_op.create_index('ix_vendas_vendedor_id_data_venda', ['vendedor_id', 'data_venda'], unique=False)
+        batch_op.create_index('ix_vendas_produto_id_data_venda', ['produto_id', 'data_venda'], unique=False)
+
+    with op.batch_alter_table('pagamentos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pagamentos_venda_id'), ['venda_id'], unique=False)
+        batch_op.create_index('ix_pagamentos_vendedor_id_data_pagamento', ['vendedor_id', 'data_pagamento'], unique=False)
+
+    # Estatísticas para o planejador escolher os índices novos
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    with op.batch_alter_table('pagamentos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagamentos_vendedor_id_data_pagamento')
+        batch_op.drop_index(batch_op.f('ix_pagamentos_venda_id'))
+
+    with op.batch_alter_table('vendas', schema=None) as batch_op:
+        batch_op.drop_index('ix_vendas_produto_id_data_venda')
+        batch_op.drop_index('ix_vendas_vendedor_id_data_venda')
+        batch_op.drop_index('ix_vendas_status_data_venda')
+
+    with op.batch_alter_table('produto', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_produto_vendedor_id'))
+        batch_op.drop_index(batch_op.f('ix_produto_nome'))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role_username')
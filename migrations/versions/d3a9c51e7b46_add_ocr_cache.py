@@ -0,0 +1,31 @@
+"""Add ocr_cache table (OCR de notas de fornecedor)
+
+Revision ID: d3a9c51e7b46
+Revises: b7e3f1a2c9d4
+Create Date: 2026-10-18 20:47:03.118254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9c51e7b46'
+down_revision = 'b7e3f1a2c9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ocr_cache',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('configuracao', sa.String(length=100), nullable=False),
+    sa.Column('texto', sa.Text(), nullable=False),
+    sa.Column('segundos', sa.Float(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+
+
+def downgrade():
+    op.drop_table('ocr_cache')
@@ -0,0 +1,24 @@
+"""Add lower(nome) expression index for product typeahead
+
+Revision ID: e2b7c4d90a15
+Revises: c5e19a3b7f02
+Create Date: 2026-10-18 16:12:40.771905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4d90a15'
+down_revision = 'c5e19a3b7f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_produto_nome_lower', 'produto', [sa.text('lower(nome)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_produto_nome_lower', table_name='produto')
@@ -0,0 +1,36 @@
+"""Add arquivos table (uploads por conteúdo)
+
+Revision ID: f6c2d8e41a57
+Revises: d3a9c51e7b46
+Create Date: 2026-10-18 22:05:12.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c2d8e41a57'
+down_revision = 'd3a9c51e7b46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('arquivos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('extensao', sa.String(length=5), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('tamanho', sa.Integer(), nullable=False),
+    sa.Column('nome_original', sa.String(length=255), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hash')
+    )
+
+
+def downgrade():
+    op.drop_table('arquivos')
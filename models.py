@@ -1,9 +1,15 @@
 from datetime import datetime
 from flask_login import UserMixin
-from extensions import db, bcrypt
+from sqlalchemy import event
+from extensions import db
+from senhas import gerar_hash, verificar, precisa_rehash
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Seletores de vendedor filtram por papel e ordenam pelo nome
+        db.Index('ix_users_role_username', 'role', 'username'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(256), nullable=False)
@@ -13,10 +19,13 @@ class User(db.Model, UserMixin):
     vendedor = db.relationship('Vendedor', back_populates='user', uselist=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = gerar_hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return verificar(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return precisa_rehash(self.password_hash)
 
 class Vendedor(db.Model):
     __tablename__ = 'vendedores'
@@ -29,18 +38,27 @@ class Vendedor(db.Model):
 class Produto(db.Model):
     __tablename__ = 'produto'
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
+    nome = db.Column(db.String(100), nullable=False, index=True)
     preco_unitario = db.Column(db.Numeric(10, 2), nullable=False)
     quantidade_estoque = db.Column(db.Integer)
-    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=True, index=True)
     vendedor = db.relationship('Vendedor', backref='produtos')
 
     @property
     def valor_total_estoque(self):
         return self.quantidade_estoque * self.preco_unitario
 
+# Busca por prefixo sem diferenciar maiúsculas (busca.buscar_produtos)
+db.Index('ix_produto_nome_lower', db.func.lower(Produto.nome))
+
 class Venda(db.Model):
     __tablename__ = 'vendas'
+    __table_args__ = (
+        # Vendas pendentes por data; inclui os valores para o saldo sair só do índice
+        db.Index('ix_vendas_status_data_venda', 'status', 'data_venda', 'valor_total', 'valor_pago'),
+        db.Index('ix_vendas_vendedor_id_data_venda', 'vendedor_id', 'data_venda'),
+        db.Index('ix_vendas_produto_id_data_venda', 'produto_id', 'data_venda'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     data_venda = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     quantidade = db.Column(db.Integer, nullable=False)
@@ -59,12 +77,154 @@ class Venda(db.Model):
 
 class Pagamento(db.Model):
     __tablename__ = 'pagamentos'
+    __table_args__ = (
+        db.Index('ix_pagamentos_vendedor_id_data_pagamento', 'vendedor_id', 'data_pagamento'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     data_pagamento = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     valor = db.Column(db.Numeric(10, 2), nullable=False)
     metodo = db.Column(db.String(50))
     observacao = db.Column(db.Text)
-    venda_id = db.Column(db.Integer, db.ForeignKey('vendas.id'), nullable=False)
+    venda_id = db.Column(db.Integer, db.ForeignKey('vendas.id'), nullable=False, index=True)
     vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=False)
     venda = db.relationship('Venda', back_populates='pagamentos')
-    vendedor = db.relationship('Vendedor', backref='pagamentos')
\ No newline at end of file
+    vendedor = db.relationship('Vendedor', backref='pagamentos')
+
+class Metrica(db.Model):
+    __tablename__ = 'metricas'
+    nome = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+class VendaDiaria(db.Model):
+    """Rollup de vendas: uma linha por (dia da venda, vendedor, produto)"""
+    __tablename__ = 'vendas_diarias'
+    dia = db.Column(db.Date, primary_key=True)
+    vendedor_id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, primary_key=True)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_bruto = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    valor_pago = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    saldo_aberto = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+class Evento(db.Model):
+    """Alterações publicadas para o feed ao vivo (SSE): uma linha por transação"""
+    __tablename__ = 'eventos'
+    # AUTOINCREMENT: ids nunca são reaproveitados depois da limpeza, então o
+    # Last-Event-ID de um cliente continua válido como cursor
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    dados = db.Column(db.Text, nullable=False)  # lista JSON de alterações
+
+class Tarefa(db.Model):
+    """Tarefa em segundo plano (importação, exportação, recálculos): fila, progresso e resultado"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # O worker pega a pendente mais antiga; a limpeza procura as finalizadas
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(40), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    parametros = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    progresso_atual = db.Column(db.Integer, nullable=False, default=0)
+    progresso_total = db.Column(db.Integer)  # None: total desconhecido
+    mensagem = db.Column(db.String(200))
+    resultado = db.Column(db.Text)  # JSON devolvido pela tarefa
+    arquivo = db.Column(db.String(255))  # arquivo de resultado na pasta da tarefa
+    nome_download = db.Column(db.String(255))
+    cancelamento_pedido = db.Column(db.Boolean, nullable=False, default=False)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime)  # batimento do worker enquanto executa
+    concluido_em = db.Column(db.DateTime)
+
+    usuario = db.relationship('User')
+
+class OcrCache(db.Model):
+    """Texto do OCR por conteúdo da imagem: a mesma foto enviada de novo não passa pelo Tesseract"""
+    __tablename__ = 'ocr_cache'
+    # Um texto por imagem e configuração: trocar OCR_IDIOMA e voltar não refaz o OCR
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 do arquivo
+    configuracao = db.Column(db.String(100), primary_key=True)  # ocr.configuracao() usada
+    texto = db.Column(db.Text, nullable=False)
+    segundos = db.Column(db.Float)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Arquivo(db.Model):
+    """Upload guardado por conteúdo (arquivos.py): um registro e um arquivo em disco por sha256"""
+    __tablename__ = 'arquivos'
+    id = db.Column(db.Integer, primary_key=True)
+    hash = db.Column(db.String(64), unique=True, nullable=False)  # sha256; dá o caminho em UPLOAD_FOLDER
+    extensao = db.Column(db.String(5), nullable=False)  # pelo conteúdo, não pelo nome enviado
+    tipo = db.Column(db.String(50), nullable=False)
+    tamanho = db.Column(db.Integer, nullable=False)
+    nome_original = db.Column(db.String(255))  # do primeiro envio
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class MovimentacaoEstoque(db.Model):
+    """Razão do estoque (movimentacoes.py): só recebe inserts, uma linha por alteração de um produto"""
+    __tablename__ = 'movimentacoes_estoque'
+    __table_args__ = (
+        # Histórico e posição de um produto numa data
+        db.Index('ix_movimentacoes_estoque_produto_id_criado_em', 'produto_id', 'criado_em'),
+    )
+    id = db.Column(db.Integer, primary_key=True)  # ordem das movimentações
+    # Sem FK: o histórico de um produto excluído continua no razão
+    produto_id = db.Column(db.Integer, nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False)  # + entra, - sai
+    saldo = db.Column(db.Integer, nullable=False)  # estoque do produto logo depois
+    motivo = db.Column(db.String(20), nullable=False)
+    venda_id = db.Column(db.Integer, db.ForeignKey('vendas.id'), index=True)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class SnapshotEstoque(db.Model):
+    """Saldo de cada produto até a movimentação `movimentacao_id` (uma foto do razão)"""
+    __tablename__ = 'snapshots_estoque'
+    movimentacao_id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, primary_key=True)
+    saldo = db.Column(db.Integer, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, index=True)
+
+class Alteracao(db.Model):
+    """Última alteração de cada linha de produto, vendas e pagamentos (cursor da sincronização dos caixas)"""
+    __tablename__ = 'alteracoes'
+    __table_args__ = (
+        db.Index('ix_alteracoes_tabela_registro_id', 'tabela', 'registro_id', unique=True),
+        # AUTOINCREMENT: o id é o cursor dos caixas e nunca volta atrás
+        {'sqlite_autoincrement': True},
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(20), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)  # sem FK: linhas excluídas continuam aqui
+
+# Preenchida por gatilhos, e não pelo código das escritas: importação em lote,
+# UPDATEs com CASE e exclusões entram sem depender de quem escreveu lembrar
+# dela. Cada linha alterada troca de id (apaga e insere), então a tabela tem
+# uma linha por registro e um caixa atrasado recebe só o estado final.
+TABELAS_SINCRONIZADAS = ('produto', 'vendas', 'pagamentos')
+GATILHOS_ALTERACOES = [
+    f'CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela}_{operacao} AFTER {operacao.upper()} ON {tabela} BEGIN '
+    f"DELETE FROM alteracoes WHERE tabela = '{tabela}' AND registro_id = {linha}.id; "
+    f"INSERT INTO alteracoes (tabela, registro_id) VALUES ('{tabela}', {linha}.id); END"
+    for tabela in TABELAS_SINCRONIZADAS
+    for operacao, linha in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD'))
+]
+
+@event.listens_for(db.metadata, 'after_create')
+def _criar_gatilhos_alteracoes(metadata, conexao, **kwargs):
+    if conexao.dialect.name == 'sqlite':
+        for gatilho in GATILHOS_ALTERACOES:
+            conexao.exec_driver_sql(gatilho)
+
+class OperacaoSync(db.Model):
+    """Operação enviada por um caixa (sincronizacao.py), pela chave de idempotência gerada nele"""
+    __tablename__ = 'operacoes_sync'
+    chave = db.Column(db.String(64), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    resultado = db.Column(db.Text)  # JSON devolvido ao caixa e repetido nos reenvios
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,156 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from extensions import db
+from models import MovimentacaoEstoque, Produto, SnapshotEstoque
+from tarefas import registrar_manutencao
+
+# Razão do estoque. Toda escrita em Produto.quantidade_estoque grava, na mesma
+# transação, uma linha em movimentacoes_estoque com a variação, o saldo
+# resultante e o motivo; a tabela só recebe inserts. De tempos em tempos um
+# snapshot guarda o saldo de cada produto até uma movimentação, e a posição
+# numa data sai do snapshot anterior mais as movimentações até o seguinte, sem
+# refazer o histórico todo.
+
+SALDO_INICIAL = 'saldo_inicial'  # estoque que já existia quando o razão foi criado
+CADASTRO = 'cadastro'
+RETIRADA = 'retirada'
+ENTRADA = 'entrada'
+IMPORTACAO = 'importacao'
+EXCLUSAO = 'exclusao'
+AJUSTE = 'ajuste'  # correção da conciliação
+
+def registrar_movimentacoes(linhas):
+    """Grava movimentações na transação corrente (sem commit).
+
+    `linhas` são dicts com produto_id, quantidade (com sinal), saldo (estoque
+    depois da movimentação), motivo e, nas retiradas, venda_id. Variações zero
+    são descartadas.
+    """
+    agora = datetime.utcnow()
+    linhas = [{'venda_id': None, 'criado_em': agora, **linha} for linha in linhas if linha['quantidade']]
+    if linhas:
+        db.session.execute(insert(MovimentacaoEstoque), linhas)
+
+def registrar_movimentacao(produto_id, quantidade, saldo, motivo, venda_id=None):
+    registrar_movimentacoes([{'produto_id': produto_id, 'quantidade': quantidade, 'saldo': saldo,
+                              'motivo': motivo, 'venda_id': venda_id}])
+
+def _ultimo_snapshot(ate=None):
+    """(movimentacao_id, criado_em) do snapshot mais recente (até a data `ate`); (0, None) se não houver"""
+    consulta = db.select(SnapshotEstoque.movimentacao_id, SnapshotEstoque.criado_em)
+    if ate is not None:
+        consulta = consulta.where(SnapshotEstoque.criado_em <= ate)
+    return db.session.execute(consulta.order_by(SnapshotEstoque.criado_em.desc()).limit(1)).one_or_none() \
+        or (0, None)
+
+def _saldos(movimentacao_id, ate_id=None, ate=None, produto_ids=None):
+    """Saldos do snapshot `movimentacao_id` mais as variações posteriores (até ate_id/ate)"""
+    saldos = Counter()
+    if movimentacao_id:
+        consulta = db.select(SnapshotEstoque.produto_id, SnapshotEstoque.saldo) \
+            .where(SnapshotEstoque.movimentacao_id == movimentacao_id)
+        if produto_ids is not None:
+            consulta = consulta.where(SnapshotEstoque.produto_id.in_(produto_ids))
+        saldos.update(dict(db.session.execute(consulta).all()))
+
+    variacoes = db.select(MovimentacaoEstoque.produto_id, db.func.sum(MovimentacaoEstoque.quantidade)) \
+        .where(MovimentacaoEstoque.id > movimentacao_id)
+    if ate_id is not None:
+        variacoes = variacoes.where(MovimentacaoEstoque.id <= ate_id)
+    if ate is not None:
+        variacoes = variacoes.where(MovimentacaoEstoque.criado_em <= ate)
+    if produto_ids is not None:
+        variacoes = variacoes.where(MovimentacaoEstoque.produto_id.in_(produto_ids))
+    saldos.update(dict(db.session.execute(variacoes.group_by(MovimentacaoEstoque.produto_id)).all()))
+    return saldos
+
+def estoque_em(momento, produto_ids=None):
+    """{produto_id: saldo} na data/hora `momento` (UTC), a partir do razão.
+
+    Lê o último snapshot até `momento` e soma só as movimentações entre ele e
+    o snapshot seguinte: o custo é limitado pelo intervalo entre snapshots,
+    não pela idade do histórico. Produtos sem saldo ficam de fora.
+    """
+    anterior, _ = _ultimo_snapshot(momento)
+    # O snapshot seguinte limita a faixa de ids lida
+    seguinte = db.session.scalar(
+        db.select(SnapshotEstoque.movimentacao_id).where(SnapshotEstoque.criado_em > momento)
+        .order_by(SnapshotEstoque.criado_em).limit(1)
+    )
+    saldos = _saldos(anterior, ate_id=seguinte, ate=momento, produto_ids=produto_ids)
+    return {produto_id: saldo for produto_id, saldo in saldos.items() if saldo}
+
+def historico(produto_id, limite=50):
+    """Últimas movimentações de um produto, da mais recente para a mais antiga"""
+    return db.session.scalars(
+        db.select(MovimentacaoEstoque).where(MovimentacaoEstoque.produto_id == produto_id)
+        .order_by(MovimentacaoEstoque.criado_em.desc(), MovimentacaoEstoque.id.desc()).limit(limite)
+    ).all()
+
+def tirar_snapshot():
+    """Grava o saldo de cada produto até a última movimentação e faz commit.
+
+    Parte do snapshot anterior mais as movimentações novas. Retorna quantos
+    produtos entraram; 0 se nada mudou desde o último.
+    """
+    anterior, _ = _ultimo_snapshot()
+    ultima = db.session.scalar(db.select(db.func.max(MovimentacaoEstoque.id))) or 0
+    if ultima <= anterior:
+        db.session.commit()
+        return 0
+    agora = datetime.utcnow()
+    saldos = _saldos(anterior, ate_id=ultima)
+    # Saldo zero não é gravado: produto ausente do snapshot vale zero
+    linhas = [{'movimentacao_id': ultima, 'produto_id': produto_id, 'saldo': saldo, 'criado_em': agora}
+              for produto_id, saldo in saldos.items() if saldo]
+    if not linhas:
+        db.session.commit()
+        return 0
+    # Dois workers podem fotografar a mesma movimentação: o segundo não grava nada
+    db.session.execute(insert_sqlite(SnapshotEstoque).on_conflict_do_nothing(), linhas)
+    db.session.commit()
+    return len(linhas)
+
+def snapshot_periodico(intervalo, a_cada):
+    """Snapshot se o último tem mais de `intervalo` segundos ou ficou `a_cada` movimentações para trás"""
+    anterior, criado_em = _ultimo_snapshot()
+    pendentes = db.session.scalar(
+        db.select(db.func.count()).select_from(MovimentacaoEstoque).where(MovimentacaoEstoque.id > anterior)
+    )
+    vencido = criado_em is None or datetime.utcnow() - criado_em > timedelta(seconds=intervalo)
+    if pendentes and (vencido or pendentes >= a_cada):
+        return tirar_snapshot()
+    db.session.commit()
+    return 0
+
+def conciliar(corrigir=False):
+    """Compara o saldo do razão com Produto.quantidade_estoque.
+
+    Retorna [(produto_id, nome, saldo no razão, estoque atual)] dos que
+    divergem, o que indica uma escrita no estoque que não passou pelo razão.
+    Com `corrigir`, grava um AJUSTE para cada diferença e faz commit.
+    """
+    anterior, _ = _ultimo_snapshot()
+    razao = _saldos(anterior)
+    atuais = {p.id: p for p in db.session.execute(
+        db.select(Produto.id, Produto.nome, Produto.quantidade_estoque))}
+    divergencias = []
+    for produto_id in sorted(razao.keys() | atuais.keys()):
+        produto = atuais.get(produto_id)
+        atual = (produto.quantidade_estoque or 0) if produto else 0
+        if razao[produto_id] != atual:
+            divergencias.append((produto_id, produto.nome if produto else None, razao[produto_id], atual))
+    if corrigir and divergencias:
+        registrar_movimentacoes([{'produto_id': produto_id, 'quantidade': atual - saldo, 'saldo': atual,
+                                  'motivo': AJUSTE} for produto_id, _, saldo, atual in divergencias])
+        db.session.commit()
+    return divergencias
+
+def _manter_snapshot(config):
+    snapshot_periodico(config['ESTOQUE_SNAPSHOT_INTERVALO'], config['ESTOQUE_SNAPSHOT_A_CADA'])
+
+def init_movimentacoes(app):
+    """Snapshot periódico do razão na manutenção das tarefas (ou `flask snapshot-estoque` no cron)"""
+    registrar_manutencao(_manter_snapshot)
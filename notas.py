@@ -0,0 +1,251 @@
+import difflib
+import json
+import re
+import time
+import unicodedata
+from contextlib import closing
+from datetime import datetime
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db
+from models import Arquivo, OcrCache, Produto, Tarefa
+from arquivos import ArquivoInvalido, caminho_do_arquivo, guardar_upload
+from estoque import repor_estoque
+from forms import NotasFornecedorForm
+from ocr import configuracao, extrair_itens, ler_paginas, verificar_dependencias
+from tarefas import CONCLUIDA, enfileirar, resposta_enfileirada, tarefa
+
+# Entrada de mercadoria pelas notas de fornecedor: as fotos viram uma tarefa
+# em segundo plano (OCR em ocr.py) e o resultado são propostas de reposição
+# casadas com Produto.nome, que só alteram o estoque depois de revisadas.
+
+CORTE_SEMELHANCA = 0.75  # abaixo disso a linha fica sem produto
+
+def normalizar(texto):
+    """Minúsculas, sem acentos nem pontuação: 'AÇÚCAR  Cristal-1kg' -> 'acucar cristal 1kg'"""
+    sem_acento = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', sem_acento.lower()).split())
+
+class Catalogo:
+    """Casa as descrições lidas nas notas com Produto.nome.
+
+    O catálogo é lido uma vez por tarefa e comparado já normalizado: o OCR
+    perde acentos ("FEIJAO" para "Feijão"), então nem o índice de lower(nome)
+    nem um LIKE achariam o produto. Vale o nome igual ou, na falta, o mais
+    parecido entre os que começam com as mesmas letras.
+    """
+
+    def __init__(self):
+        self._por_nome = None
+        self._por_inicio = {}
+
+    def _carregar(self):
+        self._por_nome = {}
+        for id, nome in db.session.execute(db.select(Produto.id, Produto.nome).order_by(Produto.id)):
+            chave = normalizar(nome)
+            # Nomes repetidos: o produto mais antigo, como na importação
+            if chave and chave not in self._por_nome:
+                self._por_nome[chave] = (id, nome)
+                self._por_inicio.setdefault(chave[:3], []).append(chave)
+
+    def casar(self, descricao):
+        """(produto_id, nome, semelhança de 0 a 1); (None, None, 0) se nada servir"""
+        if self._por_nome is None:
+            self._carregar()
+        chave = normalizar(descricao)
+        if chave in self._por_nome:
+            return (*self._por_nome[chave], 1.0)
+        parecidos = difflib.get_close_matches(chave, self._por_inicio.get(chave[:3], []), n=1,
+                                              cutoff=CORTE_SEMELHANCA)
+        if not chave or not parecidos:
+            return None, None, 0
+        semelhanca = difflib.SequenceMatcher(None, chave, parecidos[0]).ratio()
+        return (*self._por_nome[parecidos[0]], round(semelhanca, 2))
+
+def _guardar_no_cache(hash, chave_config, texto, segundos):
+    comando = insert(OcrCache).values(hash=hash, configuracao=chave_config, texto=texto,
+                                      segundos=segundos, criado_em=datetime.utcnow())
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=[OcrCache.hash, OcrCache.configuracao],
+        set_={'texto': texto, 'segundos': segundos}
+    ))
+
+@tarefa('ocr_notas', 'Leitura de notas de fornecedor')
+def tarefa_ocr_notas(contexto, arquivos):
+    """OCR das imagens enviadas e propostas de reposição.
+
+    `arquivos` é a lista de [sha256, nome original] de imagens já guardadas
+    (arquivos.py). Páginas com o mesmo conteúdo de um envio anterior vêm do
+    ocr_cache, sem passar pelo Tesseract.
+    """
+    config = current_app.config
+    chave_config = configuracao(config['OCR_IDIOMA'], config['OCR_LADO_MAXIMO'])
+    hashes = {hash for hash, _ in arquivos}
+    guardados = {arquivo.hash: caminho_do_arquivo(arquivo) for arquivo in db.session.scalars(
+        db.select(Arquivo).where(Arquivo.hash.in_(hashes)))}
+    textos = dict(db.session.execute(
+        db.select(OcrCache.hash, OcrCache.texto)
+        .where(OcrCache.hash.in_(hashes), OcrCache.configuracao == chave_config)
+    ).all())
+    do_cache = len(textos)
+    db.session.commit()
+
+    # Uma leitura por conteúdo, mesmo que a foto tenha vindo repetida no envio
+    faltando = {guardados[hash]: hash for hash in hashes if hash not in textos and hash in guardados}
+    erros = {hash: 'Imagem não encontrada' for hash in hashes if hash not in guardados}
+    inicio = time.perf_counter()
+    contexto.progresso(0, len(faltando), f'{do_cache} páginas já lidas antes')
+    if faltando:
+        verificar_dependencias(config['OCR_TESSERACT'])
+        paginas = ler_paginas(list(faltando), config['OCR_PROCESSOS'], config['OCR_TESSERACT'],
+                              config['OCR_IDIOMA'], config['OCR_LADO_MAXIMO'])
+        with closing(paginas):
+            for feitas, (caminho, texto, segundos, erro) in enumerate(paginas, start=1):
+                hash = faltando[caminho]
+                if erro:
+                    erros[hash] = erro
+                else:
+                    textos[hash] = texto
+                    _guardar_no_cache(hash, chave_config, texto, segundos)
+                    db.session.commit()
+                ritmo = feitas / (time.perf_counter() - inicio) * 60
+                contexto.progresso(feitas, len(faltando), f'{ritmo:.0f} páginas/min')
+    segundos_ocr = time.perf_counter() - inicio
+
+    lidas_agora = set(faltando.values())
+    catalogo = Catalogo()
+    paginas = []
+    for hash, original in arquivos:
+        itens = []
+        for item in extrair_itens(textos.get(hash, '')):
+            produto_id, produto, semelhanca = catalogo.casar(item['descricao'])
+            itens.append({**item, 'produto_id': produto_id, 'produto': produto, 'semelhanca': semelhanca,
+                          'proposta': max(1, round(item['quantidade']))})
+        paginas.append({'arquivo': original, 'hash': hash, 'do_cache': hash in textos and hash not in lidas_agora,
+                        'erro': erros.get(hash), 'itens': itens})
+    return {
+        'paginas': paginas,
+        'lidas_no_ocr': len(lidas_agora - erros.keys()),
+        'do_cache': do_cache,
+        'paginas_por_minuto': round(len(faltando) / segundos_ocr * 60, 1) if faltando else None,
+        'processos': min(config['OCR_PROCESSOS'], len(faltando)),
+    }
+
+def _tarefa_do_usuario(id):
+    tarefa_ocr = db.session.get(Tarefa, id)
+    if tarefa_ocr is None or tarefa_ocr.tipo != 'ocr_notas' or tarefa_ocr.status != CONCLUIDA \
+            or (tarefa_ocr.usuario_id != current_user.id and current_user.role != 'admin'):
+        return None
+    return tarefa_ocr
+
+bp = Blueprint('notas', __name__, url_prefix='/notas')
+
+@bp.route('/', methods=['GET', 'POST'])
+@login_required
+def enviar():
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+
+    form = NotasFornecedorForm()
+    if form.validate_on_submit():
+        # Com JavaScript as fotos já subiram uma a uma por /arquivos/ (em
+        # streaming, sem somar tudo num request) e chegam só os hashes
+        enviados = request.form.getlist('enviado')
+        imagens = form.arquivos.data or []
+        limite = current_app.config['OCR_MAX_ARQUIVOS']
+        if not enviados and not imagens:
+            flash('Selecione as fotos das notas', 'danger')
+        elif len(enviados) + len(imagens) > limite:
+            flash(f'Envie no máximo {limite} imagens por vez', 'danger')
+        else:
+            try:
+                paginas = []
+                if enviados:
+                    nomes = dict(db.session.execute(
+                        db.select(Arquivo.hash, Arquivo.nome_original).where(Arquivo.hash.in_(enviados))).all())
+                    paginas += [[hash, nomes[hash]] for hash in enviados if hash in nomes]
+                for imagem in imagens:
+                    arquivo, _ = guardar_upload(imagem, current_user.id)
+                    paginas.append([arquivo.hash, imagem.filename])
+                nova = enfileirar('ocr_notas', current_user.id, arquivos=paginas)
+                db.session.commit()
+                return resposta_enfileirada(nova)
+            except ArquivoInvalido as e:
+                db.session.rollback()
+                flash(str(e), 'danger')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Erro: {str(e)}', 'danger')
+    return render_template('notas/enviar.html', form=form)
+
+@bp.route('/<int:id>')
+@login_required
+def revisar(id):
+    tarefa_ocr = _tarefa_do_usuario(id)
+    if tarefa_ocr is None:
+        flash('Leitura de notas não encontrada ou ainda em andamento', 'warning')
+        return redirect(url_for('tarefas.lista'))
+    return render_template('notas/revisar.html', tarefa=tarefa_ocr, resultado=json.loads(tarefa_ocr.resultado))
+
+@bp.route('/<int:id>/aplicar', methods=['POST'])
+@login_required
+def aplicar(id):
+    """Soma ao estoque as linhas marcadas, com as quantidades revisadas (uma vez só)"""
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+    tarefa_ocr = _tarefa_do_usuario(id)
+    if tarefa_ocr is None:
+        flash('Leitura de notas não encontrada', 'warning')
+        return redirect(url_for('tarefas.lista'))
+
+    antigo = tarefa_ocr.resultado
+    resultado = json.loads(antigo)
+    if resultado.get('aplicado_em'):
+        flash('Estas notas já foram lançadas no estoque', 'warning')
+        return redirect(url_for('notas.revisar', id=id))
+
+    itens = []
+    for p, pagina in enumerate(resultado['paginas']):
+        for i, item in enumerate(pagina['itens']):
+            # O produto vem do resultado gravado; do formulário só a marcação e a quantidade
+            if item['produto_id'] is None or not request.form.get(f'item-{p}-{i}'):
+                continue
+            try:
+                quantidade = int(request.form.get(f'quantidade-{p}-{i}', item['proposta']))
+            except ValueError:
+                quantidade = item['proposta']
+            if quantidade > 0:
+                itens.append((item['produto_id'], quantidade))
+    if not itens:
+        flash('Nenhuma linha selecionada', 'warning')
+        return redirect(url_for('notas.revisar', id=id))
+
+    try:
+        atualizados = repor_estoque(itens)
+        resultado.update(aplicado_em=datetime.utcnow().isoformat(), aplicados=len(itens),
+                         aplicado_por=current_user.username)
+        # Troca condicional: dois envios do mesmo formulário não somam duas vezes
+        marcado = db.session.execute(
+            update(Tarefa).where(Tarefa.id == id, Tarefa.resultado == antigo)
+            .values(resultado=json.dumps(resultado))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not marcado:
+            db.session.rollback()
+            flash('Estas notas já foram lançadas no estoque', 'warning')
+            return redirect(url_for('notas.revisar', id=id))
+        db.session.commit()
+        flash(f'Estoque reposto: {len(itens)} linhas em {len(atualizados)} produtos', 'success')
+        return redirect(url_for('dashboard.estoque_tabela'))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro: {str(e)}', 'danger')
+        return redirect(url_for('notas.revisar', id=id))
+
+def init_notas(app):
+    """Registra /notas (envio e revisão das leituras)"""
+    app.register_blueprint(bp)
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Leitura de notas de fornecedor por OCR: pré-processamento com OpenCV e
+# Tesseract num pool de processos. Este módulo roda também dentro dos
+# processos do pool (iniciados com spawn), por isso só importa a biblioteca
+# padrão no topo; opencv e pytesseract são carregados na primeira página.
+
+IDIOMA_PADRAO = 'por'
+LADO_MAXIMO_PADRAO = 2500  # px; fotos de celular maiores só deixam o Tesseract lento
+# psm 6: um bloco uniforme de texto, como as linhas de itens de uma nota
+OPCOES_TESSERACT = '--oem 3 --psm 6'
+
+# Token numérico, com a unidade grudada ou não: "10", "2,5", "10KG"
+NUMERO = re.compile(r'^(\d+(?:[.,]\d+)?)([A-Za-z]{1,4})?$')
+LIXO_OCR = re.compile(r'[^0-9A-Za-zÀ-ú\s.,/-]')
+
+class OcrIndisponivel(RuntimeError):
+    """Faltam o opencv-python, o pytesseract ou o executável do Tesseract"""
+
+def verificar_dependencias(tesseract=None):
+    """Levanta OcrIndisponivel com o que falta (checagem barata, antes de subir o pool)"""
+    import importlib.util
+
+    faltando = [pacote for modulo, pacote in (('cv2', 'opencv-python'), ('pytesseract', 'pytesseract'))
+                if importlib.util.find_spec(modulo) is None]
+    if not (tesseract and os.path.isfile(tesseract)) and shutil.which(tesseract or 'tesseract') is None:
+        faltando.append('tesseract (defina TESSERACT_PATH)')
+    if faltando:
+        raise OcrIndisponivel(f'OCR indisponível, falta: {", ".join(faltando)}')
+
+def configuracao(idioma=IDIOMA_PADRAO, lado_maximo=LADO_MAXIMO_PADRAO):
+    """Identifica o pré-processamento + OCR: mudou, o cache antigo não vale"""
+    return f'{OPCOES_TESSERACT} -l {idioma} max{lado_maximo}'
+
+def preprocessar(caminho, lado_maximo=LADO_MAXIMO_PADRAO):
+    """Imagem em tons de cinza, reduzida e binarizada (limiar adaptativo)"""
+    import cv2
+
+    imagem = cv2.imread(caminho, cv2.IMREAD_GRAYSCALE)
+    if imagem is None:
+        raise ValueError(f'Não foi possível abrir a imagem {os.path.basename(caminho)}')
+    maior = max(imagem.shape)
+    if maior > lado_maximo:
+        escala = lado_maximo / maior
+        # INTER_AREA: a interpolação que não serrilha o texto ao reduzir
+        imagem = cv2.resize(imagem, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    # Limiar adaptativo aguenta sombra e iluminação desigual das fotos
+    return cv2.adaptiveThreshold(imagem, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+def _iniciar_processo(tesseract):
+    # Uma thread por processo: o paralelismo vem do pool. Sem isso cada
+    # Tesseract abre uma thread OpenMP por núcleo e os processos disputam a CPU.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    import cv2
+    import pytesseract
+
+    cv2.setNumThreads(1)
+    if tesseract:
+        pytesseract.pytesseract.tesseract_cmd = tesseract
+
+def ler_pagina(caminho, idioma=IDIOMA_PADRAO, lado_maximo=LADO_MAXIMO_PADRAO):
+    """Texto de uma página (roda dentro do pool); retorna (texto, segundos)"""
+    import pytesseract
+
+    inicio = time.perf_counter()
+    imagem = preprocessar(caminho, lado_maximo)
+    texto = pytesseract.image_to_string(imagem, lang=idioma, config=OPCOES_TESSERACT)
+    return texto, time.perf_counter() - inicio
+
+def ler_paginas(caminhos, processos, tesseract=None, idioma=IDIOMA_PADRAO, lado_maximo=LADO_MAXIMO_PADRAO):
+    """Gera (caminho, texto, segundos, erro) à medida que as páginas ficam prontas.
+
+    Uma imagem ilegível vira `erro` e não interrompe as demais.
+
+    spawn em vez de fork: o worker web tem threads (bcrypt, SSE, tarefas) e um
+    fork copiaria travas no meio do uso. Se o consumidor parar (cancelamento),
+    as páginas ainda não iniciadas são descartadas.
+    """
+    if not caminhos:
+        return
+    pool = ProcessPoolExecutor(max_workers=max(1, min(processos, len(caminhos))),
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_iniciar_processo, initargs=(tesseract,))
+    try:
+        futuros = {pool.submit(ler_pagina, caminho, idioma, lado_maximo): caminho for caminho in caminhos}
+        for futuro in as_completed(futuros):
+            try:
+                texto, segundos = futuro.result()
+            except ValueError as e:
+                yield futuros[futuro], None, 0.0, str(e)
+            else:
+                yield futuros[futuro], texto, segundos, None
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _numero(valor):
+    return float(valor.replace('.', '').replace(',', '.') if ',' in valor else valor)
+
+def extrair_itens(texto):
+    """Itens de uma nota: [{'linha', 'codigo', 'descricao', 'quantidade', 'unidade'}].
+
+    Cada linha é "[código] descrição números...", como em
+    "10007 ARROZ BRANCO KG — 10KG" ou "COCA COLA 2L 6 5,90 35,40". Do bloco de
+    números no fim, a quantidade é o último antes dos valores com vírgula
+    decimal (preço unitário e total).
+    """
+    itens = []
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        tokens = LIXO_OCR.sub(' ', linha).split()
+        fim = len(tokens)
+        # Unidade grudada só no último token ("10KG"); "2L" no meio é descrição
+        while fim > 0 and (token := NUMERO.match(tokens[fim - 1])) and (token[2] is None or fim == len(tokens)):
+            fim -= 1
+        bloco, descricao = tokens[fim:], tokens[:fim]
+        if not bloco:
+            continue
+        # A quantidade vem logo antes dos preços (os números com vírgula);
+        # inteiros antes dela são da descrição ("TIPO 1", "LATA 350")
+        precos = next((i for i, t in enumerate(bloco) if ',' in t), len(bloco))
+        posicao = precos - 1 if precos else 0
+        descricao += bloco[:posicao]
+        codigo = None
+        if len(descricao) > 1 and descricao[0].isdigit() and 3 <= len(descricao[0]) <= 14:
+            codigo, descricao = descricao[0], descricao[1:]
+        descricao = ' '.join(descricao).strip(' .,-/')
+        if not any(c.isalpha() for c in descricao):
+            continue
+        valor, unidade = NUMERO.match(bloco[posicao]).groups()
+        quantidade = _numero(valor)
+        if quantidade <= 0:
+            continue
+        itens.append({
+            'linha': numero,
+            'codigo': codigo,
+            'descricao': descricao,
+            'quantidade': quantidade,
+            'unidade': unidade.upper() if unidade else None,
+        })
+    return itens
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+
+def intervalo_datas(de, ate):
+    """Converte as datas 'AAAA-MM-DD' recebidas em (inicio, fim) com fim exclusivo"""
+    def _parse(valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d') if valor else None
+        except ValueError:
+            return None
+
+    inicio, fim = _parse(de), _parse(ate)
+    if fim is not None:
+        fim += timedelta(days=1)
+    return inicio, fim
+
+def filtrar_periodo(query, coluna, inicio, fim):
+    """Restringe a consulta ao intervalo [inicio, fim) usando o índice da coluna"""
+    if inicio is not None:
+        query = query.filter(coluna >= inicio)
+    if fim is not None:
+        query = query.filter(coluna < fim)
+    return query
+
+def codificar_cursor(data, id):
+    return f'{data.isoformat()}_{id}'
+
+def decodificar_cursor(cursor):
+    """Retorna (data, id) do cursor ou None se estiver ausente/inválido"""
+    try:
+        data, id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(data), int(id)
+    except (AttributeError, ValueError):
+        return None
+
+def paginar(query, coluna_data, coluna_id, cursor=None, limite=50):
+    """Paginação por cursor (keyset) em ordem decrescente de (data, id).
+
+    Cada página é uma faixa do índice da coluna de data que começa logo
+    depois do último item visto, então o custo não depende da profundidade.
+    Retorna (itens, proximo_cursor); proximo_cursor é None na última página.
+    """
+    posicao = decodificar_cursor(cursor)
+    if posicao is not None:
+        data, id = posicao
+        query = query.filter(
+            coluna_data <= data,
+            or_(coluna_data < data, coluna_id < id)
+        )
+
+    itens = query.order_by(coluna_data.desc(), coluna_id.desc()).limit(limite + 1).all()
+    if len(itens) <= limite:
+        return itens, None
+
+    itens = itens[:limite]
+    ultimo = itens[-1]
+    return itens, codificar_cursor(getattr(ultimo, coluna_data.key), getattr(ultimo, coluna_id.key))
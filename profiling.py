@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import (Blueprint, g, has_request_context, request, render_template,
+                   flash, redirect, url_for, before_render_template, template_rendered)
+from flask_login import login_required, current_user
+from sqlalchemy import event
+from extensions import db
+
+bp = Blueprint('profiling', __name__)
+
+class RegistroLentos:
+    """Guarda os N requests mais lentos do processo (min-heap limitado)"""
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def registrar(self, duracao, dados):
+        item = (duracao, next(self._seq), dados)
+        with self._lock:
+            if len(self._heap) < self.tamanho:
+                heapq.heappush(self._heap, item)
+            elif duracao > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def listar(self):
+        with self._lock:
+            return [dados for _, _, dados in sorted(self._heap, reverse=True)]
+
+    def limpar(self):
+        with self._lock:
+            self._heap.clear()
+
+registro = RegistroLentos(50)
+
+def _perfil():
+    if not has_request_context():
+        return None
+    return g.get('_perfil')
+
+@contextmanager
+def segmento(nome):
+    """Mede um trecho do request (ex.: bcrypt) e o soma ao Server-Timing"""
+    perfil = _perfil()
+    if perfil is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        perfil['segmentos'][nome] = perfil['segmentos'].get(nome, 0.0) + time.perf_counter() - inicio
+
+def init_profiling(app):
+    """Ativa a medição por request (SQL, templates, total) se PROFILING estiver ligado"""
+    if not app.config.get('PROFILING'):
+        return
+
+    registro.tamanho = app.config.get('PROFILING_SLOWEST', 50)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _sql_inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info['_perfil_inicio'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _sql_fim(conn, cursor, statement, parameters, context, executemany):
+        perfil = _perfil()
+        if perfil is not None:
+            perfil['sql'] += time.perf_counter() - conn.info['_perfil_inicio']
+            perfil['sql_n'] += 1
+
+    def _template_inicio(sender, template, context, **extra):
+        perfil = _perfil()
+        if perfil is not None:
+            perfil['tpl_inicio'].append(time.perf_counter())
+
+    def _template_fim(sender, template, context, **extra):
+        perfil = _perfil()
+        if perfil is not None and perfil['tpl_inicio']:
+            inicio = perfil['tpl_inicio'].pop()
+            # Templates aninhados (render dentro de render) contam só no externo
+            if not perfil['tpl_inicio']:
+                perfil['tpl'] += time.perf_counter() - inicio
+
+    before_render_template.connect(_template_inicio, app, weak=False)
+    template_rendered.connect(_template_fim, app, weak=False)
+
+    @app.before_request
+    def _iniciar():
+        g._perfil = {
+            'inicio': time.perf_counter(),
+            'sql': 0.0,
+            'sql_n': 0,
+            'tpl': 0.0,
+            'tpl_inicio': [],
+            'segmentos': {},
+        }
+
+    @app.after_request
+    def _finalizar(response):
+        perfil = _perfil()
+        if perfil is None:
+            return response
+
+        total = time.perf_counter() - perfil['inicio']
+        medido = perfil['sql'] + perfil['tpl'] + sum(perfil['segmentos'].values())
+        metricas = [
+            ('sql', perfil['sql'], f"{perfil['sql_n']} consultas"),
+            ('tpl', perfil['tpl'], 'templates'),
+            *((nome, duracao, nome) for nome, duracao in perfil['segmentos'].items()),
+            ('app', max(total - medido, 0.0), 'python'),
+            ('total', total, 'total'),
+        ]
+        response.headers['Server-Timing'] = ', '.join(
+            f'{nome};dur={duracao * 1000:.2f};desc="{descricao}"'
+            for nome, duracao, descricao in metricas
+        )
+
+        registro.registrar(total, {
+            'quando': datetime.now(),
+            'metodo': request.method,
+            'caminho': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'tempos': {nome: duracao * 1000 for nome, duracao, _ in metricas},
+            'consultas': perfil['sql_n'],
+        })
+        return response
+
+    app.register_blueprint(bp, url_prefix='/admin/profiling')
+
+@bp.route('/', methods=['GET', 'POST'])
+@login_required
+def mais_lentos():
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    if request.method == 'POST':
+        registro.limpar()
+        return redirect(url_for('profiling.mais_lentos'))
+
+    return render_template('admin/profiling.html', requests=registro.listar(), tamanho=registro.tamanho)
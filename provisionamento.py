@@ -0,0 +1,60 @@
+import os
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from extensions import db, init_migrate
+
+# Provisionamento único da instância (pastas, schema e admin padrão). Roda por
+# `flask preparar-banco` no deploy, e não em create_app, para os workers
+# subirem sem repetir DDL nem disputar entre si o insert do admin.
+
+def criar_pastas(app):
+    """Pastas que o app espera encontrar: instância, banco, uploads (e miniaturas), uploads temporários e tarefas"""
+    pastas = [app.instance_path, app.config['INSTANCE_PATH'], app.config['UPLOAD_FOLDER'],
+              app.config['UPLOAD_TEMP'], app.config['UPLOAD_MINIATURAS'], app.config['TAREFAS_PASTA']]
+    for pasta in pastas:
+        os.makedirs(pasta, exist_ok=True)
+    return pastas
+
+def criar_schema(app):
+    """create_all (idempotente); num banco vazio marca também a última migração.
+
+    Assim `flask db upgrade` depois do primeiro deploy não tenta recriar as
+    tabelas a partir da migração inicial. Retorna True se o banco estava vazio.
+    """
+    import models  # noqa: F401  (registra as tabelas no metadata)
+
+    with db.engine.connect() as conexao:
+        # Trava de escrita antes de olhar o schema: dois `preparar-banco`
+        # simultâneos não tentam criar as mesmas tabelas
+        conexao.exec_driver_sql('BEGIN IMMEDIATE')
+        vazio = not inspect(conexao).get_table_names()
+        db.metadata.create_all(conexao)
+        conexao.commit()
+    if vazio:
+        from flask_migrate import stamp
+        init_migrate(app)
+        stamp(directory=os.path.join(app.root_path, 'migrations'))
+    return vazio
+
+def criar_admin(senha):
+    """Cria o usuário admin se não existir; False se já existia (ou outro processo criou antes)"""
+    from models import User
+
+    if db.session.scalar(db.select(User.id).where(User.username == 'admin')):
+        return False
+    admin = User(username='admin', role='admin')
+    admin.set_password(senha)
+    db.session.add(admin)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # username é único: outro processo preparando ao mesmo tempo venceu a corrida
+        db.session.rollback()
+        return False
+    return True
+
+def preparar(app, senha_admin='admin123'):
+    """Pastas, schema e admin padrão; pode rodar de novo sem efeito"""
+    with app.app_context():
+        criar_pastas(app)
+        return {'banco_novo': criar_schema(app), 'admin_criado': criar_admin(senha_admin)}
@@ -3,6 +3,7 @@ from flask_login import login_user, current_user, logout_user, login_required
 from forms import RegistrationForm, LoginForm
 from models import User
 from extensions import db
+from senhas import SenhasOcupado
 
 bp = Blueprint('auth', __name__)
 
@@ -15,8 +16,21 @@ def login():
     
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        
-        if user and user.check_password(form.password.data):
+
+        try:
+            senha_ok = user is not None and user.check_password(form.password.data)
+        except SenhasOcupado:
+            flash('Muitos acessos simultâneos, tente novamente em instantes', 'warning')
+            return render_template('auth/login.html', form=form), 503
+
+        if senha_ok:
+            # Hash com custo antigo: refaz com o BCRYPT_LOG_ROUNDS atual
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(form.password.data)
+                    db.session.commit()
+                except SenhasOcupado:
+                    db.session.rollback()
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('dashboard.dashboard'))
@@ -61,5 +75,5 @@ def admin_panel():
     if current_user.role != 'admin':
         flash('Acesso não autorizado', 'danger')
         return redirect(url_for('dashboard.dashboard'))
-    
-        return render_template('admin/panel.html')
\ No newline at end of file
+
+    return render_template('admin/panel.html')
\ No newline at end of file
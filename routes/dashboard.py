@@ -1,26 +1,38 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+import os
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, abort, Response, stream_with_context, jsonify
 from flask_login import login_required, current_user
 from models import User, Vendedor, Produto, Venda, Pagamento, db
-from forms import RetiradaForm, PagamentoForm, ProdutoForm, VendedorForm
-from sqlalchemy.orm import joinedload
+from forms import RetiradaForm, RetiradaLoteForm, PagamentoForm, ProdutoForm, VendedorForm, ImportarProdutosForm
+from sqlalchemy.orm import joinedload, raiseload
+from metricas import (ler_metricas, ler_versao, incrementar, incrementar_versao, VERSAO_HISTORICO, VERSAO_VENDAS,
+                      VERSAO_ESTOQUE)
+from paginacao import intervalo_datas, filtrar_periodo, paginar
+from estoque import (registrar_retirada, registrar_retirada_lote, registrar_pagamento, EstoqueInsuficiente,
+                     PagamentoInvalido)
+from movimentacoes import registrar_movimentacao, estoque_em, historico, CADASTRO, EXCLUSAO
+from eventos import publicar, ultimo_evento
+from busca import (buscar_produtos, buscar_vendedores, buscar_vendas_pendentes, pagina_estoque,
+                   limitar, LIMITE_MAXIMO, ids_enviados, opcoes_produtos, opcoes_vendedores, opcoes_vendas_pendentes)
+from importacao import arquivo_de_entrada
+from exportacao import gerar_csv, nome_exportacao, EXPORTACOES
+from tarefas import enfileirar, pasta_da_tarefa, resposta_enfileirada
+from analytics import receita_por_produto, receita_por_vendedor, media_movel_diaria, janela_recente
 
 bp = Blueprint('dashboard', __name__)
 
 def get_dashboard_stats():
     """Retorna estatísticas gerais do dashboard"""
+    inicio, fim = janela_recente(current_app.config['ANALYTICS_JANELA_DIAS'])
+    por_produto = receita_por_produto(inicio, fim, limite=10)
+    por_vendedor = receita_por_vendedor(inicio, fim, limite=10)
     return {
-        'total_produtos': Produto.query.count(),
-        'vendas_pendentes': Venda.query.filter_by(status='pendente').count(),
-        'saldo_total': db.session.query(
-            db.func.sum(Venda.valor_total - Venda.valor_pago)
-        ).scalar() or 0.0,
-        'total_estoque': db.session.query(
-            db.func.sum(Produto.quantidade_estoque * Produto.preco_unitario)
-        ).scalar() or 0.0,
-        'categorias_labels': [],
-        'categorias_values': [],
-        'vendedores_labels': [],
-        'vendedores_values': []
+        **ler_metricas(),
+        'categorias_labels': [item['rotulo'] for item in por_produto],
+        'categorias_values': [item['receita'] for item in por_produto],
+        'vendedores_labels': [item['rotulo'] for item in por_vendedor],
+        'vendedores_values': [item['receita'] for item in por_vendedor],
+        'serie_diaria': media_movel_diaria(inicio, fim)
     }
 
 @bp.route('/')
@@ -37,8 +49,8 @@ def dashboard():
 @login_required
 def vendedores():
     try:
-        vendedores = Vendedor.query.order_by(Vendedor.nome).all()
-        stats = get_dashboard_stats()
+        vendedores = Vendedor.query.options(raiseload('*')).order_by(Vendedor.nome).all()
+        stats = ler_metricas('total_estoque')
         return render_template('dashboard/vendedores.html',
                              vendedores=vendedores,
                              total_estoque=stats['total_estoque'])
@@ -50,10 +62,9 @@ def vendedores():
 @login_required
 def estoque():
     try:
-        produtos = Produto.query.order_by(Produto.nome).all()
-        stats = get_dashboard_stats()
+        # A página só tem os cards; a lista de produtos fica em estoque_tabela
+        stats = ler_metricas('total_estoque')
         return render_template('dashboard/estoque.html',
-                            produtos=produtos,
                             total_estoque=stats['total_estoque'])
     except Exception as e:
         flash(f'Erro ao carregar estoque: {str(e)}', 'danger')
@@ -63,15 +74,11 @@ def estoque():
 @login_required
 def estatisticas():
     try:
+        desde = ultimo_evento()  # antes das consultas: nada publicado depois delas se perde
         stats = get_dashboard_stats()
-        print(f"DEBUG - Total Estoque: {stats['total_estoque']}")  # Log de debug
-        print(f"DEBUG - Total Produtos: {stats['total_produtos']}")  # Log de debug
-        return render_template('dashboard/estatisticas.html',
-                            total_estoque=stats['total_estoque'],
-                            total_produtos=stats['total_produtos'])
+        return render_template('dashboard/estatisticas.html', evento_desde=desde, **stats)
     except Exception as e:
-        import traceback
-        traceback.print_exc()  # Imprime o stack trace completo
+        current_app.logger.exception('Erro ao carregar estatísticas')
         flash(f'Erro detalhado: {str(e)}', 'danger')
         return redirect(url_for('dashboard.dashboard'))
 
@@ -87,6 +94,13 @@ def novo_produto():
                 preco_unitario=form.preco.data
             )
             db.session.add(produto)
+            incrementar(total_produtos=1,
+                        total_estoque=form.quantidade.data * form.preco.data)
+            incrementar_versao(VERSAO_ESTOQUE)
+            db.session.flush()
+            registrar_movimentacao(produto.id, produto.quantidade_estoque, produto.quantidade_estoque, CADASTRO)
+            publicar('produto', acao='criado', id=produto.id, nome=produto.nome,
+                     quantidade_estoque=produto.quantidade_estoque, preco_unitario=produto.preco_unitario)
             db.session.commit()
             flash('Produto cadastrado com sucesso!', 'success')
             return redirect(url_for('dashboard.estoque'))
@@ -95,6 +109,27 @@ def novo_produto():
         flash(f'Erro: {str(e)}', 'danger')
     return render_template('dashboard/adicionar_item.html', form=form)
 
+@bp.route('/estoque/importar', methods=['GET', 'POST'])
+@login_required
+def importar_estoque():
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+
+    form = ImportarProdutosForm()
+    if form.validate_on_submit():
+        arquivo = form.arquivo.data
+        try:
+            # Roda em segundo plano: o relatório sai na página da tarefa
+            tarefa = enfileirar('importar_produtos', current_user.id, nome_arquivo=arquivo.filename)
+            arquivo.save(os.path.join(pasta_da_tarefa(tarefa.id), arquivo_de_entrada(arquivo.filename)))
+            db.session.commit()
+            return resposta_enfileirada(tarefa)
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro: {str(e)}', 'danger')
+    return render_template('dashboard/importar_estoque.html', form=form)
+
 @bp.route('/estoque/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
 def editar_produto(id):
@@ -102,6 +137,10 @@ def editar_produto(id):
     try:
         if request.method == 'POST':
             produto.nome = request.form['nome']
+            incrementar_versao(VERSAO_VENDAS)  # rótulos dos gráficos usam o nome
+            incrementar_versao(VERSAO_HISTORICO)  # inclusive os de janelas já fechadas
+            incrementar_versao(VERSAO_ESTOQUE)
+            publicar('produto', acao='editado', id=produto.id, nome=produto.nome)
             db.session.commit()
             flash('Item atualizado!', 'success')
             return redirect(url_for('dashboard.estoque'))
@@ -116,6 +155,13 @@ def excluir_produto(id):
     try:
         produto = Produto.query.get_or_404(id)
         db.session.delete(produto)
+        registrar_movimentacao(id, -(produto.quantidade_estoque or 0), 0, EXCLUSAO)
+        incrementar(total_produtos=-1,
+                    total_estoque=-(produto.quantidade_estoque or 0) * produto.preco_unitario)
+        incrementar_versao(VERSAO_VENDAS)
+        incrementar_versao(VERSAO_HISTORICO)
+        incrementar_versao(VERSAO_ESTOQUE)
+        publicar('produto', acao='excluido', id=id)
         db.session.commit()
         flash('Produto excluído!', 'success')
     except Exception as e:
@@ -128,30 +174,18 @@ def excluir_produto(id):
 def retirada():
     form = RetiradaForm()
     try:
-        form.vendedor.choices = [(u.id, u.username) for u in User.query.filter(User.role.in_(['vendedor', 'funcionario']))]
-        form.produto.choices = [(p.id, f"{p.nome} (Estoque: {p.quantidade_estoque})") for p in Produto.query.all()]
+        # Opções carregadas sob demanda (busca/*); no POST só o valor enviado é validado
+        form.vendedor.choices = opcoes_vendedores(ids_enviados(form.vendedor))
+        form.produto.choices = opcoes_produtos(ids_enviados(form.produto))
 
         if form.validate_on_submit():
-            produto = Produto.query.get(form.produto.data)
-            vendedor = User.query.get(form.vendedor.data)
-
-            if produto.quantidade_estoque < form.quantidade.data:
+            try:
+                registrar_retirada(form.vendedor.data, form.produto.data, form.quantidade.data)
+            except EstoqueInsuficiente:
+                db.session.rollback()
                 flash('Estoque insuficiente!', 'danger')
                 return redirect(url_for('dashboard.retirada'))
 
-            valor_total = form.quantidade.data * float(produto.preco_unitario)
-
-            nova_venda = Venda(
-                quantidade=form.quantidade.data,
-                preco_unitario=produto.preco_unitario,
-                valor_total=valor_total,
-                vendedor_id=vendedor.id,
-                produto_id=produto.id,
-                status='pendente'
-            )
-
-            produto.quantidade_estoque -= form.quantidade.data
-            db.session.add(nova_venda)
             db.session.commit()
             flash('Retirada registrada com sucesso!', 'success')
             return redirect(url_for('dashboard.transacoes'))
@@ -162,6 +196,51 @@ def retirada():
     
     return render_template('dashboard/retirada.html', form=form)
 
+@bp.route('/retirada/lote', methods=['GET', 'POST'])
+@login_required
+def retirada_lote():
+    form = RetiradaLoteForm()
+    try:
+        form.vendedor.choices = opcoes_vendedores(ids_enviados(form.vendedor))
+        produtos = opcoes_produtos(ids_enviados(*(item.produto for item in form.itens)))
+        for item in form.itens:
+            item.produto.choices = produtos
+
+        if form.validate_on_submit():
+            itens = [(item.produto.data, item.quantidade.data) for item in form.itens]
+            try:
+                venda_ids = registrar_retirada_lote(form.vendedor.data, itens)
+            except EstoqueInsuficiente as e:
+                db.session.rollback()
+                flash(str(e), 'danger')
+                return render_template('dashboard/retirada_lote.html', form=form)
+
+            db.session.commit()
+            flash(f'Retirada de {len(venda_ids)} itens registrada com sucesso!', 'success')
+            return redirect(url_for('dashboard.transacoes'))
+
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro: {str(e)}', 'danger')
+
+    return render_template('dashboard/retirada_lote.html', form=form)
+
+BUSCAS = {
+    'produtos': buscar_produtos,
+    'vendedores': buscar_vendedores,
+    'vendas-pendentes': buscar_vendas_pendentes,
+}
+
+@bp.route('/busca/<tipo>')
+@login_required
+def busca(tipo):
+    """Opções dos selects de retirada/pagamento: ?q=prefixo&cursor=...&limite=N"""
+    if tipo not in BUSCAS:
+        return jsonify(erro=f'Busca desconhecida: {tipo}'), 404
+    itens, proximo = BUSCAS[tipo](request.args.get('q', ''), request.args.get('cursor'),
+                                  limitar(request.args.get('limite')))
+    return jsonify(itens=itens, proximo=proximo)
+
 @bp.route('/adicionar_vendedor', methods=['GET', 'POST'])
 @login_required
 def adicionar_vendedor():
@@ -183,29 +262,16 @@ def adicionar_vendedor():
 def pagamento():
     form = PagamentoForm()
     try:
-        vendas_pendentes = Venda.query.filter_by(status='pendente').all()
-        form.venda.choices = [(v.id, f"Venda #{v.id} - Saldo: R$ {v.calcular_saldo():.2f}") for v in vendas_pendentes]
+        form.venda.choices = opcoes_vendas_pendentes(ids_enviados(form.venda))
 
         if form.validate_on_submit():
-            venda = Venda.query.get(form.venda.data)
-            valor_pagamento = form.valor.data
-
-            if valor_pagamento > venda.calcular_saldo():
+            try:
+                registrar_pagamento(form.venda.data, form.valor.data, form.metodo.data)
+            except PagamentoInvalido:
+                db.session.rollback()
                 flash('Valor excede o saldo pendente!', 'danger')
                 return redirect(url_for('dashboard.pagamento'))
 
-            novo_pagamento = Pagamento(
-                valor=valor_pagamento,
-                metodo=form.metodo.data,
-                venda_id=venda.id,
-                vendedor_id=venda.vendedor_id
-            )
-
-            venda.valor_pago += valor_pagamento
-            if venda.valor_pago >= venda.valor_total:
-                venda.status = 'pago'
-
-            db.session.add(novo_pagamento)
             db.session.commit()
             flash('Pagamento registrado com sucesso!', 'success')
             return redirect(url_for('dashboard.transacoes'))
@@ -220,26 +286,137 @@ def pagamento():
 @login_required
 def transacoes():
     try:
-        vendas = Venda.query.order_by(Venda.data_venda.desc()).all()
-        pagamentos = Pagamento.query.order_by(Pagamento.data_pagamento.desc()).all()
-        stats = get_dashboard_stats()
+        desde = ultimo_evento()
+        filtros = {chave: request.args.get(chave, '') for chave in ('de', 'ate', 'status')}
+        inicio, fim = intervalo_datas(filtros['de'], filtros['ate'])
+        limite = current_app.config['TRANSACOES_POR_PAGINA']
+
+        consulta_vendas = filtrar_periodo(
+            Venda.query.options(joinedload(Venda.produto), raiseload('*')),
+            Venda.data_venda, inicio, fim
+        )
+        if filtros['status']:
+            consulta_vendas = consulta_vendas.filter(Venda.status == filtros['status'])
+        vendas, proximo_vendas = paginar(consulta_vendas, Venda.data_venda, Venda.id,
+                                         request.args.get('cursor_vendas'), limite)
+
+        consulta_pagamentos = filtrar_periodo(
+            Pagamento.query.options(raiseload('*')),
+            Pagamento.data_pagamento, inicio, fim
+        )
+        pagamentos, proximo_pagamentos = paginar(consulta_pagamentos, Pagamento.data_pagamento, Pagamento.id,
+                                                 request.args.get('cursor_pagamentos'), limite)
+
+        # As duas tabelas paginam em separado: cada link muda um cursor e mantém o outro e os filtros
+        atuais = {**filtros, **{chave: request.args.get(chave) for chave in ('cursor_vendas', 'cursor_pagamentos')}}
+
+        def pagina(**cursores):
+            return url_for('dashboard.transacoes', **{k: v for k, v in {**atuais, **cursores}.items() if v})
+
+        stats = ler_metricas('total_estoque')
         return render_template('dashboard/transacoes.html',
                             vendas=vendas,
                             pagamentos=pagamentos,
+                            filtros=filtros,
+                            pagina=pagina,
+                            proximo_vendas=proximo_vendas,
+                            proximo_pagamentos=proximo_pagamentos,
+                            evento_desde=desde,
                             total_estoque=stats['total_estoque'])
     except Exception as e:
         flash(f'Erro ao carregar transações: {str(e)}', 'danger')
         return redirect(url_for('dashboard.dashboard'))
 
+@bp.route('/exportar/<tipo>.csv')
+@login_required
+def exportar_csv(tipo):
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+    if tipo not in EXPORTACOES:
+        abort(404)
+    inicio, fim = intervalo_datas(request.args.get('de', ''), request.args.get('ate', ''))
+    return Response(
+        stream_with_context(gerar_csv(tipo, inicio, fim)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{nome_exportacao(tipo, inicio, fim)}"'}
+    )
+
+@bp.route('/exportar/<tipo>', methods=['POST'])
+@login_required
+def exportar_tarefa(tipo):
+    """Mesma exportação em segundo plano: responde com a tarefa e o CSV fica para download"""
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+    if tipo not in EXPORTACOES:
+        abort(404)
+    tarefa = enfileirar('exportar_csv', current_user.id, tipo=tipo,
+                        de=request.form.get('de', ''), ate=request.form.get('ate', ''))
+    db.session.commit()
+    return resposta_enfileirada(tarefa)
+
 @bp.route('/estoque/tabela')
 @login_required
 def estoque_tabela():
     try:
-        produtos = Produto.query.order_by(Produto.nome).all()
-        stats = get_dashboard_stats()
+        stats = ler_metricas('total_estoque')  # antes: se reconstruir, o commit expira os produtos
+        desde = ultimo_evento()
+        busca = request.args.get('q', '')
+        produtos, proximo = pagina_estoque(busca)
         return render_template('dashboard/estoque_tabela.html',
                             produtos=produtos,
+                            proximo=proximo,
+                            busca=busca,
+                            evento_desde=desde,
+                            etag=f'"estoque-{ler_versao(VERSAO_ESTOQUE)}"',
                             total_estoque=stats['total_estoque'])
     except Exception as e:
         flash(f'Erro ao carregar tabela de estoque: {str(e)}', 'danger')
-        return redirect(url_for('dashboard.dashboard'))
\ No newline at end of file
+        return redirect(url_for('dashboard.dashboard'))
+
+@bp.route('/estoque/tabela/linhas')
+@login_required
+def estoque_linhas():
+    """Só as linhas (<tr>) da tabela de estoque para ?q= e ?cursor=, com GET condicional.
+
+    O ETag é o contador versao_estoque, avançado em toda escrita de produto ou
+    estoque: enquanto nada muda, a resposta é 304 sem consultar os produtos.
+    Página e filtro já fazem parte da URL, então a versão basta como ETag.
+    """
+    etag = f'estoque-{ler_versao(VERSAO_ESTOQUE)}'
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        busca = request.args.get('q', '')
+        cursor = request.args.get('cursor')
+        produtos, proximo = pagina_estoque(busca, cursor, limitar(request.args.get('limite', LIMITE_MAXIMO)))
+        resposta = Response(render_template('dashboard/partials/_linhas_estoque.html',
+                                            produtos=produtos, busca=busca, cursor=cursor))
+        resposta.headers['X-Proximo-Cursor'] = proximo or ''
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+@bp.route('/estoque/posicao')
+@login_required
+def posicao_estoque():
+    """Estoque no fim de um dia (?data=AAAA-MM-DD) ao lado do atual, pelo razão; ?produto= mostra o histórico"""
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('dashboard.estoque'))
+    data = request.args.get('data') or datetime.utcnow().date().isoformat()
+    _, fim = intervalo_datas('', data)
+    if fim is None:
+        flash('Data inválida', 'warning')
+        return redirect(url_for('dashboard.posicao_estoque'))
+
+    saldos = estoque_em(fim - timedelta(microseconds=1))
+    produtos = db.session.execute(
+        db.select(Produto.id, Produto.nome, Produto.quantidade_estoque).order_by(Produto.nome, Produto.id)
+    ).all()
+    excluidos = sorted(saldos.keys() - {produto.id for produto in produtos})
+    produto_id = request.args.get('produto', type=int)
+    movimentos = historico(produto_id) if produto_id else []
+    return render_template('dashboard/posicao_estoque.html', data=data, saldos=saldos, produtos=produtos,
+                           excluidos=excluidos, produto_id=produto_id, movimentos=movimentos)
\ No newline at end of file
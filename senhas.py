@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from extensions import bcrypt
+from profiling import segmento
+
+class SenhasOcupado(RuntimeError):
+    """Fila de hashing cheia ou resposta fora do prazo: o login deve ser tentado de novo"""
+
+class PoolSenhas:
+    """Executa o bcrypt num pool limitado de threads, com fila e prazo máximos.
+
+    O bcrypt libera o GIL, então as threads usam núcleos de verdade; o limite
+    impede que uma rajada de logins ocupe todos os workers HTTP com CPU e faz
+    o excesso falhar rápido (SenhasOcupado) em vez de acumular.
+    """
+
+    def __init__(self, workers=2, fila=8, timeout=5.0):
+        self.configurar(workers, fila, timeout)
+
+    def configurar(self, workers, fila, timeout):
+        self.workers = workers
+        self.fila = fila
+        self.timeout = timeout
+        self._vagas = threading.BoundedSemaphore(workers + fila)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+            return self._executor
+
+    def executar(self, funcao, *args):
+        # Sem vaga na fila: falha na hora, sem somar uma espera ao prazo do hash
+        if not self._vagas.acquire(blocking=False):
+            raise SenhasOcupado('Fila de verificação de senhas cheia')
+        try:
+            futuro = self._pool().submit(funcao, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        try:
+            with segmento('bcrypt'):
+                return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            futuro.cancel()
+            raise SenhasOcupado('Tempo esgotado ao verificar a senha')
+
+pool = PoolSenhas()
+
+def gerar_hash(senha):
+    """Hash bcrypt com o custo de BCRYPT_LOG_ROUNDS"""
+    return pool.executar(bcrypt.generate_password_hash, senha).decode('utf-8')
+
+def verificar(senha_hash, senha):
+    return pool.executar(bcrypt.check_password_hash, senha_hash, senha)
+
+def custo(senha_hash):
+    """Custo (log2 das rodadas) gravado no hash: '$2b$12$...' -> 12"""
+    try:
+        return int(senha_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def precisa_rehash(senha_hash):
+    """True se o hash foi gerado com um custo diferente do configurado"""
+    return custo(senha_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
+
+def init_senhas(app):
+    """Dimensiona o pool de hashing a partir da configuração"""
+    pool.configurar(app.config['PASSWORD_HASH_WORKERS'],
+                    app.config['PASSWORD_HASH_QUEUE'],
+                    app.config['PASSWORD_HASH_TIMEOUT'])
@@ -0,0 +1,275 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user, login_required, login_user
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db
+from models import Alteracao, OperacaoSync, Pagamento, Produto, User, Venda
+from busca import opcoes_vendedores
+from estoque import EstoqueInsuficiente, PagamentoInvalido, registrar_pagamento, registrar_retirada_lote
+from senhas import SenhasOcupado
+from tarefas import registrar_manutencao
+
+# Sincronização dos caixas de balcão (cliente desktop em flet), que continuam
+# vendendo quando a conexão da loja cai.
+# - GET /sync/?desde=N: as linhas de produto, vendas e pagamentos alteradas
+#   depois do cursor N, numa resposta só, com o cursor seguinte. O cursor é o
+#   id de `alteracoes` (preenchida por gatilhos, ver models.py), que só cresce
+#   e guarda uma linha por registro: depois de horas offline o caixa recebe o
+#   estado atual do que mudou, e não cada alteração intermediária.
+# - POST /sync/: retiradas e pagamentos feitos offline, em lote. Cada operação
+#   traz uma chave gerada no caixa; reenviar a mesma chave (o mesmo usuário)
+#   devolve o resultado gravado da primeira vez, sem aplicar de novo.
+
+# tabela -> (nome na resposta, modelo, colunas enviadas)
+SINCRONIZADOS = {
+    'produto': ('produtos', Produto, ('id', 'nome', 'preco_unitario', 'quantidade_estoque', 'vendedor_id')),
+    'vendas': ('vendas', Venda, ('id', 'data_venda', 'quantidade', 'preco_unitario', 'valor_total',
+                                 'valor_pago', 'status', 'vendedor_id', 'produto_id')),
+    'pagamentos': ('pagamentos', Pagamento, ('id', 'data_pagamento', 'valor', 'metodo', 'venda_id', 'vendedor_id')),
+}
+METODOS_PAGAMENTO = ('dinheiro', 'cartao', 'pix')
+COMPRIMIR_ACIMA = 1024  # bytes; respostas menores vão sem gzip
+
+class OperacaoRecusada(ValueError):
+    """Operação enviada pelo caixa com dados inválidos"""
+
+def _valor(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+def alteracoes_desde(cursor, limite):
+    """Lote com o que mudou depois de `cursor`: linhas por tabela, ids excluídos e o novo cursor.
+
+    As linhas são lidas depois das marcas: uma escrita no meio chega já com o
+    estado mais novo e volta no lote seguinte, o que o caixa só regrava.
+    """
+    marcas = db.session.execute(
+        db.select(Alteracao.id, Alteracao.tabela, Alteracao.registro_id)
+        .where(Alteracao.id > cursor).order_by(Alteracao.id).limit(limite + 1)
+    ).all()
+    mais = len(marcas) > limite
+    marcas = marcas[:limite]
+    pedidos = {}
+    for marca in marcas:
+        pedidos.setdefault(marca.tabela, []).append(marca.registro_id)
+
+    lote = {'cursor': marcas[-1].id if marcas else cursor, 'mais': mais, 'excluidos': {}}
+    for tabela, (nome, modelo, colunas) in SINCRONIZADOS.items():
+        ids = pedidos.get(tabela, [])
+        linhas = db.session.execute(
+            db.select(*(getattr(modelo, coluna) for coluna in colunas)).where(modelo.id.in_(ids))
+        ).all() if ids else []
+        encontrados = {linha.id for linha in linhas}
+        # Colunas uma vez e linhas como listas: metade do JSON de uma lista de objetos
+        lote[nome] = {'colunas': colunas, 'linhas': [[_valor(valor) for valor in linha] for linha in linhas]}
+        lote['excluidos'][nome] = [id for id in ids if id not in encontrados]
+    return lote
+
+def _data(valor):
+    """Data/hora ISO enviada pelo caixa, em UTC e nunca no futuro; None se não veio"""
+    if valor is None:
+        return None
+    try:
+        data = datetime.fromisoformat(str(valor))
+    except ValueError:
+        raise OperacaoRecusada(f'Data inválida: {valor}')
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(data, datetime.utcnow())  # relógio do caixa adiantado
+
+def _inteiro_positivo(valor, campo):
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor <= 0:
+        raise OperacaoRecusada(f'{campo}: valor inválido ({valor})')
+    return valor
+
+def _retirada(operacao, vendedores, anteriores):
+    vendedor_id = operacao.get('vendedor_id')
+    if vendedor_id not in vendedores:
+        raise OperacaoRecusada(f'Vendedor inválido: {vendedor_id}')
+    itens = operacao.get('itens')
+    if not isinstance(itens, list) or not itens:
+        raise OperacaoRecusada('Retirada sem itens')
+    try:
+        pares = [(produto_id, quantidade) for produto_id, quantidade in itens]
+    except (TypeError, ValueError):
+        raise OperacaoRecusada('Itens devem ser [produto_id, quantidade]')
+    itens = [(_inteiro_positivo(produto_id, 'Produto'), _inteiro_positivo(quantidade, 'Quantidade'))
+             for produto_id, quantidade in pares]
+    venda_ids = registrar_retirada_lote(vendedor_id, itens, _data(operacao.get('data')))
+    # Uma venda por produto, na ordem em que o produto apareceu nos itens
+    produtos = dict.fromkeys(produto_id for produto_id, _ in itens)
+    return {'status': 'aplicada',
+            'vendas': [[produto_id, venda_id] for produto_id, venda_id in zip(produtos, venda_ids)]}
+
+def _venda_do_pagamento(operacao, anteriores):
+    """Venda a pagar: `venda_id` do servidor ou a chave da `retirada` feita offline
+    (com `produto_id` se ela tinha mais de um produto)"""
+    if operacao.get('venda_id') is not None:
+        return _inteiro_positivo(operacao['venda_id'], 'Venda')
+    retirada = anteriores.get(operacao.get('retirada'))
+    if retirada is None or retirada.get('status') != 'aplicada' or 'vendas' not in retirada:
+        raise OperacaoRecusada(f'Retirada não encontrada ou recusada: {operacao.get("retirada")}')
+    vendas = dict(retirada['vendas'])
+    produto_id = operacao.get('produto_id')
+    if produto_id is None and len(vendas) == 1:
+        return next(iter(vendas.values()))
+    if produto_id not in vendas:
+        raise OperacaoRecusada('Informe o produto_id da retirada a pagar')
+    return vendas[produto_id]
+
+def _pagamento(operacao, vendedores, anteriores):
+    venda_id = _venda_do_pagamento(operacao, anteriores)
+    try:
+        valor = Decimal(str(operacao.get('valor'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise OperacaoRecusada(f'Valor inválido: {operacao.get("valor")}')
+    if not valor > 0:
+        raise OperacaoRecusada(f'Valor inválido: {valor}')
+    metodo = operacao.get('metodo')
+    if metodo not in METODOS_PAGAMENTO:
+        raise OperacaoRecusada(f'Método de pagamento inválido: {metodo}')
+    pagamento = registrar_pagamento(venda_id, valor, metodo, _data(operacao.get('data')))
+    return {'status': 'aplicada', 'pagamento_id': pagamento.id, 'venda_id': venda_id}
+
+OPERACOES = {
+    'retirada': _retirada,
+    'pagamento': _pagamento,
+}
+
+def aplicar_operacoes(operacoes, usuario_id):
+    """Aplica as operações em ordem, na transação corrente (sem commit); um resultado por operação.
+
+    `operacoes` são dicts com `chave` (única, até 64 caracteres) e `tipo`.
+    Operação recusada (estoque, saldo, dados) não desfaz as outras: cada uma
+    roda num SAVEPOINT, e a recusa também fica gravada para a chave.
+    """
+    agora = datetime.utcnow()
+    # Reserva as chaves antes de aplicar qualquer coisa. O INSERT já pega a
+    # trava de escrita do SQLite: um reenvio simultâneo (caixa que desistiu de
+    # esperar a resposta) fica parado aqui e depois encontra as chaves gravadas.
+    novas = set(db.session.scalars(
+        insert(OperacaoSync).values([{
+            'chave': operacao['chave'], 'tipo': str(operacao.get('tipo'))[:20],
+            'usuario_id': usuario_id, 'criado_em': agora,
+        } for operacao in operacoes]).on_conflict_do_nothing().returning(OperacaoSync.chave)
+    ))
+    # Resultados gravados antes: reenvios e retiradas citadas pelos pagamentos.
+    # Só os deste usuário: a chave de outro caixa é recusada sem mostrar o resultado dele
+    citadas = {operacao['retirada'] for operacao in operacoes if isinstance(operacao.get('retirada'), str)}
+    buscar = ({operacao['chave'] for operacao in operacoes} - novas) | (citadas - novas)
+    anteriores = {chave: json.loads(resultado) for chave, resultado in db.session.execute(
+        db.select(OperacaoSync.chave, OperacaoSync.resultado)
+        .where(OperacaoSync.chave.in_(buscar), OperacaoSync.usuario_id == usuario_id,
+               OperacaoSync.resultado.is_not(None))
+    )} if buscar else {}
+    vendedores = {id for id, _ in opcoes_vendedores({
+        operacao.get('vendedor_id') for operacao in operacoes if isinstance(operacao.get('vendedor_id'), int)
+    })}
+
+    resultados = []
+    gravar = []
+    for operacao in operacoes:
+        chave = operacao['chave']
+        if chave not in novas:
+            resultados.append({**anteriores.get(chave, {'chave': chave, 'status': 'recusada',
+                                                        'erro': 'Chave usada por outra operação'}),
+                               'repetida': True})
+            continue
+        aplicar = OPERACOES.get(operacao.get('tipo'))
+        try:
+            if aplicar is None:
+                raise OperacaoRecusada(f'Tipo de operação desconhecido: {operacao.get("tipo")}')
+            with db.session.begin_nested():
+                resultado = aplicar(operacao, vendedores, anteriores)
+        except (OperacaoRecusada, EstoqueInsuficiente, PagamentoInvalido) as e:
+            resultado = {'status': 'recusada', 'erro': str(e)}
+        resultado = {'chave': chave, **resultado}
+        anteriores[chave] = resultado  # pagamentos seguintes podem citar esta retirada
+        resultados.append(resultado)
+        gravar.append({'chave': chave, 'resultado': json.dumps(resultado, separators=(',', ':'))})
+    if gravar:
+        db.session.execute(update(OperacaoSync), gravar)
+    return resultados
+
+def limpar_chaves(retencao):
+    """Apaga as chaves de idempotência com mais de `retencao` segundos e faz commit"""
+    limite = datetime.utcnow() - timedelta(seconds=retencao)
+    apagadas = db.session.execute(delete(OperacaoSync).where(OperacaoSync.criado_em < limite)).rowcount
+    db.session.commit()
+    return apagadas
+
+def _manter_chaves(config):
+    limpar_chaves(config['SYNC_RETENCAO_CHAVES'])
+
+def _json_compacto(dados, status=200):
+    """JSON sem espaços, em gzip se for grande e o cliente aceitar (a primeira carga de um caixa novo)"""
+    corpo = json.dumps(dados, separators=(',', ':')).encode()
+    resposta = current_app.response_class(corpo, status=status, mimetype='application/json')
+    if len(corpo) > COMPRIMIR_ACIMA and request.accept_encodings['gzip']:
+        resposta.set_data(gzip.compress(corpo, compresslevel=6))
+        resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.vary.add('Accept-Encoding')
+    return resposta
+
+bp = Blueprint('sincronizacao', __name__, url_prefix='/sync')
+
+@bp.route('/sessao', methods=['POST'])
+def entrar():
+    """Login do caixa por JSON ({"usuario", "senha"}); a sessão segue no cookie, como no navegador"""
+    dados = request.get_json(silent=True) or {}
+    usuario = db.session.scalar(db.select(User).where(User.username == str(dados.get('usuario', ''))))
+    try:
+        senha_ok = usuario is not None and usuario.check_password(str(dados.get('senha', '')))
+    except SenhasOcupado:
+        return jsonify(erro='Muitos acessos simultâneos, tente novamente em instantes'), 503
+    if not senha_ok:
+        return jsonify(erro='Usuário ou senha incorretos'), 401
+    login_user(usuario, remember=True)
+    return jsonify(id=usuario.id, usuario=usuario.username, papel=usuario.role)
+
+@bp.route('/')
+@login_required
+def receber():
+    """Alterações depois de ?desde= (0 na primeira carga); repetir com o cursor enquanto `mais`"""
+    try:
+        desde = int(request.args.get('desde', 0))
+    except ValueError:
+        return jsonify(erro='Cursor inválido'), 400
+    return _json_compacto(alteracoes_desde(desde, current_app.config['SYNC_LOTE']))
+
+@bp.route('/', methods=['POST'])
+@login_required
+def enviar():
+    """Fila offline do caixa: {"operacoes": [{"chave", "tipo": "retirada"|"pagamento", ...}]}"""
+    # Só JSON: um formulário de outro site não consegue mandar este corpo com o cookie
+    if not request.is_json:
+        return jsonify(erro='Envie as operações em JSON'), 415
+    operacoes = (request.get_json(silent=True) or {}).get('operacoes')
+    if not isinstance(operacoes, list) or not all(isinstance(operacao, dict) for operacao in operacoes):
+        return jsonify(erro='Formato: {"operacoes": [...]}'), 400
+    limite = current_app.config['SYNC_MAX_OPERACOES']
+    if len(operacoes) > limite:
+        return jsonify(erro=f'Envie no máximo {limite} operações por vez'), 413
+    chaves = [operacao.get('chave') for operacao in operacoes]
+    if not all(isinstance(chave, str) and 0 < len(chave) <= 64 for chave in chaves):
+        return jsonify(erro='Toda operação precisa de uma chave de até 64 caracteres'), 400
+    if len(set(chaves)) != len(chaves):
+        return jsonify(erro='Chave repetida no mesmo envio'), 400
+    if not operacoes:
+        return _json_compacto({'resultados': []})
+
+    resultados = aplicar_operacoes(operacoes, current_user.id)
+    db.session.commit()
+    return _json_compacto({'resultados': resultados})
+
+def init_sincronizacao(app):
+    """Registra /sync (alterações por cursor e envio da fila offline dos caixas) e a limpeza das chaves"""
+    registrar_manutencao(_manter_chaves)
+    app.register_blueprint(bp)
@@ -0,0 +1,166 @@
+// static/js/ao_vivo.js
+// Feed ao vivo (Server-Sent Events de /eventos/): aplica na página as
+// alterações de estoque, vendas e pagamentos sem recarregar.
+//
+//   <script src=".../ao_vivo.js" data-url="/eventos/" data-desde="123"></script>
+//
+// data-desde é o último evento que a página já reflete. Cada mensagem traz a
+// lista de alterações de um commit; os valores são absolutos, então aplicar a
+// mesma alteração duas vezes não muda o resultado.
+
+(function () {
+    const script = document.currentScript;
+    const DESTAQUE_MS = 2000;
+
+    function moeda(valor) {
+        return 'R$ ' + Number(valor).toFixed(2);
+    }
+
+    function dataHora(iso) {
+        const d = new Date(iso);
+        const dois = function (n) { return String(n).padStart(2, '0'); };
+        return dois(d.getDate()) + '/' + dois(d.getMonth() + 1) + '/' + d.getFullYear() +
+            ' ' + dois(d.getHours()) + ':' + dois(d.getMinutes());
+    }
+
+    function destacar(linha) {
+        linha.classList.add('table-info');
+        setTimeout(function () { linha.classList.remove('table-info'); }, DESTAQUE_MS);
+    }
+
+    function celula(texto, classe) {
+        const td = document.createElement('td');
+        td.textContent = texto;
+        if (classe) {
+            td.className = classe;
+        }
+        return td;
+    }
+
+    function badge(status) {
+        const span = document.createElement('span');
+        span.className = 'badge ' + (status === 'pago' ? 'bg-success' : 'bg-warning');
+        span.textContent = status.toUpperCase();
+        return span;
+    }
+
+    function inserirNoTopo(tbody, linha) {
+        const vazia = tbody.querySelector('td[colspan]');
+        if (vazia) {
+            vazia.closest('tr').remove();
+        }
+        tbody.prepend(linha);
+        destacar(linha);
+    }
+
+    const aplicar = {
+        metricas: function (dados) {
+            Object.keys(dados).forEach(function (nome) {
+                if (nome === 'tipo') {
+                    return;
+                }
+                document.querySelectorAll('[data-metrica="' + nome + '"]').forEach(function (el) {
+                    el.dataset.valor = dados[nome];
+                    el.textContent = el.dataset.formato === 'moeda' ? moeda(dados[nome]) : Math.round(dados[nome]);
+                });
+            });
+        },
+
+        estoque: function (dados) {
+            const linha = document.querySelector('tr[data-produto-id="' + dados.produto_id + '"]');
+            if (!linha) {
+                return;
+            }
+            linha.querySelector('.produto-quantidade').textContent = dados.quantidade_estoque;
+            linha.querySelector('.produto-valor').textContent =
+                moeda(dados.quantidade_estoque * Number(linha.dataset.preco));
+            destacar(linha);
+        },
+
+        produto: function (dados) {
+            const linha = document.querySelector('tr[data-produto-id="' + dados.id + '"]');
+            if (dados.acao === 'excluido' && linha) {
+                linha.remove();
+            } else if (dados.acao === 'editado' && linha) {
+                linha.querySelector('.produto-nome').textContent = dados.nome;
+                destacar(linha);
+            } else if (dados.acao === 'criado' && window.atualizarEstoque) {
+                window.atualizarEstoque();  // a posição depende da ordem alfabética
+            }
+        },
+
+        catalogo: function () {
+            if (window.atualizarEstoque) {
+                window.atualizarEstoque();
+            }
+        },
+
+        venda: function (dados) {
+            const tbody = document.getElementById('vendas-ao-vivo');
+            if (!tbody || !tbody.dataset.aoVivo || tbody.querySelector('tr[data-venda-id="' + dados.id + '"]')) {
+                return;
+            }
+            const linha = document.createElement('tr');
+            linha.dataset.vendaId = dados.id;
+            linha.append(
+                celula(dados.produto),
+                celula(dados.quantidade),
+                celula(moeda(dados.preco_unitario)),
+                celula(moeda(dados.valor_pago), 'venda-recebido'),
+                celula(moeda(dados.valor_total - dados.valor_pago), 'venda-saldo text-danger'),
+                celula(moeda(dados.valor_total)),
+                celula(dataHora(dados.data_venda)),
+                celula('', 'venda-status')
+            );
+            linha.querySelector('.venda-status').append(badge(dados.status));
+            inserirNoTopo(tbody, linha);
+        },
+
+        pagamento: function (dados) {
+            const venda = document.querySelector('tr[data-venda-id="' + dados.venda_id + '"]');
+            if (venda) {
+                venda.querySelector('.venda-recebido').textContent = moeda(dados.valor_pago);
+                const saldo = venda.querySelector('.venda-saldo');
+                saldo.textContent = moeda(dados.saldo);
+                saldo.classList.toggle('text-danger', dados.saldo > 0);
+                saldo.classList.toggle('text-success', dados.saldo <= 0);
+                const status = venda.querySelector('.venda-status');
+                status.replaceChildren(badge(dados.status));
+                destacar(venda);
+            }
+            const tbody = document.getElementById('pagamentos-ao-vivo');
+            if (!tbody || !tbody.dataset.aoVivo || tbody.querySelector('tr[data-pagamento-id="' + dados.id + '"]')) {
+                return;
+            }
+            const linha = document.createElement('tr');
+            linha.dataset.pagamentoId = dados.id;
+            linha.append(
+                celula('#' + dados.venda_id),
+                celula(moeda(dados.valor)),
+                celula((dados.metodo || '').toUpperCase()),
+                celula(dataHora(dados.data_pagamento))
+            );
+            inserirNoTopo(tbody, linha);
+        }
+    };
+
+    if (!window.EventSource) {
+        return;
+    }
+    const fonte = new EventSource(script.dataset.url + '?desde=' + encodeURIComponent(script.dataset.desde));
+
+    fonte.addEventListener('alteracoes', function (evento) {
+        JSON.parse(evento.data).forEach(function (alteracao) {
+            const funcao = aplicar[alteracao.tipo];
+            if (funcao) {
+                funcao(alteracao);
+            }
+        });
+    });
+
+    // A página ficou para trás demais para recuperar pelo histórico
+    fonte.addEventListener('recarregar', function () {
+        fonte.close();
+        window.location.reload();
+    });
+})();
@@ -0,0 +1,92 @@
+// static/js/busca.js
+// Selects com busca: as opções vêm de /dashboard/busca/<tipo> conforme o usuário digita.
+//
+//   <div class="busca" data-url="/dashboard/busca/produtos">
+//       <input type="search" class="busca-texto">
+//       <select class="busca-opcoes">...</select>
+//   </div>
+//
+// Os eventos são delegados ao document, então linhas clonadas (retirada em
+// lote) funcionam sem reinicialização.
+
+(function () {
+    const ESPERA_MS = 250;
+    const MAIS = '__mais__';
+
+    function carregar(bloco, anexar) {
+        const texto = bloco.querySelector('.busca-texto').value;
+        const select = bloco.querySelector('.busca-opcoes');
+        const params = new URLSearchParams({ q: texto });
+        if (anexar && bloco.dataset.proximo) {
+            params.set('cursor', bloco.dataset.proximo);
+        }
+
+        const pedido = (bloco._pedido || 0) + 1;
+        bloco._pedido = pedido;
+        return fetch(bloco.dataset.url + '?' + params.toString(), { headers: { 'Accept': 'application/json' } })
+            .then(function (resposta) { return resposta.json(); })
+            .then(function (dados) {
+                if (pedido !== bloco._pedido) {
+                    return;  // resposta de uma busca já substituída por outra
+                }
+                const selecionado = select.value;
+                const mais = select.querySelector('option[value="' + MAIS + '"]');
+                if (mais) {
+                    mais.remove();
+                }
+                if (!anexar) {
+                    Array.from(select.options).forEach(function (opcao) {
+                        if (opcao.value !== selecionado || !opcao.selected) {
+                            opcao.remove();
+                        }
+                    });
+                }
+                dados.itens.forEach(function (item) {
+                    if (!select.querySelector('option[value="' + item.id + '"]')) {
+                        select.add(new Option(item.texto, item.id));
+                    }
+                });
+                if (dados.proximo) {
+                    select.add(new Option('Mais resultados…', MAIS));
+                }
+                bloco.dataset.proximo = dados.proximo || '';
+                bloco.dataset.carregado = '1';
+            });
+    }
+
+    document.addEventListener('input', function (evento) {
+        const bloco = evento.target.closest('.busca');
+        if (!bloco || !evento.target.classList.contains('busca-texto')) {
+            return;
+        }
+        clearTimeout(bloco._espera);
+        bloco._espera = setTimeout(function () { carregar(bloco, false); }, ESPERA_MS);
+    });
+
+    document.addEventListener('change', function (evento) {
+        const select = evento.target;
+        const bloco = select.closest('.busca');
+        if (bloco && select.classList.contains('busca-opcoes') && select.value === MAIS) {
+            select.selectedIndex = -1;
+            carregar(bloco, true);
+        }
+    });
+
+    // Primeira página ao focar o select ainda vazio
+    document.addEventListener('focusin', function (evento) {
+        const bloco = evento.target.closest('.busca');
+        if (bloco && evento.target.classList.contains('busca-opcoes') && !bloco.dataset.carregado) {
+            carregar(bloco, false);
+        }
+    });
+
+    // Linhas clonadas herdam o estado do bloco original: recarregam no próximo foco
+    window.reiniciarBusca = function (elemento) {
+        elemento.querySelectorAll('.busca').forEach(function (bloco) {
+            delete bloco.dataset.carregado;
+            bloco.dataset.proximo = '';
+            bloco.querySelector('.busca-texto').value = '';
+            bloco.querySelector('.busca-opcoes').innerHTML = '';
+        });
+    };
+})();
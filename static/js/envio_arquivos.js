@@ -0,0 +1,85 @@
+// static/js/envio_arquivos.js
+// Envio de fotos em streaming: cada arquivo do <input type="file"> sobe
+// sozinho para /arquivos/ com o próprio File como corpo (sem multipart), e o
+// formulário segue só com os hashes em campos "enviado". Assim um lote de
+// notas não esbarra no MAX_CONTENT_LENGTH de um único request.
+//
+//   <form data-envio-url="/arquivos/"> ... <div id="envio-status"></div>
+//
+// Sem fetch o formulário é enviado como multipart, do jeito normal.
+
+(function () {
+    const SIMULTANEOS = 3;
+
+    const form = document.querySelector('form[data-envio-url]');
+    if (!form || !window.fetch) {
+        return;
+    }
+    const entrada = form.querySelector('input[type="file"]');
+    const status = document.getElementById('envio-status');
+    const botao = form.querySelector('button[type="submit"]');
+
+    function enviar(arquivo) {
+        return fetch(form.dataset.envioUrl, {
+            method: 'POST',
+            body: arquivo,
+            headers: {
+                'Content-Type': arquivo.type || 'application/octet-stream',
+                'X-Nome-Arquivo': encodeURIComponent(arquivo.name)
+            }
+        }).then(function (resposta) {
+            return resposta.json().then(function (dados) {
+                if (!resposta.ok) {
+                    throw new Error(arquivo.name + ': ' + (dados.erro || resposta.status));
+                }
+                return dados.arquivos[0].hash;
+            });
+        });
+    }
+
+    form.addEventListener('submit', function (evento) {
+        const arquivos = Array.from(entrada.files);
+        if (!arquivos.length) {
+            return;
+        }
+        evento.preventDefault();
+        botao.disabled = true;
+        const hashes = new Array(arquivos.length);
+        let proximo = 0;
+        let prontos = 0;
+
+        // Algumas conexões em paralelo, mantendo a ordem das páginas nos hashes
+        function trabalhador() {
+            if (proximo >= arquivos.length) {
+                return Promise.resolve();
+            }
+            const indice = proximo++;
+            return enviar(arquivos[indice]).then(function (hash) {
+                hashes[indice] = hash;
+                prontos += 1;
+                status.textContent = 'Enviadas ' + prontos + ' de ' + arquivos.length;
+                return trabalhador();
+            });
+        }
+
+        const trabalhadores = [];
+        for (let i = 0; i < Math.min(SIMULTANEOS, arquivos.length); i++) {
+            trabalhadores.push(trabalhador());
+        }
+        Promise.all(trabalhadores).then(function () {
+            hashes.forEach(function (hash) {
+                const campo = document.createElement('input');
+                campo.type = 'hidden';
+                campo.name = 'enviado';
+                campo.value = hash;
+                form.append(campo);
+            });
+            entrada.value = '';  // as fotos já estão no servidor
+            form.submit();
+        }).catch(function (erro) {
+            status.textContent = erro.message;
+            status.classList.add('text-danger');
+            botao.disabled = false;
+        });
+    });
+})();
@@ -0,0 +1,89 @@
+// static/js/estoque_tabela.js
+// Tabela de estoque por fragmentos: filtro, "Carregar mais" e atualização
+// periódica buscam só as linhas em /dashboard/estoque/tabela/linhas.
+//
+// A resposta leva um ETag (versão do estoque); com cache: 'no-cache' o
+// navegador revalida com If-None-Match e o servidor responde 304 enquanto
+// nada mudou, então a atualização periódica quase não custa nada.
+
+(function () {
+    const ESPERA_MS = 300;
+    const INTERVALO_MS = 30000;
+
+    const tabela = document.getElementById('tabela-estoque');
+    if (!tabela) {
+        return;
+    }
+    const filtro = document.getElementById('filtro-estoque');
+    const linhas = document.getElementById('linhas-estoque');
+    const mais = document.getElementById('mais-estoque');
+    let paginas = 1;
+    let versao = tabela.dataset.etag;
+    let pedido = 0;
+
+    function buscar(cursor) {
+        const params = new URLSearchParams({ q: filtro.value });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const atual = ++pedido;
+        return fetch(tabela.dataset.url + '?' + params.toString(), { cache: 'no-cache' })
+            .then(function (resposta) {
+                if (!resposta.ok) {
+                    throw new Error(resposta.status);
+                }
+                return resposta.text().then(function (html) {
+                    return {
+                        atual: atual === pedido,
+                        html: html,
+                        etag: resposta.headers.get('ETag'),
+                        proximo: resposta.headers.get('X-Proximo-Cursor') || ''
+                    };
+                });
+            });
+    }
+
+    function aplicar(dados, anexar) {
+        if (!dados.atual) {
+            return;  // resposta de um filtro já substituído por outro
+        }
+        if (anexar) {
+            linhas.insertAdjacentHTML('beforeend', dados.html);
+            paginas += 1;
+        } else {
+            linhas.innerHTML = dados.html;
+            paginas = 1;
+        }
+        versao = dados.etag;
+        tabela.dataset.proximo = dados.proximo;
+        mais.hidden = !dados.proximo;
+    }
+
+    filtro.addEventListener('input', function () {
+        clearTimeout(filtro._espera);
+        filtro._espera = setTimeout(function () {
+            buscar(null).then(function (dados) { aplicar(dados, false); });
+        }, ESPERA_MS);
+    });
+
+    mais.addEventListener('click', function () {
+        buscar(tabela.dataset.proximo).then(function (dados) { aplicar(dados, true); });
+    });
+
+    // Só a primeira página é atualizada sozinha, para não desfazer a rolagem
+    // de quem já carregou mais linhas. Um 304 volta do cache com o mesmo ETag.
+    function atualizar() {
+        if (document.hidden || paginas > 1) {
+            return;
+        }
+        buscar(null).then(function (dados) {
+            if (dados.etag !== versao) {
+                aplicar(dados, false);
+            }
+        }).catch(function () {});
+    }
+
+    setInterval(atualizar, INTERVALO_MS);
+    // Usado pelo feed ao vivo (ao_vivo.js) quando entra um produto novo
+    window.atualizarEstoque = atualizar;
+})();
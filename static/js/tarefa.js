@@ -0,0 +1,49 @@
+// static/js/tarefa.js
+// Página de uma tarefa em segundo plano: consulta /tarefas/<id>/status e
+// atualiza a barra de progresso; quando a tarefa termina, recarrega a página
+// para mostrar o resultado (relatório ou download).
+//
+//   <script src=".../tarefa.js" data-url="/tarefas/7/status"></script>
+
+(function () {
+    const INTERVALO_MS = 1000;
+    const url = document.currentScript.dataset.url;
+    const barra = document.getElementById('barra-tarefa');
+    const progresso = document.getElementById('progresso-tarefa');
+    const mensagem = document.getElementById('mensagem-tarefa');
+    const status = document.getElementById('status-tarefa');
+
+    function aplicar(estado) {
+        if (estado.finalizada) {
+            window.location.reload();
+            return false;
+        }
+        const percentual = estado.percentual === null ? 100 : estado.percentual;
+        barra.style.width = percentual + '%';
+        barra.textContent = estado.percentual === null ? '' : percentual + '%';
+        progresso.textContent = estado.progresso_atual +
+            (estado.progresso_total ? ' de ' + estado.progresso_total : '');
+        if (estado.mensagem) {
+            mensagem.textContent = estado.mensagem;
+        }
+        status.textContent = estado.status.toUpperCase();
+        return true;
+    }
+
+    function consultar() {
+        if (document.hidden) {
+            setTimeout(consultar, INTERVALO_MS);
+            return;
+        }
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(function (resposta) { return resposta.json(); })
+            .then(function (estado) {
+                if (aplicar(estado)) {
+                    setTimeout(consultar, INTERVALO_MS);
+                }
+            })
+            .catch(function () { setTimeout(consultar, INTERVALO_MS * 5); });
+    }
+
+    setTimeout(consultar, INTERVALO_MS);
+})();
@@ -0,0 +1,421 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import (Blueprint, current_app, flash, jsonify, redirect, render_template, request,
+                   send_from_directory, url_for)
+from flask_login import current_user, login_required
+from sqlalchemy import delete, event, update
+from sqlalchemy.orm import Session, joinedload
+from extensions import db
+from models import Tarefa
+
+# Tarefas em segundo plano. A fila é a tabela `jobs`: a rota grava a tarefa e
+# responde na hora com o id, e threads do próprio worker (ou um processo à
+# parte, `flask processar-tarefas`) pegam as pendentes com um UPDATE
+# condicional, então cada tarefa roda uma única vez mesmo com vários workers.
+# Entrada e resultado ficam em TAREFAS_PASTA/<id>/ até a retenção vencer.
+
+PENDENTE, EXECUTANDO, CONCLUIDA, FALHOU, CANCELADA = 'pendente', 'executando', 'concluida', 'falhou', 'cancelada'
+FINAIS = (CONCLUIDA, FALHOU, CANCELADA)
+MANUTENCAO_A_CADA = 600  # segundos entre limpezas de tarefas vencidas/abandonadas e MANUTENCOES (por processo)
+
+TIPOS = {}  # tipo -> (função, título)
+MANUTENCOES = []  # funcao(config) chamadas junto com a limpeza das tarefas
+
+def registrar_manutencao(funcao):
+    """Roda `funcao(config)` na manutenção periódica de cada worker (init_* dos módulos)"""
+    if funcao not in MANUTENCOES:
+        MANUTENCOES.append(funcao)
+    return funcao
+
+def tarefa(tipo, titulo):
+    """Registra `funcao(contexto, **parametros)` como um tipo de tarefa.
+
+    O retorno (serializável em JSON) vira o resultado da tarefa; um arquivo
+    para download é gravado em contexto.caminho(...) e indicado com
+    contexto.entregar(...).
+    """
+    def registrar(funcao):
+        TIPOS[tipo] = (funcao, titulo)
+        return funcao
+    return registrar
+
+class TarefaCancelada(Exception):
+    """Levantada por Contexto.progresso quando o cancelamento foi pedido"""
+
+class Contexto:
+    """O que a função da tarefa recebe: pasta de arquivos, progresso e cancelamento"""
+
+    def __init__(self, tarefa_id, pasta, intervalo=0.5):
+        self.tarefa_id = tarefa_id
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.arquivo = None
+        self.nome_download = None
+        self._ultima = None
+
+    def caminho(self, nome):
+        os.makedirs(self.pasta, exist_ok=True)
+        return os.path.join(self.pasta, nome)
+
+    def entregar(self, nome, nome_download):
+        """Marca caminho(nome) como o resultado que o usuário baixa"""
+        self.arquivo, self.nome_download = nome, nome_download
+
+    def progresso(self, atual, total=None, mensagem=None):
+        """Grava o progresso (no máximo a cada `intervalo` s) e checa o cancelamento.
+
+        Usa uma conexão própria, fora da sessão da tarefa: chamar entre commits,
+        nunca com escrita pendente (no SQLite a trava de escrita seria a da
+        própria tarefa).
+        """
+        agora = time.monotonic()
+        if self._ultima is not None and agora - self._ultima < self.intervalo:
+            return
+        self._ultima = agora
+        valores = {'progresso_atual': atual, 'progresso_total': total, 'atualizado_em': datetime.utcnow()}
+        if mensagem is not None:
+            valores['mensagem'] = mensagem[:200]
+        with db.engine.begin() as conexao:
+            cancelar = conexao.execute(
+                update(Tarefa).where(Tarefa.id == self.tarefa_id).values(**valores)
+                .returning(Tarefa.cancelamento_pedido)
+            ).scalar()
+        if cancelar:
+            raise TarefaCancelada()
+
+def pasta_da_tarefa(tarefa_id):
+    """Pasta de entrada e resultado da tarefa (criada se faltar)"""
+    pasta = os.path.join(current_app.config['TAREFAS_PASTA'], str(tarefa_id))
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+def enfileirar(tipo, usuario_id=None, /, **parametros):
+    """Cria a tarefa na transação corrente (sem commit); os workers são avisados no commit"""
+    if tipo not in TIPOS:
+        raise LookupError(f'Tipo de tarefa desconhecido: {tipo}')
+    nova = Tarefa(tipo=tipo, usuario_id=usuario_id, status=PENDENTE, parametros=json.dumps(parametros))
+    db.session.add(nova)
+    db.session.flush()
+    db.session.info['tarefas_novas'] = True
+    return nova
+
+def cancelar(tarefa_id):
+    """Pendente: cancela na hora. Executando: a tarefa para no próximo progresso.
+
+    Retorna False se a tarefa já tinha terminado.
+    """
+    agora = datetime.utcnow()
+    cancelada = db.session.execute(
+        update(Tarefa).where(Tarefa.id == tarefa_id, Tarefa.status == PENDENTE)
+        .values(status=CANCELADA, mensagem='Cancelada antes de começar', concluido_em=agora)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not cancelada:
+        cancelada = db.session.execute(
+            update(Tarefa).where(Tarefa.id == tarefa_id, Tarefa.status == EXECUTANDO)
+            .values(cancelamento_pedido=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    db.session.commit()
+    return bool(cancelada)
+
+def _pegar_proxima():
+    """Marca a pendente mais antiga como executando e retorna o id (None se não houver)"""
+    # Leitura antes: com a fila vazia o polling não disputa a trava de escrita
+    if db.session.scalar(db.select(Tarefa.id).where(Tarefa.status == PENDENTE).limit(1)) is None:
+        db.session.rollback()
+        return None
+    agora = datetime.utcnow()
+    proxima = (db.select(Tarefa.id).where(Tarefa.status == PENDENTE)
+               .order_by(Tarefa.id).limit(1).scalar_subquery())
+    # A condição de status repetida no UPDATE garante um único vencedor
+    tarefa_id = db.session.execute(
+        update(Tarefa).where(Tarefa.id == proxima, Tarefa.status == PENDENTE)
+        .values(status=EXECUTANDO, iniciado_em=agora, atualizado_em=agora)
+        .returning(Tarefa.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    db.session.commit()
+    return tarefa_id
+
+def _executar(tarefa_id):
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    tipo = tarefa.tipo
+    funcao = TIPOS.get(tipo, (None,))[0]
+    parametros = json.loads(tarefa.parametros)
+    db.session.commit()  # encerra a leitura antes de a tarefa começar
+    contexto = Contexto(tarefa_id, pasta_da_tarefa(tarefa_id))
+    inicio = time.perf_counter()
+    try:
+        if funcao is None:
+            raise LookupError(f'Tipo de tarefa desconhecido: {tipo}')
+        resultado = funcao(contexto, **parametros)
+    except TarefaCancelada:
+        db.session.rollback()
+        valores = {'status': CANCELADA, 'mensagem': 'Cancelada pelo usuário'}
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Tarefa #%s (%s) falhou', tarefa_id, tipo)
+        valores = {'status': FALHOU, 'mensagem': str(e)[:200]}
+    else:
+        valores = {
+            'status': CONCLUIDA,
+            'mensagem': f'Concluída em {time.perf_counter() - inicio:.1f} s',
+            'resultado': None if resultado is None else json.dumps(resultado, default=str),
+            'arquivo': contexto.arquivo,
+            'nome_download': contexto.nome_download,
+            'progresso_atual': db.func.coalesce(Tarefa.progresso_total, Tarefa.progresso_atual),
+        }
+    agora = datetime.utcnow()
+    # Só fecha se ainda estiver executando: marcar_abandonadas pode já tê-la
+    # dado como falha (worker lento demais), e essa decisão prevalece
+    fechada = db.session.execute(
+        update(Tarefa).where(Tarefa.id == tarefa_id, Tarefa.status == EXECUTANDO)
+        .values(concluido_em=agora, atualizado_em=agora, **valores)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not fechada:
+        current_app.logger.warning('Tarefa #%s (%s) já estava encerrada; resultado descartado', tarefa_id, tipo)
+
+def marcar_abandonadas(segundos):
+    """Executando sem batimento há mais de `segundos`: o processo que a rodava parou"""
+    agora = datetime.utcnow()
+    abandonadas = db.session.execute(
+        update(Tarefa)
+        .where(Tarefa.status == EXECUTANDO, Tarefa.atualizado_em < agora - timedelta(seconds=segundos))
+        .values(status=FALHOU, mensagem='Interrompida: o processo que a executava parou', concluido_em=agora)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return abandonadas
+
+def limpar_vencidas(segundos):
+    """Apaga tarefas finalizadas há mais de `segundos`, com seus arquivos"""
+    limite = datetime.utcnow() - timedelta(seconds=segundos)
+    ids = db.session.scalars(
+        db.select(Tarefa.id).where(Tarefa.status.in_(FINAIS), Tarefa.concluido_em < limite)
+    ).all()
+    for tarefa_id in ids:
+        shutil.rmtree(os.path.join(current_app.config['TAREFAS_PASTA'], str(tarefa_id)), ignore_errors=True)
+    if ids:
+        db.session.execute(delete(Tarefa).where(Tarefa.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+class Executor:
+    """Executa as tarefas pendentes em threads deste processo.
+
+    As threads sobem no primeiro request do processo (depois do fork do
+    servidor) e dormem até este processo enfileirar algo ou até passar
+    `intervalo` segundos, quando conferem a fila por tarefas de outros workers.
+    """
+
+    def __init__(self, workers=2, intervalo=2.0, retencao=7 * 24 * 3600, abandono=600):
+        self.configurar(workers, intervalo, retencao, abandono)
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._manutencao = None
+
+    def configurar(self, workers, intervalo, retencao, abandono):
+        self.workers = workers
+        self.intervalo = intervalo
+        self.retencao = retencao
+        self.abandono = abandono
+
+    def iniciar(self, app):
+        """Sobe as threads uma vez por processo (nada se workers == 0)"""
+        if not self.workers or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for i in range(self.workers):
+                threading.Thread(target=self._laco, args=(app,), name=f'tarefas-{i}', daemon=True).start()
+
+    def acordar(self):
+        self._acordar.set()
+
+    def executar_proxima(self, app):
+        """Pega e executa uma tarefa pendente; False se a fila estava vazia"""
+        with app.app_context():
+            self._manter()
+            tarefa_id = _pegar_proxima()
+        if tarefa_id is None:
+            return False
+        self._acordar.set()  # pode haver outra na fila: uma thread livre confere
+        with app.app_context():
+            _executar(tarefa_id)
+        return True
+
+    def processar(self, app, continuo=True):
+        """Executa a fila no processo atual (flask processar-tarefas); retorna quantas rodou"""
+        executadas = 0
+        while True:
+            while self.executar_proxima(app):
+                executadas += 1
+            if not continuo:
+                return executadas
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+
+    def _laco(self, app):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            try:
+                while self.executar_proxima(app):
+                    pass
+            except Exception:
+                app.logger.exception('Falha ao buscar tarefas pendentes')
+
+    def _manter(self):
+        agora = time.monotonic()
+        with self._lock:
+            if self._manutencao is not None and agora - self._manutencao < MANUTENCAO_A_CADA:
+                return
+            self._manutencao = agora
+        marcar_abandonadas(self.abandono)
+        limpar_vencidas(self.retencao)
+        # Manutenções de outros módulos pegam carona: já roda em todo worker
+        # sem bloquear requests, e uma que falhe não impede as demais
+        for funcao in MANUTENCOES:
+            try:
+                funcao(current_app.config)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('Falha na manutenção %s', funcao.__name__)
+
+executor = Executor()
+
+def _avisar_apos_commit(session):
+    if session.info.pop('tarefas_novas', None):
+        executor.acordar()
+
+def _descartar(session, *args):
+    session.info.pop('tarefas_novas', None)
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+def descrever(tarefa):
+    """Estado da tarefa em JSON (polling da página e clientes da API)"""
+    percentual = None
+    if tarefa.progresso_total:
+        percentual = min(100, round(100 * tarefa.progresso_atual / tarefa.progresso_total))
+    elif tarefa.status == CONCLUIDA:
+        percentual = 100
+    return {
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'titulo': TIPOS.get(tarefa.tipo, (None, tarefa.tipo))[1],
+        'status': tarefa.status,
+        'finalizada': tarefa.status in FINAIS,
+        'progresso_atual': tarefa.progresso_atual,
+        'progresso_total': tarefa.progresso_total,
+        'percentual': percentual,
+        'mensagem': tarefa.mensagem,
+        'cancelamento_pedido': tarefa.cancelamento_pedido,
+        'criado_em': _iso(tarefa.criado_em),
+        'iniciado_em': _iso(tarefa.iniciado_em),
+        'concluido_em': _iso(tarefa.concluido_em),
+        'resultado': json.loads(tarefa.resultado) if tarefa.resultado else None,
+        'download': url_for('tarefas.download', id=tarefa.id)
+                    if tarefa.status == CONCLUIDA and tarefa.arquivo else None,
+    }
+
+def resposta_enfileirada(nova):
+    """202 com o id para clientes JSON; no navegador, redirect para a página da tarefa"""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(id=nova.id, status=nova.status, url=url_for('tarefas.status', id=nova.id)), 202
+    flash(f'{TIPOS[nova.tipo][1]} iniciada em segundo plano', 'info')
+    return redirect(url_for('tarefas.detalhe', id=nova.id))
+
+def _da_pessoa(tarefa_id):
+    """A tarefa, se existir e for do usuário logado (admin vê todas)"""
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    if tarefa is None or (tarefa.usuario_id != current_user.id and current_user.role != 'admin'):
+        return None
+    return tarefa
+
+bp = Blueprint('tarefas', __name__, url_prefix='/tarefas')
+
+@bp.route('/')
+@login_required
+def lista():
+    consulta = db.select(Tarefa).options(joinedload(Tarefa.usuario)).order_by(Tarefa.id.desc()).limit(50)
+    if current_user.role != 'admin':
+        consulta = consulta.where(Tarefa.usuario_id == current_user.id)
+    return render_template('tarefas/lista.html', tarefas=db.session.scalars(consulta).all(),
+                           tipos=TIPOS, finais=FINAIS)
+
+@bp.route('/<int:id>')
+@login_required
+def detalhe(id):
+    tarefa = _da_pessoa(id)
+    if tarefa is None:
+        flash('Tarefa não encontrada', 'danger')
+        return redirect(url_for('tarefas.lista'))
+    return render_template('tarefas/detalhe.html', tarefa=tarefa, estado=descrever(tarefa))
+
+@bp.route('/<int:id>/status')
+@login_required
+def status(id):
+    tarefa = _da_pessoa(id)
+    if tarefa is None:
+        return jsonify(erro='Tarefa não encontrada'), 404
+    resposta = jsonify(descrever(tarefa))
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+@bp.route('/<int:id>/cancelar', methods=['POST'])
+@login_required
+def cancelar_tarefa(id):
+    tarefa = _da_pessoa(id)
+    if tarefa is None:
+        return jsonify(erro='Tarefa não encontrada'), 404
+    cancelada = cancelar(id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(cancelada=cancelada), 202 if cancelada else 409
+    flash('Cancelamento pedido' if cancelada else 'A tarefa já terminou', 'info' if cancelada else 'warning')
+    return redirect(url_for('tarefas.detalhe', id=id))
+
+@bp.route('/<int:id>/download')
+@login_required
+def download(id):
+    tarefa = _da_pessoa(id)
+    if tarefa is None or tarefa.status != CONCLUIDA or not tarefa.arquivo:
+        flash('Resultado não disponível', 'warning')
+        return redirect(url_for('tarefas.lista'))
+    return send_from_directory(pasta_da_tarefa(id), tarefa.arquivo, as_attachment=True,
+                               download_name=tarefa.nome_download or tarefa.arquivo)
+
+@bp.route('/analytics', methods=['POST'])
+@login_required
+def recalcular_analytics():
+    if current_user.role != 'admin':
+        flash('Acesso não autorizado', 'danger')
+        return redirect(url_for('tarefas.lista'))
+    nova = enfileirar('recalcular_analytics', current_user.id)
+    db.session.commit()
+    return resposta_enfileirada(nova)
+
+def init_tarefas(app):
+    """Configura o executor, avisa as threads no commit e registra /tarefas"""
+    executor.configurar(app.config['TAREFAS_WORKERS'], app.config['TAREFAS_INTERVALO'],
+                        app.config['TAREFAS_RETENCAO'], app.config['TAREFAS_ABANDONO'])
+    for nome, funcao in (('after_commit', _avisar_apos_commit), ('after_rollback', _descartar)):
+        if not event.contains(Session, nome, funcao):
+            event.listen(Session, nome, funcao)
+
+    @app.before_request
+    def _iniciar_executor():
+        executor.iniciar(app)
+
+    app.register_blueprint(bp)
@@ -0,0 +1,46 @@
+import os
+import pytest
+
+# Cada teste roda num app novo, com banco SQLite descartável em tmp_path (como
+# bench.criar_app, mas sem depender de INSTANCE_PATH: Config já foi importado)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    from config import Config
+
+    instancia = str(tmp_path / 'instance')
+    uploads = str(tmp_path / 'uploads')
+    configuracao = {
+        'INSTANCE_PATH': instancia,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(instancia, 'tabacaria.db'),
+        'TAREFAS_PASTA': os.path.join(instancia, 'tarefas'),
+        'UPLOAD_FOLDER': uploads,
+        'UPLOAD_TEMP': str(tmp_path / 'temp_uploads'),
+        'UPLOAD_MINIATURAS': os.path.join(uploads, 'miniaturas'),
+        'TAREFAS_WORKERS': 0,  # tarefas só quando o teste pedir
+        'USER_CACHE_TTL': 0,  # ids de usuário se repetem entre os bancos dos testes
+        'BCRYPT_LOG_ROUNDS': 4,
+        'SQL_DEBUG': True,
+    }
+    for nome, valor in configuracao.items():
+        monkeypatch.setattr(Config, nome, valor)
+
+    from app import create_app
+    from extensions import db
+    from provisionamento import preparar
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    preparar(app)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def cliente(app):
+    """Test client logado como o admin padrão"""
+    cliente = app.test_client()
+    resposta = cliente.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    assert resposta.status_code == 302
+    return cliente
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+# Analytics: as leituras não escrevem no banco e o cache só recalcula a janela
+# quando algo dentro dela pode ter mudado
+
+def _vender(vendedor_id, produto_id, quantidade, valor):
+    from extensions import db
+    from models import Venda
+
+    # Direto na tabela, sem acumular_vendas: como vendas de antes do rollup existir
+    db.session.add(Venda(data_venda=datetime.utcnow(), quantidade=quantidade, preco_unitario=valor / quantidade,
+                         valor_total=valor, vendedor_id=vendedor_id, produto_id=produto_id, status='pendente'))
+    db.session.commit()
+
+def test_rollup_vazio_nao_e_reconstruido_na_leitura(app):
+    from extensions import db
+    from models import Produto, VendaDiaria, Vendedor
+    from analytics import cache, janela_recente, receita_por_produto
+
+    with app.app_context():
+        vendedor = Vendedor(nome='Balcão')
+        produto = Produto(nome='Seda', preco_unitario=2, quantidade_estoque=10)
+        db.session.add_all([vendedor, produto])
+        db.session.commit()
+        _vender(vendedor.id, produto.id, 3, 6)
+        cache.limpar()
+
+        inicio, fim = janela_recente(7)
+        [linha] = receita_por_produto(inicio, fim)
+
+        assert (linha['rotulo'], linha['receita'], linha['quantidade']) == ('Seda', 6.0, 3)
+        assert db.session.scalar(db.select(db.func.count()).select_from(VendaDiaria)) == 0
+
+def test_janela_fechada_sobrevive_as_vendas_do_dia(app):
+    from extensions import db
+    from metricas import incrementar_versao, VERSAO_HISTORICO, VERSAO_VENDAS
+    from analytics import cache
+
+    hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    chamadas = []
+
+    def calcular():
+        chamadas.append(None)
+        return len(chamadas)
+
+    def obter(chave, fim):
+        return cache.obter(chave, calcular, fim)
+
+    with app.app_context():
+        cache.limpar()
+        fechada, aberta = obter('fechada', hoje), obter('aberta', hoje + timedelta(days=1))
+
+        incrementar_versao(VERSAO_VENDAS)
+        db.session.commit()
+        assert obter('fechada', hoje) == fechada
+        assert obter('aberta', hoje + timedelta(days=1)) != aberta
+
+        incrementar_versao(VERSAO_HISTORICO)
+        db.session.commit()
+        assert obter('fechada', hoje) != fechada
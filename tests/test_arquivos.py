@@ -0,0 +1,31 @@
+import os
+import shutil
+import pytest
+
+# Uploads: as pastas de trabalho são criadas no primeiro uso, e um original
+# que o Pillow não decodifica vira 415 sem deixar temporários para trás
+
+PNG_CORROMPIDO = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+def _enviar(cliente, conteudo):
+    return cliente.post('/arquivos/', data=conteudo, content_type='application/octet-stream',
+                        headers={'X-Nome-Arquivo': 'foto.png'})
+
+def test_upload_cria_pasta_temporaria(app, cliente):
+    shutil.rmtree(app.config['UPLOAD_TEMP'])
+
+    resposta = _enviar(cliente, PNG_CORROMPIDO)
+
+    assert resposta.status_code == 201
+    assert os.listdir(app.config['UPLOAD_TEMP']) == []
+
+def test_miniatura_de_imagem_corrompida(app, cliente):
+    pytest.importorskip('PIL')
+    shutil.rmtree(app.config['UPLOAD_MINIATURAS'])
+    enviado = _enviar(cliente, PNG_CORROMPIDO).get_json()['arquivos'][0]
+
+    resposta = cliente.get(enviado['miniatura'])
+
+    assert resposta.status_code == 415
+    sobras = [nome for _, _, nomes in os.walk(app.config['UPLOAD_MINIATURAS']) for nome in nomes]
+    assert sobras == []
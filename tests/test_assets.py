@@ -0,0 +1,20 @@
+import pytest
+
+# Bibliotecas de terceiros: sem static/vendor baixado as páginas usam a CDN,
+# mas o build de produção não é gerado sem as cópias locais
+
+def test_paginas_usam_cdn_sem_bibliotecas_baixadas(app):
+    from assets import BIBLIOTECAS, bibliotecas_ausentes
+
+    ausentes = bibliotecas_ausentes(app.static_folder)
+    if not ausentes:
+        pytest.skip('static/vendor já baixado')
+
+    html = app.test_client().get('/auth/login').get_data(as_text=True)
+    assert all(BIBLIOTECAS[caminho] in html.replace('&amp;', '&') for caminho in ausentes)
+
+def test_build_exige_bibliotecas(tmp_path):
+    from assets import BibliotecasAusentes, construir
+
+    with pytest.raises(BibliotecasAusentes):
+        construir(str(tmp_path))
@@ -0,0 +1,24 @@
+# Busca por prefixo sem diferenciar maiúsculas: a faixa sobre lower(nome) só
+# serve para texto ASCII, já que o lower() do SQLite não mexe nos acentos
+
+def _nomes(texto):
+    from busca import buscar_produtos
+
+    produtos, _ = buscar_produtos(texto)
+    return sorted(p['texto'].split(' (')[0] for p in produtos)
+
+def test_prefixo_com_e_sem_acento(app):
+    from extensions import db
+    from models import Produto
+
+    with app.app_context():
+        db.session.add_all([Produto(nome=nome, preco_unitario=1, quantidade_estoque=1)
+                            for nome in ('Çachimbo Árabe', 'Cachimbo', 'Charuto', 'Seda_Ñandu', 'SedaxÑandu')])
+        db.session.commit()
+
+        assert _nomes('ca') == ['Cachimbo']
+        assert _nomes('CH') == ['Charuto']
+        assert _nomes('Ça') == _nomes('ÇACH') == ['Çachimbo Árabe']
+        assert _nomes('Çá') == []
+        # Curingas do LIKE digitados na busca são literais
+        assert _nomes('seda_Ñ') == ['Seda_Ñandu']
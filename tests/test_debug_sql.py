@@ -0,0 +1,40 @@
+import pytest
+from datetime import datetime
+from debug_sql import NPlusOneError
+
+def _popular(db):
+    from models import Produto, Venda, Vendedor
+
+    vendedor = Vendedor(nome='Vendedor')
+    produtos = [Produto(nome=f'Produto {n}', preco_unitario=5, quantidade_estoque=10) for n in range(3)]
+    db.session.add_all([vendedor, *produtos])
+    db.session.flush()
+    db.session.add_all([Venda(data_venda=datetime.utcnow(), quantidade=1, preco_unitario=5, valor_total=5,
+                              valor_pago=0, status='pendente', vendedor=vendedor, produto=produto)
+                        for produto in produtos])
+    db.session.commit()
+
+def test_listagem_com_carga_preguicosa_levanta_nplusone(app):
+    from extensions import db
+    from models import Venda
+
+    @app.route('/_teste/vendas')
+    def listar_vendas():
+        # Sem joinedload: cada venda carrega o produto numa consulta própria
+        return ', '.join(venda.produto.nome for venda in Venda.query.all())
+
+    with app.app_context():
+        _popular(db)
+    with pytest.raises(NPlusOneError, match='Venda.produto'):
+        app.test_client().get('/_teste/vendas')
+
+def test_listagens_do_dashboard_sem_nplusone(app, cliente):
+    from extensions import db
+
+    with app.app_context():
+        _popular(db)
+    for url in ('/dashboard/transacoes', '/dashboard/estoque', '/dashboard/vendedores',
+                '/dashboard/transacoes?status=pendente'):
+        resposta = cliente.get(url)
+        assert resposta.status_code == 200, url
+        assert int(resposta.headers['X-Query-Count']) > 0
@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+
+# Várias threads disputam o mesmo produto com registrar_retirada (commit a cada
+# retirada, como a rota) até o estoque acabar: nenhuma unidade pode ser vendida
+# duas vezes e cada retirada aceita tem exatamente uma venda. A vazão vai para
+# o relatório (record_property, e na saída com -s).
+
+THREADS = 8
+
+def _disputar(app, produto_id, quantidade):
+    from extensions import db
+    from estoque import EstoqueInsuficiente, registrar_retirada
+
+    aceitas, erros = [], []
+    lock = threading.Lock()
+    largada = threading.Barrier(THREADS)
+
+    def vendedor(numero):
+        with app.app_context():
+            largada.wait()
+            while True:
+                try:
+                    venda = registrar_retirada(numero, produto_id, quantidade)
+                    db.session.commit()
+                except EstoqueInsuficiente:
+                    db.session.rollback()
+                    return
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        erros.append(repr(e))
+                    return
+                with lock:
+                    aceitas.append(venda.id)
+
+    threads = [threading.Thread(target=vendedor, args=(n + 1,)) for n in range(THREADS)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(120)
+    return aceitas, erros, time.perf_counter() - inicio
+
+@pytest.mark.parametrize('estoque, quantidade', [(400, 1), (301, 3)])
+def test_retiradas_concorrentes_nao_vendem_acima_do_estoque(app, record_property, estoque, quantidade):
+    from extensions import db
+    from models import MovimentacaoEstoque, Produto, Venda
+
+    with app.app_context():
+        produto = Produto(nome='Estresse', preco_unitario=1, quantidade_estoque=estoque)
+        db.session.add(produto)
+        db.session.commit()
+        produto_id = produto.id
+
+    aceitas, erros, duracao = _disputar(app, produto_id, quantidade)
+    vazao = len(aceitas) / duracao
+    record_property('retiradas_por_segundo', round(vazao))
+    print(f'\n{THREADS} threads: {len(aceitas)} retiradas de {quantidade} em {duracao:.2f}s ({vazao:.0f} retiradas/s)')
+
+    assert not erros
+    assert len(set(aceitas)) == len(aceitas)
+    with app.app_context():
+        final = db.session.get(Produto, produto_id).quantidade_estoque
+        vendas = db.session.scalar(db.select(db.func.count()).where(Venda.produto_id == produto_id))
+        saidas = db.session.scalar(db.select(db.func.sum(MovimentacaoEstoque.quantidade))
+                                   .where(MovimentacaoEstoque.produto_id == produto_id))
+    vendido = len(aceitas) * quantidade
+    # Todas as threads só param quando o estoque não cobre mais uma retirada
+    assert 0 <= final < quantidade
+    assert final == estoque - vendido
+    assert vendas == len(aceitas)
+    assert saidas == -vendido
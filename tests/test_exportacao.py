@@ -0,0 +1,26 @@
+# Exportação CSV: só o admin baixa, e o nome do arquivo sai das datas já
+# convertidas, nunca do texto cru de ?de=/?ate=
+
+def test_exportacao_exige_admin(app):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        caixa = User(username='caixa', role='funcionario')
+        caixa.set_password('caixa123')
+        db.session.add(caixa)
+        db.session.commit()
+    cliente = app.test_client()
+    cliente.post('/auth/login', data={'username': 'caixa', 'password': 'caixa123'})
+
+    assert cliente.get('/dashboard/exportar/vendas.csv').status_code == 302
+    assert cliente.post('/dashboard/exportar/vendas').status_code == 302
+
+def test_nome_do_arquivo_usa_datas_convertidas(cliente):
+    resposta = cliente.get('/dashboard/exportar/vendas.csv', query_string={'de': '2026-01-01', 'ate': '2026-01-31'})
+    resposta.close()
+    assert resposta.headers['Content-Disposition'] == 'attachment; filename="vendas_2026-01-01_2026-01-31.csv"'
+
+    resposta = cliente.get('/dashboard/exportar/pagamentos.csv', query_string={'de': 'x"; filename="a.exe', 'ate': ''})
+    resposta.close()
+    assert resposta.headers['Content-Disposition'] == 'attachment; filename="pagamentos.csv"'
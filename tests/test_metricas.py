@@ -0,0 +1,53 @@
+import threading
+
+# Métricas do dashboard: o primeiro acesso com a tabela vazia grava as linhas,
+# e vários requests fazendo isso ao mesmo tempo não colidem na chave
+
+THREADS = 8
+
+def test_leituras_simultaneas_com_metricas_vazias(app):
+    from extensions import db
+    from models import Metrica, Produto
+    from metricas import METRICAS, ler_metricas
+
+    with app.app_context():
+        db.session.add(Produto(nome='Isqueiro', preco_unitario=4, quantidade_estoque=5))
+        db.session.execute(db.delete(Metrica))
+        db.session.commit()
+
+    lidas, erros = [], []
+    largada = threading.Barrier(THREADS)
+
+    def ler():
+        with app.app_context():
+            largada.wait()
+            try:
+                lidas.append(ler_metricas())
+            except Exception as e:
+                erros.append(repr(e))
+
+    threads = [threading.Thread(target=ler) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert not erros
+    assert len(lidas) == THREADS
+    assert all(metricas['total_produtos'] == 1 and metricas['total_estoque'] == 20 for metricas in lidas)
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Metrica)) == len(METRICAS)
+
+def test_linhas_existentes_prevalecem(app):
+    from extensions import db
+    from models import Metrica
+    from metricas import ler_metricas
+
+    with app.app_context():
+        ler_metricas()
+        # Outro request gravou (ou incrementou) total_produtos; saldo_total ainda falta
+        db.session.execute(db.update(Metrica).where(Metrica.nome == 'total_produtos').values(valor=7))
+        db.session.execute(db.delete(Metrica).where(Metrica.nome == 'saldo_total'))
+        db.session.commit()
+
+        assert ler_metricas() == {'total_produtos': 7, 'vendas_pendentes': 0, 'saldo_total': 0, 'total_estoque': 0}
@@ -0,0 +1,37 @@
+from datetime import datetime
+from decimal import Decimal
+
+# Migrações com dados: o upgrade de um banco que já tinha vendas deixa o
+# rollup igual ao que reconstruir_vendas_diarias calcularia
+
+def test_vendas_diarias_nasce_com_o_historico(app):
+    from flask_migrate import stamp, upgrade
+    from extensions import db
+    from models import Produto, Venda, VendaDiaria, Vendedor
+    from vendas_diarias import reconstruir_vendas_diarias
+
+    with app.app_context():
+        vendedor = Vendedor(nome='Balcão')
+        produto = Produto(nome='Piteira', preco_unitario=10, quantidade_estoque=10)
+        db.session.add_all([vendedor, produto])
+        db.session.flush()
+        for dia, quantidade, pago in ((1, 2, 5), (1, 3, 0), (2, 1, 10)):
+            db.session.add(Venda(data_venda=datetime(2026, 10, dia, 10), quantidade=quantidade,
+                                 preco_unitario=10, valor_total=10 * quantidade, valor_pago=pago,
+                                 vendedor_id=vendedor.id, produto_id=produto.id))
+        db.session.commit()
+
+        # Banco de antes do rollup
+        VendaDiaria.__table__.drop(db.engine)
+        stamp(revision='3f9c2a71d4e8')
+        upgrade(revision='8d41b0c6e2f3')
+
+        def linhas():
+            return sorted(tuple(linha) for linha in db.session.execute(db.select(VendaDiaria.__table__)).all())
+
+        migradas = linhas()
+        reconstruir_vendas_diarias()
+        assert migradas == linhas()
+        assert [(linha[0].day, linha[3], linha[5]) for linha in migradas] == [(1, 2, Decimal('50')),
+                                                                              (2, 1, Decimal('10'))]
+        db.session.rollback()
@@ -0,0 +1,16 @@
+# Cache do OCR: o texto é guardado por imagem e configuração, então trocar o
+# idioma (ou o lado máximo) e voltar não descarta a leitura anterior
+
+def test_cache_guarda_uma_leitura_por_configuracao(app):
+    from extensions import db
+    from models import OcrCache
+    from notas import _guardar_no_cache
+
+    with app.app_context():
+        _guardar_no_cache('a' * 64, 'por|1600', 'texto em português', 1.5)
+        _guardar_no_cache('a' * 64, 'eng|1600', 'english text', 1.2)
+        _guardar_no_cache('a' * 64, 'por|1600', 'texto relido', 1.1)
+        db.session.commit()
+
+        linhas = dict(db.session.execute(db.select(OcrCache.configuracao, OcrCache.texto)).all())
+    assert linhas == {'por|1600': 'texto relido', 'eng|1600': 'english text'}
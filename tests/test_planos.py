@@ -0,0 +1,127 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+
+# Regressão de planos: nenhuma consulta filtrada das rotas pode varrer a
+# tabela inteira. Percorre as rotas com o test client capturando cada
+# SELECT/UPDATE/DELETE e roda EXPLAIN QUERY PLAN em cada um; consultas com
+# WHERE não podem ter um passo "SCAN <tabela>" sem índice. Listagens sem
+# filtro (estoque completo, vendedores) varrem por natureza e não contam.
+
+# Passo de varredura completa: "SCAN vendas" ou "SCAN v" (alias), sem "USING ... INDEX"
+VARREDURA = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+COMANDOS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+@pytest.fixture(autouse=True)
+def _profiling(monkeypatch):
+    """Liga o PROFILING antes do app ser criado: /admin/profiling/ também é percorrida"""
+    from config import Config
+
+    monkeypatch.setattr(Config, 'PROFILING', True)
+
+def _popular(db):
+    from models import User, Vendedor, Produto, Venda, Pagamento
+
+    usuarios = []
+    for n in range(5):
+        usuario = User(username=f'vendedor{n}', role='vendedor', password_hash='x')
+        usuarios.append(usuario)
+        db.session.add(usuario)
+    db.session.flush()
+    vendedores = [Vendedor(nome=u.username.title(), user_id=u.id) for u in usuarios]
+    produtos = [Produto(nome=f'Produto {n:03d}', preco_unitario=5 + n % 7, quantidade_estoque=100,
+                        vendedor=vendedores[n % len(vendedores)]) for n in range(50)]
+    db.session.add_all(vendedores + produtos)
+    db.session.flush()
+
+    agora = datetime.utcnow()
+    for n in range(300):
+        venda = Venda(data_venda=agora - timedelta(hours=n * 5), quantidade=1 + n % 3,
+                      preco_unitario=10, valor_total=10 * (1 + n % 3), valor_pago=0,
+                      status='pendente', vendedor_id=vendedores[n % 5].id, produto_id=produtos[n % 50].id)
+        db.session.add(venda)
+        if n % 2:
+            venda.valor_pago = venda.valor_total
+            venda.status = 'pago'
+            db.session.add(Pagamento(venda=venda, valor=venda.valor_total, metodo='dinheiro',
+                                     vendedor_id=venda.vendedor_id, data_pagamento=venda.data_venda))
+    db.session.commit()
+
+def _percorrer_rotas(cliente):
+    """Requisições que exercitam as consultas das rotas (GETs e as escritas principais)"""
+    hoje = datetime.utcnow().date()
+    de = (hoje - timedelta(days=20)).isoformat()
+    get = [
+        '/dashboard/', '/dashboard/vendedores', '/dashboard/estoque', '/dashboard/estoque/tabela',
+        '/dashboard/estatisticas', '/dashboard/estoque/novo', '/dashboard/estoque/importar',
+        '/dashboard/estoque/editar/1', '/dashboard/retirada', '/dashboard/retirada/lote',
+        '/dashboard/pagamento', '/dashboard/transacoes',
+        f'/dashboard/transacoes?de={de}&ate={hoje.isoformat()}',
+        '/dashboard/transacoes?status=pendente',
+        f'/dashboard/transacoes?status=pendente&de={de}',
+        '/dashboard/exportar/vendas.csv', f'/dashboard/exportar/pagamentos.csv?de={de}',
+        '/auth/admin', '/auth/register', '/admin/profiling/',
+        '/dashboard/busca/produtos?q=prod', '/dashboard/busca/produtos?q=produto%2001&cursor=11:produto%20011',
+        '/dashboard/busca/vendedores?q=vend', '/dashboard/busca/vendas-pendentes',
+        '/dashboard/busca/vendas-pendentes?q=produto', '/dashboard/busca/vendas-pendentes?q=12',
+        '/dashboard/estoque/tabela/linhas?q=produto%2002', '/dashboard/estoque/tabela/linhas?cursor=11:produto%20011',
+        '/dashboard/estoque/posicao', f'/dashboard/estoque/posicao?data={de}&produto=1',
+        '/sync/?desde=0', '/sync/?desde=300',
+    ]
+    for url in get:
+        # Rota quebrada falha o teste em vez de sumir da verificação
+        assert cliente.get(url).status_code < 400, url
+    # Segunda página da listagem (cursor keyset)
+    resposta = cliente.get('/dashboard/transacoes')
+    cursor = re.search(r'cursor_vendas=([^"&]+)', resposta.get_data(as_text=True))
+    if cursor:
+        cliente.get(f'/dashboard/transacoes?cursor_vendas={cursor.group(1)}')
+    escritas = [
+        cliente.post('/dashboard/retirada', data={'vendedor': 2, 'produto': 1, 'quantidade': 1}),
+        cliente.post('/dashboard/retirada/lote', data={'vendedor': 2, 'itens-0-produto': 2, 'itens-0-quantidade': 1,
+                                                       'itens-1-produto': 3, 'itens-1-quantidade': 2}),
+        cliente.post('/dashboard/pagamento', data={'venda': 1, 'valor': '1.00', 'metodo': 'dinheiro'}),
+        cliente.post('/sync/', json={'operacoes': [
+            {'chave': 'planos-1', 'tipo': 'retirada', 'vendedor_id': 2, 'itens': [[5, 1]]},
+            {'chave': 'planos-2', 'tipo': 'pagamento', 'retirada': 'planos-1', 'valor': '1.00', 'metodo': 'pix'},
+        ]}),
+        cliente.post('/dashboard/estoque/editar/4', data={'nome': 'Produto 004', 'preco_unitario': '6.00',
+                                                          'quantidade_estoque': 80}),
+    ]
+    assert [resposta.status_code for resposta in escritas] == [302, 302, 302, 200, 302]
+
+def test_consultas_filtradas_usam_indice(app, cliente):
+    from extensions import db
+
+    # Só os planos importam aqui (o detector de N+1 tem teste próprio)
+    app.config.update(NPLUSONE_RAISE=False)
+    capturadas = {}
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(COMANDOS) and not executemany:
+            capturadas.setdefault(statement, parameters)
+
+    with app.app_context():
+        _popular(db)
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        _percorrer_rotas(cliente)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        falhas = []
+        for statement, parameters in capturadas.items():
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            plano = [linha[3] for linha in cursor.fetchall()]
+            if re.search(r'\bWHERE\b', statement, re.IGNORECASE) and any(VARREDURA.match(p) for p in plano):
+                falhas.append(' '.join(statement.split())[:160] + '\n    ' + '\n    '.join(plano))
+    finally:
+        conexao.close()
+
+    assert len(capturadas) > 40  # as rotas rodaram de verdade
+    assert not falhas, 'Consultas com varredura completa:\n' + '\n'.join(falhas)
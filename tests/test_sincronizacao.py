@@ -0,0 +1,50 @@
+import pytest
+
+# Chaves de idempotência do POST /sync/: o reenvio do mesmo caixa devolve o
+# resultado gravado; a mesma chave vinda de outro usuário é recusada sem
+# mostrar o resultado alheio nem deixar citar a retirada dele.
+
+@pytest.fixture
+def caixas(app):
+    from extensions import db
+    from models import Produto, User
+
+    with app.app_context():
+        caixa = User(username='caixa', role='funcionario')
+        caixa.set_password('caixa123')
+        produto = Produto(nome='Palheiro', preco_unitario=5, quantidade_estoque=10)
+        db.session.add_all([caixa, produto])
+        db.session.commit()
+        ids = caixa.id, produto.id
+
+    clientes = []
+    for usuario, senha in (('admin', 'admin123'), ('caixa', 'caixa123')):
+        cliente = app.test_client()
+        assert cliente.post('/sync/sessao', json={'usuario': usuario, 'senha': senha}).status_code == 200
+        clientes.append(cliente)
+    return (*clientes, *ids)
+
+def _enviar(cliente, *operacoes):
+    resposta = cliente.post('/sync/', json={'operacoes': list(operacoes)})
+    assert resposta.status_code == 200
+    return resposta.get_json()['resultados']
+
+def test_chave_de_outro_usuario_nao_expoe_resultado(app, caixas):
+    from extensions import db
+    from models import Produto
+
+    admin, caixa, vendedor_id, produto_id = caixas
+    retirada = {'chave': 'r-1', 'tipo': 'retirada', 'vendedor_id': vendedor_id, 'itens': [[produto_id, 2]]}
+
+    [primeira] = _enviar(admin, retirada)
+    assert primeira['status'] == 'aplicada'
+    [reenvio] = _enviar(admin, retirada)
+    assert reenvio == {**primeira, 'repetida': True}
+
+    [alheia] = _enviar(caixa, retirada)
+    [citada] = _enviar(caixa, {'chave': 'p-1', 'tipo': 'pagamento', 'retirada': 'r-1', 'valor': 10, 'metodo': 'pix'})
+    assert alheia == {'chave': 'r-1', 'status': 'recusada', 'erro': 'Chave usada por outra operação',
+                      'repetida': True}
+    assert citada['status'] == 'recusada'
+    with app.app_context():
+        assert db.session.get(Produto, produto_id).quantidade_estoque == 8
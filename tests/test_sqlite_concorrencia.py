@@ -0,0 +1,81 @@
+import threading
+import time
+from sqlalchemy import text
+
+# Perfil SQLite (WAL): leitores nunca esperam por um escritor com a transação
+# aberta. O escritor grava mais do que cabe no cache da conexão (como numa
+# importação grande) e segura o lock de escrita; as leituras não podem falhar
+# com "database is locked". A latência depende da máquina: vai para o
+# relatório (record_property, e na saída com -s) em vez de virar asserção.
+
+RODADAS = 3
+MB_POR_RODADA = 2
+SEGURA = 0.3  # segundos com a escrita aberta
+LEITORES = 4
+
+def test_wal_ativo(app):
+    from extensions import db
+
+    with app.app_context(), db.engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar().lower() == 'wal'
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_PRAGMAS']['busy_timeout']
+
+def test_leitores_nao_esperam_escritor(app, record_property):
+    from extensions import db
+
+    with app.app_context():
+        engine = db.engine
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE _carga (id INTEGER PRIMARY KEY, valor BLOB)'))
+
+    parar = threading.Event()
+    escrita_aberta = threading.Event()
+    latencias, erros = [], []
+    lock = threading.Lock()
+
+    def escritor():
+        try:
+            for _ in range(RODADAS):
+                with engine.begin() as conn:
+                    # Cache pequeno força o SQLite a despejar páginas antes do commit
+                    conn.exec_driver_sql('PRAGMA cache_size=100')
+                    conn.execute(text('INSERT INTO _carga (valor) VALUES (randomblob(4096))'),
+                                 [{}] * (MB_POR_RODADA * 256))
+                    escrita_aberta.set()
+                    time.sleep(SEGURA)
+        except Exception as e:
+            with lock:
+                erros.append(f'escritor: {e!r}')
+        finally:
+            parar.set()
+
+    def leitor():
+        escrita_aberta.wait(5)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT COUNT(*) FROM _carga')).scalar()
+            except Exception as e:
+                with lock:
+                    erros.append(repr(e))
+                continue
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=leitor) for _ in range(LEITORES)]
+    threads.append(threading.Thread(target=escritor))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert not erros
+    assert latencias
+    # Um leitor bloqueado esperaria o commit: perto de SEGURA
+    record_property('leitura_max_ms', round(max(latencias) * 1000, 1))
+    print(f'\n{len(latencias)} leituras com a escrita aberta; a mais lenta em {max(latencias) * 1000:.1f} ms '
+          f'(escrita segura {SEGURA * 1000:.0f} ms)')
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM _carga')).scalar() == RODADAS * MB_POR_RODADA * 256
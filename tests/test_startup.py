@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+
+# Subida do worker: `import app` não carrega os módulos da aplicação, e nem o
+# create_app traz as bibliotecas pesadas (pandas, Pillow, OpenCV...), que só
+# entram quando a rota ou tarefa que as usa roda
+
+PESADAS = ('pandas', 'numpy', 'PIL', 'cv2', 'pytesseract', 'openpyxl')
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VERIFICAR = f'''
+import json, sys
+import app
+importados = [m for m in ('models', 'tarefas', 'notas', 'routes.dashboard') if m in sys.modules]
+app.create_app()
+print(json.dumps([importados, [m for m in {PESADAS!r} if m in sys.modules]]))
+'''
+
+def test_subida_nao_importa_o_que_nao_usa(tmp_path):
+    saida = subprocess.run([sys.executable, '-c', VERIFICAR], cwd=RAIZ, capture_output=True, text=True, check=True,
+                           env={**os.environ, 'INSTANCE_PATH': str(tmp_path)}).stdout
+    assert json.loads(saida.strip().splitlines()[-1]) == [[], []]
@@ -0,0 +1,24 @@
+# Executor de tarefas: uma tarefa dada como abandonada (sem batimento por tempo
+# demais) continua falha mesmo que o worker lento termine depois
+
+def test_resultado_de_tarefa_abandonada_e_descartado(app, monkeypatch):
+    from extensions import db
+    from models import Tarefa
+    from tarefas import FALHOU, TIPOS, enfileirar, executor, marcar_abandonadas
+
+    def lenta(contexto):
+        # Enquanto ela roda, a manutenção de outro worker a considera parada
+        marcar_abandonadas(-1)
+        return {'linhas': 10}
+
+    monkeypatch.setitem(TIPOS, 'lenta', (lenta, 'Tarefa lenta'))
+    with app.app_context():
+        tarefa_id = enfileirar('lenta').id
+        db.session.commit()
+
+    assert executor.executar_proxima(app)
+
+    with app.app_context():
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        assert (tarefa.status, tarefa.resultado) == (FALHOU, None)
+        assert tarefa.mensagem.startswith('Interrompida')
@@ -0,0 +1,37 @@
+import re
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+# Transações: vendas e pagamentos paginam cada um com seu cursor; avançar uma
+# tabela não pode voltar a outra para a primeira página nem perder os filtros
+
+def _links(html):
+    """Parâmetros de cada link 'Próxima página', na ordem (vendas, pagamentos)"""
+    hrefs = re.findall(r'<a href="([^"]*)" class="btn btn-sm btn-outline-primary">', html)
+    return [{k: v[0] for k, v in parse_qs(urlsplit(href.replace('&amp;', '&')).query).items()} for href in hrefs]
+
+def test_links_mantem_o_outro_cursor_e_os_filtros(app, cliente):
+    from extensions import db
+    from models import Produto, Vendedor
+    from estoque import registrar_pagamento, registrar_retirada
+
+    with app.app_context():
+        vendedor = Vendedor(nome='Balcão')
+        produto = Produto(nome='Tabaco', preco_unitario=10, quantidade_estoque=10)
+        db.session.add_all([vendedor, produto])
+        db.session.commit()
+        for _ in range(3):
+            venda = registrar_retirada(vendedor.id, produto.id, 1)
+            db.session.flush()
+            registrar_pagamento(venda.id, 5, 'pix')
+            db.session.commit()
+    app.config['TRANSACOES_POR_PAGINA'] = 1
+    hoje = datetime.utcnow().strftime('%Y-%m-%d')
+
+    vendas, pagamentos = _links(cliente.get('/dashboard/transacoes', query_string={'de': hoje}).get_data(as_text=True))
+    assert vendas.keys() == {'de', 'cursor_vendas'} and pagamentos.keys() == {'de', 'cursor_pagamentos'}
+
+    html = cliente.get('/dashboard/transacoes', query_string=vendas).get_data(as_text=True)
+    _, seguinte = _links(html)
+    assert seguinte == {'de': hoje, 'cursor_vendas': vendas['cursor_vendas'],
+                        'cursor_pagamentos': pagamentos['cursor_pagamentos']}
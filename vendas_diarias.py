@@ -0,0 +1,103 @@
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from extensions import db
+from models import Venda, VendaDiaria
+from paginacao import filtrar_periodo
+
+# Colunas somadas no upsert (a chave é dia, vendedor_id, produto_id)
+VALORES = ('vendas', 'quantidade', 'valor_bruto', 'valor_pago', 'saldo_aberto')
+
+def _upsert(linhas):
+    """Soma as linhas às existentes (ou cria), num único statement em lote"""
+    comando = insert(VendaDiaria)
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=[VendaDiaria.dia, VendaDiaria.vendedor_id, VendaDiaria.produto_id],
+        set_={nome: getattr(VendaDiaria, nome) + getattr(comando.excluded, nome) for nome in VALORES}
+    ), linhas)
+
+def acumular_vendas(vendas):
+    """Acrescenta vendas novas ao rollup na transação corrente (sem commit).
+
+    `vendas` são dicts com data_venda, vendedor_id, produto_id, quantidade,
+    valor_total e (opcional) valor_pago.
+    """
+    linhas = []
+    for venda in vendas:
+        valor_pago = venda.get('valor_pago') or 0
+        linhas.append({
+            'dia': venda['data_venda'].date(),
+            'vendedor_id': venda['vendedor_id'],
+            'produto_id': venda['produto_id'],
+            'vendas': 1,
+            'quantidade': venda['quantidade'],
+            'valor_bruto': venda['valor_total'],
+            'valor_pago': valor_pago,
+            'saldo_aberto': venda['valor_total'] - valor_pago,
+        })
+    if linhas:
+        _upsert(linhas)
+
+def acumular_pagamento(venda, valor):
+    """Registra um pagamento no dia da venda quitada (não no dia do pagamento)"""
+    _upsert([{
+        'dia': venda.data_venda.date(),
+        'vendedor_id': venda.vendedor_id,
+        'produto_id': venda.produto_id,
+        'vendas': 0,
+        'quantidade': 0,
+        'valor_bruto': 0,
+        'valor_pago': valor,
+        'saldo_aberto': -valor,
+    }])
+
+def reconstruir_vendas_diarias(inicio=None, fim=None):
+    """Recalcula o rollup do período [inicio, fim) a partir da tabela de vendas.
+
+    Apaga os dias do período e os regrava com um INSERT ... SELECT agrupado,
+    então serve tanto para o backfill inicial quanto para reparar divergências.
+    Os limites devem cair à meia-noite (como os de intervalo_datas). Não faz
+    commit; retorna o número de linhas gravadas.
+    """
+    apagar = filtrar_dias(delete(VendaDiaria), inicio, fim)
+    db.session.execute(apagar.execution_options(synchronize_session=False))
+
+    dia = db.func.date(Venda.data_venda)
+    consulta = filtrar_periodo(
+        db.select(
+            dia, Venda.vendedor_id, Venda.produto_id,
+            db.func.count(),
+            db.func.coalesce(db.func.sum(Venda.quantidade), 0),
+            db.func.coalesce(db.func.sum(Venda.valor_total), 0),
+            db.func.coalesce(db.func.sum(Venda.valor_pago), 0),
+            db.func.coalesce(db.func.sum(Venda.valor_total - db.func.coalesce(Venda.valor_pago, 0)), 0),
+        )
+        .where(Venda.data_venda.is_not(None))
+        .group_by(dia, Venda.vendedor_id, Venda.produto_id),
+        Venda.data_venda, inicio, fim
+    )
+    resultado = db.session.execute(insert(VendaDiaria).from_select(
+        ['dia', 'vendedor_id', 'produto_id', *VALORES], consulta
+    ))
+    return resultado.rowcount
+
+def rollup_vazio():
+    """True se há vendas mas o rollup está vazio (tabela limpa à mão; a migração já faz o backfill).
+
+    Só detecta: o backfill fica com `flask reconstruir-vendas-diarias` ou o
+    recálculo de analytics, nunca com uma leitura.
+    """
+    if db.session.scalar(db.select(VendaDiaria.dia).limit(1)) is not None:
+        return False
+    return db.session.scalar(db.select(Venda.id).limit(1)) is not None
+
+def alinhado_ao_dia(*datas):
+    """True se todos os limites informados caem à meia-noite (servidos pelo rollup)"""
+    return all(d is None or d == d.replace(hour=0, minute=0, second=0, microsecond=0) for d in datas)
+
+def filtrar_dias(consulta, inicio, fim):
+    """Restringe uma consulta sobre vendas_diarias ao intervalo [inicio, fim)"""
+    if inicio is not None:
+        consulta = consulta.where(VendaDiaria.dia >= inicio.date())
+    if fim is not None:
+        consulta = consulta.where(VendaDiaria.dia < fim.date())
+    return consulta